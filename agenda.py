@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import os
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from alteracoes import IndiceMemoria, ItemProposta, assinar
+from database import SessionLocal
+from models import Funcionario, Proposta
+from log_config import configurar_logging
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# Não há duração gravada: toda reunião ocupa este tempo a partir de data_hora_reuniao
+AGENDA_DURACAO_REUNIAO = timedelta(minutes=float(os.getenv("AGENDA_DURACAO_REUNIAO", "60")))
+AGENDA_PRAZOS_POR_DIA = int(os.getenv("AGENDA_PRAZOS_POR_DIA", "1"))  # acima disso, os prazos do dia conflitam
+AGENDA_HISTORICO_DIAS = int(os.getenv("AGENDA_HISTORICO_DIAS", "30"))  # passado mantido no índice e nos feeds
+AGENDA_RECARGA = float(os.getenv("AGENDA_RECARGA", "300"))  # segundos
+AGENDA_DOMINIO = os.getenv("AGENDA_DOMINIO", "azevedoambiental.com.br")  # sufixo dos UIDs do iCalendar
+
+Conflito = namedtuple("Conflito", "tipo proposta_id momento")
+
+_MAIOR = float("inf")
+
+def _escapar(texto):
+    return str(texto).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _dobrar(linha):
+    # RFC 5545: no máximo 75 octetos por linha, sem partir caracteres UTF-8; a continuação começa com espaço
+    partes, atual, tamanho = [], "", 0
+    for caractere in linha:
+        octetos = len(caractere.encode("utf-8"))
+        if tamanho + octetos > 75:
+            partes.append(atual)
+            atual, tamanho = " ", 1
+        atual += caractere
+        tamanho += octetos
+    partes.append(atual)
+    return "\r\n".join(partes) + "\r\n"
+
+def _momento(valor):
+    return f"{valor:%Y%m%dT%H%M%S}"
+
+def _vevent(uid, inicio, fim, resumo, descricao):
+    linhas = ["BEGIN:VEVENT", f"UID:{uid}@{AGENDA_DOMINIO}", f"DTSTAMP:{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}",
+              f"DTSTART:{_momento(inicio)}", f"DTEND:{_momento(fim)}", f"SUMMARY:{_escapar(resumo)}",
+              f"DESCRIPTION:{_escapar(descricao)}", "END:VEVENT"]
+    return "".join(_dobrar(linha) for linha in linhas)
+
+def _eventos(item):
+    """VEVENTs da proposta, já no texto final: o feed só concatena os de cada proposta."""
+    processo = f"{item.tipo_processo} - {item.orgao_ambiental}"
+    descricao = f"Proposta {item.proposta_id}, cliente {item.cliente_id}" + (f": {item.tipo_trabalho}" if item.tipo_trabalho else "")
+    texto = ""
+    if item.data_hora_reuniao is not None:
+        texto += _vevent(f"proposta-{item.proposta_id}-reuniao", item.data_hora_reuniao,
+                         item.data_hora_reuniao + AGENDA_DURACAO_REUNIAO, f"Reunião: {processo}", descricao)
+    if item.prazo_entrega is not None:
+        texto += _vevent(f"proposta-{item.proposta_id}-prazo", item.prazo_entrega, item.prazo_entrega,
+                         f"Prazo de entrega: {processo}", descricao)
+    return texto
+
+class _AgendaFuncionario:
+    def __init__(self, nome):
+        self.nome = nome
+        self.reunioes = []  # (início, proposta_id), ordenada
+        self.prazos = []  # (prazo, proposta_id), ordenada
+        self.eventos = {}  # proposta_id -> VEVENTs renderizados
+        self.feed = None  # cache do iCalendar e do ETag; None quando precisa ser remontado
+        self.etag = None
+
+    def alterado(self):
+        self.feed = None
+
+def _faixa(lista, inicio, fim):
+    """Itens com momento no intervalo aberto (inicio, fim), por busca binária."""
+    return lista[bisect_right(lista, (inicio, _MAIOR)):bisect_left(lista, (fim,))]
+
+class _Agendas:
+    """Estado da agenda; só é lido ou alterado com o lock da agenda."""
+
+    def __init__(self):
+        self.funcionarios = {}  # funcionario_id -> _AgendaFuncionario
+        self.itens = {}  # proposta_id -> ItemProposta
+
+    def entrar(self, funcionario_id, nome):
+        agenda = self.funcionarios.get(funcionario_id)
+        if agenda is None:
+            self.funcionarios[funcionario_id] = _AgendaFuncionario(nome)
+        elif agenda.nome != nome:
+            agenda.nome = nome
+            agenda.alterado()
+
+    def adicionar(self, item):
+        agenda = self.funcionarios.get(item.funcionario_id)
+        if agenda is None or (item.data_hora_reuniao is None and item.prazo_entrega is None):
+            return
+        self.itens[item.proposta_id] = item
+        if item.data_hora_reuniao is not None:
+            insort(agenda.reunioes, (item.data_hora_reuniao, item.proposta_id))
+        if item.prazo_entrega is not None:
+            insort(agenda.prazos, (item.prazo_entrega, item.proposta_id))
+        agenda.eventos[item.proposta_id] = _eventos(item)
+        agenda.alterado()
+
+    def remover(self, proposta_id):
+        item = self.itens.pop(proposta_id, None)
+        agenda = self.funcionarios.get(item.funcionario_id) if item else None
+        if agenda is None:
+            return
+        for lista, momento in ((agenda.reunioes, item.data_hora_reuniao), (agenda.prazos, item.prazo_entrega)):
+            if momento is not None:
+                posicao = bisect_left(lista, (momento, proposta_id))
+                if posicao < len(lista) and lista[posicao] == (momento, proposta_id):
+                    del lista[posicao]
+        del agenda.eventos[proposta_id]
+        agenda.alterado()
+
+    def conflitos(self, funcionario_id, data_hora_reuniao, prazo_entrega, ignorar):
+        agenda = self.funcionarios.get(funcionario_id)
+        if agenda is None:
+            return []
+        conflitos = []
+        if data_hora_reuniao is not None:
+            # Duração fixa: duas reuniões se sobrepõem quando os inícios distam menos que uma duração
+            for inicio, proposta_id in _faixa(agenda.reunioes, data_hora_reuniao - AGENDA_DURACAO_REUNIAO,
+                                              data_hora_reuniao + AGENDA_DURACAO_REUNIAO):
+                if proposta_id != ignorar:
+                    conflitos.append(Conflito("reuniao", proposta_id, inicio))
+        if prazo_entrega is not None:
+            dia = datetime.combine(prazo_entrega.date(), datetime.min.time())
+            mesmo_dia = [(momento, proposta_id) for momento, proposta_id in
+                         _faixa(agenda.prazos, dia - timedelta(microseconds=1), dia + timedelta(days=1))
+                         if proposta_id != ignorar]
+            if len(mesmo_dia) >= AGENDA_PRAZOS_POR_DIA:
+                conflitos.extend(Conflito("prazo", proposta_id, momento) for momento, proposta_id in mesmo_dia)
+        return conflitos
+
+class AgendaFuncionarios(IndiceMemoria):
+    """Reuniões e prazos de cada funcionário em listas ordenadas, para achar conflitos por busca binária.
+
+    Mantida de forma incremental pelos eventos do ORM, como o índice de carga; os feeds iCalendar de
+    cada funcionário ficam em cache e só o da pessoa afetada por uma alteração é remontado.
+    """
+
+    def __init__(self, fabrica_sessao=SessionLocal, recarga=AGENDA_RECARGA):
+        super().__init__(fabrica_sessao, recarga)
+
+    def _ler(self, db: Session):
+        """Lê as reuniões e prazos a partir do corte de histórico, pelos índices das duas colunas."""
+        corte = datetime.now() - timedelta(days=AGENDA_HISTORICO_DIAS)
+        funcionarios = db.execute(select(Funcionario.id, Funcionario.nome)).all()
+        itens = db.execute(
+            select(Proposta.id, Proposta.responsavel_id, Proposta.data_hora_reuniao, Proposta.prazo_entrega,
+                   Proposta.tipo_processo, Proposta.orgao_ambiental, Proposta.tipo_trabalho, Proposta.cliente_id)
+            .where(Proposta.responsavel_id.is_not(None),
+                   or_(Proposta.data_hora_reuniao >= corte, Proposta.prazo_entrega >= corte))
+            .order_by(Proposta.id)
+        ).all()
+        return funcionarios, itens
+
+    def _montar(self, dados):
+        funcionarios, itens = dados
+        estado = _Agendas()
+        for funcionario_id, nome in funcionarios:
+            estado.entrar(funcionario_id, nome)
+        for linha in itens:
+            estado.adicionar(ItemProposta(*linha))
+        logger.info(f"Agenda carregada: {len(funcionarios)} funcionários, {len(itens)} propostas com reunião ou prazo.")
+        return estado
+
+    def _aplicar_em(self, estado, operacoes):
+        for tipo, dados in operacoes:
+            if tipo == "proposta":
+                estado.remover(dados.proposta_id)
+                estado.adicionar(dados)
+            elif tipo == "proposta_removida":
+                estado.remover(dados)
+            elif tipo == "funcionario":
+                estado.entrar(*dados)
+            elif tipo == "funcionario_removido":
+                estado.funcionarios.pop(dados, None)
+
+    def _aplicar(self, operacoes):
+        super()._aplicar(operacoes)
+        with self._lock:
+            if self._estado is None:
+                return
+            for tipo, dados in operacoes:
+                if tipo != "proposta":
+                    continue
+                # Cadastro ou edição por qualquer caminho: o conflito fica registrado no log
+                conflitos = self._estado.conflitos(dados.funcionario_id, dados.data_hora_reuniao, dados.prazo_entrega,
+                                                   dados.proposta_id)
+                if conflitos:
+                    descricao = ", ".join(f"{c.tipo} da proposta {c.proposta_id} em {c.momento:%Y-%m-%d %H:%M}" for c in conflitos)
+                    logger.warning(f"Proposta {dados.proposta_id} em conflito na agenda do funcionário "
+                                   f"{dados.funcionario_id}: {descricao}")
+
+    def conflitos(self, funcionario_id, data_hora_reuniao=None, prazo_entrega=None, ignorar=None):
+        """Reuniões sobrepostas e prazos acumulados no dia; ignorar é a própria proposta, numa edição."""
+        self._preparar()
+        with self._lock:
+            return self._estado.conflitos(funcionario_id, data_hora_reuniao, prazo_entrega, ignorar)
+
+    def ocupados(self, data_hora_reuniao=None, prazo_entrega=None, ignorar=None):
+        """Funcionários que teriam conflito com essa reunião ou prazo (para o evitar da atribuição)."""
+        self._preparar()
+        with self._lock:
+            estado = self._estado
+            return {funcionario_id for funcionario_id in estado.funcionarios
+                    if estado.conflitos(funcionario_id, data_hora_reuniao, prazo_entrega, ignorar)}
+
+    def funcionarios(self):
+        """Ids dos funcionários com agenda."""
+        self._preparar()
+        with self._lock:
+            return list(self._estado.funcionarios)
+
+    def ical(self, funcionario_id):
+        """(texto iCalendar, etag) do funcionário, ou None se ele não existir."""
+        self._preparar()
+        with self._lock:
+            estado = self._estado
+            agenda = estado.funcionarios.get(funcionario_id)
+            if agenda is None:
+                return None
+            if agenda.feed is None:
+                cabecalho = "".join(_dobrar(linha) for linha in (
+                    "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Azevedo Ambiental//Sistema de Propostas//PT",
+                    "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_escapar(f'Agenda - {agenda.nome}')}"))
+                agenda.feed = cabecalho + "".join(agenda.eventos.values()) + "END:VCALENDAR\r\n"
+                # ETag do conteúdo, não do momento da carga: a recarga periódica que não muda nada mantém o ETag
+                # (o DTSTAMP dos VEVENTs muda a cada montagem e fica de fora)
+                conteudo = repr((agenda.nome, AGENDA_DURACAO_REUNIAO, [estado.itens[p] for p in sorted(agenda.eventos)]))
+                agenda.etag = hashlib.sha1(conteudo.encode()).hexdigest()[:20]
+            return agenda.feed, agenda.etag
+
+agenda = AgendaFuncionarios()
+# Gravações pelo ORM entram na agenda depois do commit
+assinar(agenda._aplicar)
+
+if __name__ == "__main__":
+    # Exporta um .ics por funcionário: python agenda.py [pasta]
+    destino = sys.argv[1] if len(sys.argv) > 1 else "agendas"
+    os.makedirs(destino, exist_ok=True)
+    agenda.carregar()
+    for funcionario_id in agenda.funcionarios():
+        texto, _ = agenda.ical(funcionario_id)
+        caminho = os.path.join(destino, f"funcionario-{funcionario_id}.ics")
+        with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+            arquivo.write(texto)
+        print(f"{caminho} gravado.")
@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from database import SessionLocal, engine as engine_padrao, init_db
+from migracoes import preencher
+from notificacoes import DespachanteNotificacoes
+from prazos import NIVEIS_PADRAO, notificar_prazos
+from log_config import configurar_logging
+from metricas import operacao
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+INTERVALO = float(os.getenv('AGENDADOR_INTERVALO', '900'))  # segundos
+NIVEIS = tuple(int(n) for n in os.getenv('AGENDADOR_NIVEIS', ','.join(map(str, NIVEIS_PADRAO))).split(','))
+
+class AgendadorPrazos:
+    """Verifica os prazos periodicamente em segundo plano e alimenta a caixa de saída.
+
+    Na partida, depois do primeiro ciclo, também conclui os preenchimentos deixados pelas migrações.
+    """
+
+    def __init__(self, fabrica_sessao=SessionLocal, intervalo=INTERVALO, niveis=NIVEIS, despachante=None, digest=True,
+                 engine=engine_padrao):
+        self.fabrica_sessao = fabrica_sessao
+        self.engine = engine
+        self.intervalo = intervalo
+        self.niveis = niveis
+        self.despachante = despachante
+        self.digest = digest
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def executar_ciclo(self):
+        db = self.fabrica_sessao()
+        try:
+            with operacao("agendador.ciclo"):
+                # Todo ciclo revê a janela dos níveis: o que já tem aviso registrado sai pela consulta, não pelo relógio
+                total = notificar_prazos(db, datetime.now(), self.niveis, self.digest)
+                db.commit()
+            logger.info(f"Ciclo do agendador: {total} avisos enfileirados.")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro no ciclo do agendador: {e}")
+            return 0
+        finally:
+            db.close()
+        if total and self.despachante:
+            self.despachante.acordar()
+        return total
+
+    def executar_preenchimentos(self):
+        """Conclui os preenchimentos pendentes (ex.: resumo de renovações após atualizar um banco existente)."""
+        try:
+            # Retomável: um lote por transação, e parar() interrompe entre dois lotes
+            return preencher(self.engine, parar=self._parar)
+        except Exception as e:
+            logger.error(f"Erro nos preenchimentos pendentes: {e}")
+            return False
+
+    def _laco(self):
+        preenchido = False
+        while not self._parar.is_set():
+            self._acordar.clear()
+            self.executar_ciclo()
+            if not preenchido:
+                preenchido = self.executar_preenchimentos()
+            self._acordar.wait(self.intervalo)
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._laco, name="agendador-prazos", daemon=True)
+            self._thread.start()
+
+    def disparar(self):
+        """Pede uma verificação imediata, sem bloquear quem chamou."""
+        self._acordar.set()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+if __name__ == "__main__":
+    init_db()
+    despachante = DespachanteNotificacoes()
+    agendador = AgendadorPrazos(despachante=despachante)
+    despachante.iniciar()
+    agendador.iniciar()
+    print(f"Agendador de prazos em execução (intervalo de {INTERVALO:.0f}s, níveis {NIVEIS}). Ctrl+C para encerrar.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agendador.parar()
+        despachante.parar()
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import Funcionario, Proposta
+
+# Propostas e funcionários gravados pelo ORM, repassados aos índices em memória (carga, agenda) só depois do
+# commit; um rollback descarta. Operações, na ordem em que foram gravadas:
+#   ("proposta", ItemProposta), ("proposta_removida", proposta_id),
+#   ("funcionario", (funcionario_id, nome)), ("funcionario_removido", funcionario_id)
+
+ItemProposta = namedtuple("ItemProposta", "proposta_id funcionario_id data_hora_reuniao prazo_entrega "
+                                          "tipo_processo orgao_ambiental tipo_trabalho cliente_id")
+
+_CHAVE = "alteracoes"
+_assinantes = []
+
+def assinar(aplicar):
+    """aplicar(operacoes) passa a receber as operações de cada transação confirmada."""
+    _assinantes.append(aplicar)
+    return aplicar
+
+class IndiceMemoria:
+    """Base dos índices em memória (carga, agenda): carga completa do banco mais as operações confirmadas.
+
+    A carga lê o banco e monta um estado novo fora do lock, e só então o põe no lugar do atual. O lock só cobre
+    a troca e a aplicação das operações, nunca a consulta: um commit (que na API roda no laço de eventos) não
+    espera uma recarga. As operações que chegam durante a carga valem para o estado em uso e ficam guardadas
+    para o novo, já que a consulta pode tê-las lido ou não; reaplicar uma operação não muda o resultado.
+
+    Subclasses definem _ler(db), _montar(dados) e _aplicar_em(estado, operacoes).
+    """
+
+    def __init__(self, fabrica_sessao, recarga):
+        self.fabrica_sessao = fabrica_sessao
+        self.recarga = recarga
+        self._lock = threading.RLock()
+        self._carga_concluida = threading.Condition(self._lock)
+        self._estado = None
+        self._carregado_em = None
+        self._geracao = 0  # cada carga tem a sua; só a mais recente entra no lugar do estado
+        self._pendentes = None  # operações recebidas durante a carga em andamento; None sem carga em andamento
+
+    def _iniciar_carga(self):
+        self._geracao += 1
+        self._pendentes = []
+        return self._geracao
+
+    def _carregar(self, geracao, db=None):
+        """Carrega e troca o estado; False se uma carga mais nova começou depois desta e é ela que vale."""
+        try:
+            fechar = db is None
+            db = db or self.fabrica_sessao()
+            try:
+                dados = self._ler(db)
+            finally:
+                if fechar:
+                    db.close()
+            estado = self._montar(dados)
+        except BaseException:
+            with self._lock:
+                if geracao == self._geracao:
+                    self._pendentes = None
+                    self._carga_concluida.notify_all()
+            raise
+        with self._lock:
+            if geracao != self._geracao:
+                return False
+            for operacoes in self._pendentes:
+                self._aplicar_em(estado, operacoes)
+            self._estado, self._pendentes = estado, None
+            self._carregado_em = time.monotonic()
+            self._carga_concluida.notify_all()
+        return True
+
+    def carregar(self, db=None):
+        with self._lock:
+            geracao = self._iniciar_carga()
+        self._carregar(geracao, db)
+
+    def _preparar(self):
+        """Carrega na primeira leitura e recarrega quando vencido; chamar sem o lock."""
+        while True:
+            with self._lock:
+                vencido = self._carregado_em is None or time.monotonic() - self._carregado_em > self.recarga
+                if vencido and self._pendentes is None:
+                    geracao = self._iniciar_carga()
+                elif self._estado is not None:
+                    return  # em dia, ou recarregando noutra thread: a leitura segue com o estado atual
+                else:
+                    self._carga_concluida.wait()  # primeira carga em andamento noutra thread
+                    continue
+            if self._carregar(geracao):
+                return
+
+    def _aplicar(self, operacoes):
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.append(operacoes)
+            # Sem estado e sem carga em andamento: a primeira carga já lê o que foi confirmado
+            if self._estado is not None:
+                self._aplicar_em(self._estado, operacoes)
+
+def _registrar(objeto, operacao):
+    inspect(objeto).session.info.setdefault(_CHAVE, []).append(operacao)
+
+def _proposta_gravada(mapper, conexao, proposta):
+    _registrar(proposta, ("proposta", ItemProposta(
+        proposta.id, proposta.responsavel_id, proposta.data_hora_reuniao, proposta.prazo_entrega,
+        proposta.tipo_processo, proposta.orgao_ambiental, proposta.tipo_trabalho, proposta.cliente_id)))
+
+def _proposta_removida(mapper, conexao, proposta):
+    _registrar(proposta, ("proposta_removida", proposta.id))
+
+def _funcionario_gravado(mapper, conexao, funcionario):
+    _registrar(funcionario, ("funcionario", (funcionario.id, funcionario.nome)))
+
+def _funcionario_removido(mapper, conexao, funcionario):
+    _registrar(funcionario, ("funcionario_removido", funcionario.id))
+
+for _modelo, _gravado, _removido in ((Proposta, _proposta_gravada, _proposta_removida),
+                                     (Funcionario, _funcionario_gravado, _funcionario_removido)):
+    event.listen(_modelo, "after_insert", _gravado)
+    event.listen(_modelo, "after_update", _gravado)
+    event.listen(_modelo, "after_delete", _removido)
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_apos_commit(session):
+    operacoes = session.info.pop(_CHAVE, None)
+    if operacoes:
+        for aplicar in _assinantes:
+            aplicar(operacoes)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE, None)
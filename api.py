@@ -0,0 +1,334 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import cache
+from agenda import agenda
+from atribuicao import indice_carga
+import crud
+from consultas import buscar_clientes, buscar_propostas
+from database import SessionLocal, criar_engine_async, init_db
+from log_config import registrar_consultas_lentas
+from metricas import instrumentar_engine, registro
+from models import Proposta, SessaoApi, TokenAgenda, Usuario
+from prazos import notificar_prazos
+from relatorios import blocos_csv, linhas_relatorio
+from seguranca import gerar_hash_async, gerar_token, token_hash, verificar_senha_async
+
+# Validade do token emitido no /login
+API_SESSAO_HORAS = float(os.getenv("API_SESSAO_HORAS", "12"))
+
+engine_async = criar_engine_async()
+registrar_consultas_lentas(engine_async.sync_engine)
+instrumentar_engine(engine_async.sync_engine)
+# Sem expirar no commit: as respostas são montadas depois do commit sem novas consultas
+SessaoAsync = async_sessionmaker(engine_async, expire_on_commit=False, autoflush=False)
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    init_db()
+    yield
+    await engine_async.dispose()
+
+app = FastAPI(title="Sistema de Propostas - Azevedo Ambiental", lifespan=ciclo_de_vida)
+
+async def obter_sessao():
+    async with SessaoAsync() as sessao:
+        yield sessao
+
+portador = HTTPBearer(auto_error=False)
+
+def _nao_autenticado():
+    return HTTPException(401, "Autenticação necessária.", headers={"WWW-Authenticate": "Bearer"})
+
+async def usuario_atual(credenciais: Optional[HTTPAuthorizationCredentials] = Depends(portador),
+                        sessao: AsyncSession = Depends(obter_sessao)):
+    """Usuário do token enviado em Authorization: Bearer; 401 sem token válido e dentro da validade."""
+    if credenciais is None:
+        raise _nao_autenticado()
+    usuario = (await sessao.execute(
+        select(Usuario).join(SessaoApi, SessaoApi.usuario_id == Usuario.id)
+        .where(SessaoApi.token_hash == token_hash(credenciais.credentials), SessaoApi.expira_em > datetime.now())
+    )).scalar_one_or_none()
+    if usuario is None:
+        raise _nao_autenticado()
+    return usuario
+
+async def administrador(usuario: Usuario = Depends(usuario_atual)):
+    if not usuario.is_admin:
+        raise HTTPException(403, "Apenas administradores.")
+    return usuario
+
+class ClienteEntrada(BaseModel):
+    cnpj_cpf: str
+    nome_requerente: str
+    telefone: str
+    email: str
+
+class PropostaEntrada(BaseModel):
+    cliente_id: int
+    orgao_ambiental: str
+    tipo_processo: str
+    renovacao: bool = False
+    numero_documento: Optional[str] = None
+    validade: date
+    mensal: bool = False
+    responsavel_id: Optional[int] = None
+    atribuir_automaticamente: bool = False  # sem responsavel_id: usa o funcionário menos carregado
+    tipo_trabalho: Optional[str] = None
+    data_hora_reuniao: Optional[datetime] = None
+    prazo_entrega: Optional[datetime] = None
+    observacoes: Optional[str] = None
+
+class FuncionarioEntrada(BaseModel):
+    nome: str
+    email: Optional[str] = None
+
+class FuncionarioEmail(BaseModel):
+    email: Optional[str] = None
+
+class UsuarioEntrada(BaseModel):
+    username: str
+    password: str
+    is_admin: bool = False
+
+class LoginEntrada(BaseModel):
+    username: str
+    password: str
+
+def _cliente(cliente):
+    return {"id": cliente.id, "cnpj_cpf": cliente.cnpj_cpf, "nome_requerente": cliente.nome_requerente,
+            "telefone": cliente.telefone, "email": cliente.email}
+
+def _proposta(proposta):
+    return {
+        "id": proposta.id,
+        "cliente_id": proposta.cliente_id,
+        "cliente": proposta.cliente.nome_requerente if proposta.cliente else None,
+        "orgao_ambiental": proposta.orgao_ambiental,
+        "tipo_processo": proposta.tipo_processo,
+        "renovacao": proposta.renovacao,
+        "numero_documento": proposta.numero_documento,
+        "validade": proposta.validade,
+        "mensal": proposta.mensal,
+        "responsavel_id": proposta.responsavel_id,
+        "responsavel": proposta.responsavel.nome if proposta.responsavel else None,
+        "tipo_trabalho": proposta.tipo_trabalho,
+        "data_hora_reuniao": proposta.data_hora_reuniao,
+        "prazo_entrega": proposta.prazo_entrega,
+        "observacoes": proposta.observacoes,
+    }
+
+def _pagina(pagina, serializar):
+    return {"itens": [serializar(item) for item in pagina], "proximo_cursor": pagina.proximo_cursor}
+
+def _data_hora(valor):
+    # crud.cadastrar_proposta recebe as datas no mesmo formato digitado no terminal
+    return valor.strftime("%Y-%m-%d %H:%M") if valor else None
+
+@app.post("/clientes", status_code=201)
+async def criar_cliente(dados: ClienteEntrada, sessao: AsyncSession = Depends(obter_sessao),
+                        _usuario: Usuario = Depends(usuario_atual)):
+    cliente_id = await sessao.run_sync(crud.cadastrar_cliente, dados.cnpj_cpf, dados.nome_requerente,
+                                       dados.telefone, dados.email, confirmar=False)
+    if cliente_id is None:
+        raise HTTPException(400, "Não foi possível cadastrar o cliente.")
+    return {"id": cliente_id}
+
+@app.get("/clientes")
+async def listar_clientes(nome: Optional[str] = None, cnpj_cpf: Optional[str] = None, cursor: Optional[str] = None,
+                          limite: int = Query(50, ge=1, le=500), sessao: AsyncSession = Depends(obter_sessao),
+                          _usuario: Usuario = Depends(usuario_atual)):
+    try:
+        return await sessao.run_sync(lambda s: _pagina(buscar_clientes(s, nome, cnpj_cpf, cursor, limite), _cliente))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.get("/clientes/{cliente_id}")
+async def obter_cliente(cliente_id: int, sessao: AsyncSession = Depends(obter_sessao),
+                        _usuario: Usuario = Depends(usuario_atual)):
+    cliente = await sessao.run_sync(cache.cliente_por_id, cliente_id)
+    if cliente is None:
+        raise HTTPException(404, "Cliente não encontrado.")
+    return _cliente(cliente)
+
+@app.post("/propostas", status_code=201)
+async def criar_proposta(dados: PropostaEntrada, sessao: AsyncSession = Depends(obter_sessao),
+                         _usuario: Usuario = Depends(usuario_atual)):
+    if await sessao.run_sync(cache.cliente_por_id, dados.cliente_id) is None:
+        raise HTTPException(404, "Cliente não encontrado.")
+    responsavel_id = dados.responsavel_id
+    if responsavel_id is None and dados.atribuir_automaticamente:
+        # Os índices podem precisar de uma carga síncrona do banco; ficam fora do laço de eventos
+        ocupados = await asyncio.to_thread(agenda.ocupados, dados.data_hora_reuniao, dados.prazo_entrega)
+        responsavel_id = await asyncio.to_thread(indice_carga.sugerir, None, ocupados)
+    conflitos = []
+    if responsavel_id is not None:
+        conflitos = await asyncio.to_thread(agenda.conflitos, responsavel_id, dados.data_hora_reuniao, dados.prazo_entrega)
+    proposta_id = await sessao.run_sync(
+        crud.cadastrar_proposta, dados.cliente_id, dados.orgao_ambiental, dados.tipo_processo, dados.renovacao,
+        dados.numero_documento, dados.validade.isoformat(), dados.mensal, responsavel_id, dados.tipo_trabalho,
+        _data_hora(dados.data_hora_reuniao), _data_hora(dados.prazo_entrega), dados.observacoes,
+    )
+    if proposta_id is None:
+        raise HTTPException(400, "Não foi possível cadastrar a proposta.")
+    return {"id": proposta_id, "responsavel_id": responsavel_id,
+            "conflitos": [{"tipo": c.tipo, "proposta_id": c.proposta_id, "momento": c.momento} for c in conflitos]}
+
+@app.get("/propostas")
+async def listar_propostas(nome_cliente: Optional[str] = None, orgao_ambiental: Optional[str] = None,
+                           tipo_processo: Optional[str] = None, responsavel_id: Optional[int] = None,
+                           validade_de: Optional[date] = None, validade_ate: Optional[date] = None,
+                           texto: Optional[str] = None, cursor: Optional[str] = None,
+                           limite: int = Query(50, ge=1, le=500), sessao: AsyncSession = Depends(obter_sessao),
+                           _usuario: Usuario = Depends(usuario_atual)):
+    try:
+        return await sessao.run_sync(lambda s: _pagina(buscar_propostas(
+            s, nome_cliente, orgao_ambiental, tipo_processo, responsavel_id, validade_de, validade_ate,
+            texto, cursor, limite), _proposta))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.get("/propostas/{proposta_id}")
+async def obter_proposta(proposta_id: int, sessao: AsyncSession = Depends(obter_sessao),
+                         _usuario: Usuario = Depends(usuario_atual)):
+    encontradas = await sessao.run_sync(lambda s: [_proposta(p) for p in s.query(Proposta).filter_by(id=proposta_id)])
+    if not encontradas:
+        raise HTTPException(404, "Proposta não encontrada.")
+    return encontradas[0]
+
+@app.get("/relatorios/propostas.csv")
+def relatorio_propostas(orgao_ambiental: Optional[str] = None, tipo_processo: Optional[str] = None,
+                        responsavel_id: Optional[int] = None, validade_de: Optional[date] = None,
+                        validade_ate: Optional[date] = None, _usuario: Usuario = Depends(usuario_atual)):
+    # Gerador síncrono com sessão própria: o Starlette o consome numa thread e envia cada bloco assim que fica pronto
+    def gerar():
+        db = SessionLocal()
+        try:
+            yield from blocos_csv(linhas_relatorio(db, orgao_ambiental=orgao_ambiental, tipo_processo=tipo_processo,
+                                                   responsavel_id=responsavel_id, validade_de=validade_de,
+                                                   validade_ate=validade_ate))
+        finally:
+            db.close()
+    return StreamingResponse(gerar(), media_type="text/csv; charset=utf-8",
+                             headers={"Content-Disposition": 'attachment; filename="propostas.csv"'})
+
+@app.get("/funcionarios")
+async def listar_funcionarios(sessao: AsyncSession = Depends(obter_sessao),
+                              _usuario: Usuario = Depends(usuario_atual)):
+    funcionarios = sorted(await sessao.run_sync(cache.listar_funcionarios), key=lambda f: f.nome)
+    return [{"id": f.id, "nome": f.nome, "email": f.email} for f in funcionarios]
+
+@app.post("/funcionarios/{funcionario_id}/agenda/token", status_code=201)
+async def criar_token_agenda(funcionario_id: int, sessao: AsyncSession = Depends(obter_sessao),
+                             _usuario: Usuario = Depends(usuario_atual)):
+    # Aplicativos de calendário não enviam Authorization: o feed é protegido por um segredo na URL.
+    # Um token novo substitui o anterior, que deixa de valer
+    if await sessao.run_sync(cache.funcionario_por_id, funcionario_id) is None:
+        raise HTTPException(404, "Funcionário não encontrado.")
+    token = gerar_token()
+    await sessao.execute(delete(TokenAgenda).where(TokenAgenda.funcionario_id == funcionario_id))
+    sessao.add(TokenAgenda(funcionario_id=funcionario_id, token_hash=token_hash(token), criado_em=datetime.now()))
+    await sessao.commit()
+    return {"token": token, "url": f"/funcionarios/{funcionario_id}/agenda.ics?token={token}"}
+
+@app.get("/funcionarios/{funcionario_id}/agenda.ics")
+async def agenda_funcionario(funcionario_id: int, token: Optional[str] = None,
+                             if_none_match: Optional[str] = Header(None), sessao: AsyncSession = Depends(obter_sessao)):
+    # Sem o token do funcionário a resposta é a mesma de um id inexistente: os ids não servem para varrer agendas
+    valido = token and (await sessao.execute(select(TokenAgenda.funcionario_id).where(
+        TokenAgenda.funcionario_id == funcionario_id, TokenAgenda.token_hash == token_hash(token)))).first()
+    if not valido:
+        raise HTTPException(404, "Funcionário não encontrado.")
+    feed = await asyncio.to_thread(agenda.ical, funcionario_id)
+    if feed is None:
+        raise HTTPException(404, "Funcionário não encontrado.")
+    texto, etag = feed
+    etag = f'"{etag}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(texto, media_type="text/calendar; charset=utf-8", headers={"ETag": etag})
+
+@app.post("/funcionarios", status_code=201)
+async def criar_funcionario(dados: FuncionarioEntrada, sessao: AsyncSession = Depends(obter_sessao),
+                            _usuario: Usuario = Depends(usuario_atual)):
+    funcionario_id = await sessao.run_sync(crud.cadastrar_funcionario, dados.nome, dados.email)
+    if funcionario_id is None:
+        raise HTTPException(400, "Não foi possível cadastrar o funcionário.")
+    return {"id": funcionario_id}
+
+@app.patch("/funcionarios/{funcionario_id}")
+async def alterar_email_funcionario(funcionario_id: int, dados: FuncionarioEmail,
+                                    sessao: AsyncSession = Depends(obter_sessao),
+                                    _usuario: Usuario = Depends(usuario_atual)):
+    # Sem e-mail o funcionário não recebe os avisos de prazo
+    if await sessao.run_sync(crud.atualizar_email_funcionario, funcionario_id, dados.email) is None:
+        raise HTTPException(404, "Funcionário não encontrado.")
+    return {"id": funcionario_id, "email": dados.email or None}
+
+@app.post("/usuarios", status_code=201)
+async def criar_usuario(dados: UsuarioEntrada, sessao: AsyncSession = Depends(obter_sessao),
+                        _admin: Usuario = Depends(administrador)):
+    # Só administradores cadastram usuários; o primeiro administrador vem do terminal (python main.py)
+    # O hash é calculado no pool de threads para não travar o laço de eventos
+    usuario = Usuario(username=dados.username, hashed_password=await gerar_hash_async(dados.password), is_admin=dados.is_admin)
+    sessao.add(usuario)
+    try:
+        await sessao.commit()
+    except IntegrityError:
+        await sessao.rollback()
+        raise HTTPException(409, "Nome de usuário já cadastrado.")
+    return {"id": usuario.id}
+
+@app.post("/login")
+async def login(dados: LoginEntrada, sessao: AsyncSession = Depends(obter_sessao)):
+    usuario = (await sessao.execute(select(Usuario).filter_by(username=dados.username))).scalar_one_or_none()
+    if usuario is None:
+        raise HTTPException(401, "Nome de usuário ou senha incorretos.")
+    valida, novo_hash = await verificar_senha_async(dados.password, usuario.hashed_password)
+    if not valida:
+        raise HTTPException(401, "Nome de usuário ou senha incorretos.")
+    if novo_hash:
+        usuario.hashed_password = novo_hash
+    agora = datetime.now()
+    token = gerar_token()
+    expira_em = agora + timedelta(hours=API_SESSAO_HORAS)
+    # As sessões vencidas do usuário saem a cada novo login, sem tarefa de limpeza à parte
+    await sessao.execute(delete(SessaoApi).where(SessaoApi.usuario_id == usuario.id, SessaoApi.expira_em <= agora))
+    sessao.add(SessaoApi(token_hash=token_hash(token), usuario_id=usuario.id, criado_em=agora, expira_em=expira_em))
+    await sessao.commit()
+    return {"token": token, "tipo": "bearer", "expira_em": expira_em,
+            "id": usuario.id, "username": usuario.username, "is_admin": usuario.is_admin}
+
+@app.post("/logout", status_code=204)
+async def logout(credenciais: Optional[HTTPAuthorizationCredentials] = Depends(portador),
+                 sessao: AsyncSession = Depends(obter_sessao), _usuario: Usuario = Depends(usuario_atual)):
+    await sessao.execute(delete(SessaoApi).where(SessaoApi.token_hash == token_hash(credenciais.credentials)))
+    await sessao.commit()
+
+@app.post("/prazos/verificar")
+async def verificar_prazos(sessao: AsyncSession = Depends(obter_sessao),
+                           _usuario: Usuario = Depends(usuario_atual)):
+    total = await sessao.run_sync(notificar_prazos)
+    await sessao.commit()
+    # O envio fica com o despachante do agendador (python agendador.py), um só para todos os workers da API
+    return {"avisos_enfileirados": total}
+
+@app.get("/metricas", response_class=PlainTextResponse)
+async def metricas():
+    # Métricas deste processo no formato texto do Prometheus
+    return registro.exportar_prometheus()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("api:app", host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")),
+                workers=int(os.getenv("API_WORKERS", "1")))
@@ -0,0 +1,166 @@
+import heapq
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from alteracoes import IndiceMemoria, assinar
+from database import SessionLocal
+from models import Funcionario, Proposta
+from log_config import configurar_logging
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# Recarga completa periódica: cobre gravações feitas por outros processos ou em massa fora do ORM
+ATRIBUICAO_RECARGA = float(os.getenv("ATRIBUICAO_RECARGA", "300"))  # segundos
+
+class _Cargas:
+    """Estado do índice de carga; só é lido ou alterado com o lock do índice."""
+
+    def __init__(self):
+        self.nomes = {}  # funcionario_id -> nome
+        self.carga = {}  # funcionario_id -> itens em aberto
+        self.baldes = defaultdict(dict)  # carga -> {funcionario_id: None}, na ordem de chegada
+        self.minimo = 0
+        self.itens = {}  # proposta_id -> (funcionario_id, {"prazo": datetime, "reuniao": datetime})
+        self.vencimentos = []  # heap de (momento, proposta_id, tipo)
+
+    def entrar(self, funcionario_id, nome):
+        if funcionario_id not in self.carga:
+            self.carga[funcionario_id] = 0
+            self.baldes[0][funcionario_id] = None
+            self.minimo = 0
+        self.nomes[funcionario_id] = nome
+
+    def sair(self, funcionario_id):
+        carga = self.carga.pop(funcionario_id, None)
+        if carga is not None:
+            del self.baldes[carga][funcionario_id]
+            self.nomes.pop(funcionario_id, None)
+
+    def mover(self, funcionario_id, delta):
+        carga = self.carga.get(funcionario_id)
+        if carga is None:
+            return
+        del self.baldes[carga][funcionario_id]
+        self.carga[funcionario_id] = carga + delta
+        self.baldes[carga + delta][funcionario_id] = None
+        if carga + delta < self.minimo:
+            self.minimo = carga + delta
+
+    def adicionar(self, proposta_id, funcionario_id, prazo_entrega, data_hora_reuniao, agora):
+        if funcionario_id is None:
+            return
+        abertos = {tipo: momento for tipo, momento in (("prazo", prazo_entrega), ("reuniao", data_hora_reuniao))
+                   if momento is not None and momento > agora}
+        if not abertos:
+            return
+        self.itens[proposta_id] = (funcionario_id, abertos)
+        for tipo, momento in abertos.items():
+            heapq.heappush(self.vencimentos, (momento, proposta_id, tipo))
+        self.mover(funcionario_id, len(abertos))
+
+    def remover(self, proposta_id):
+        funcionario_id, abertos = self.itens.pop(proposta_id, (None, {}))
+        if abertos:
+            # As entradas no heap ficam para trás e são ignoradas quando vencerem
+            self.mover(funcionario_id, -len(abertos))
+
+    def vencer(self, agora):
+        while self.vencimentos and self.vencimentos[0][0] <= agora:
+            momento, proposta_id, tipo = heapq.heappop(self.vencimentos)
+            funcionario_id, abertos = self.itens.get(proposta_id, (None, {}))
+            if abertos.get(tipo) != momento:
+                continue  # a proposta foi editada ou removida depois de entrar no heap
+            del abertos[tipo]
+            if not abertos:
+                del self.itens[proposta_id]
+            self.mover(funcionario_id, -1)
+
+class IndiceCarga(IndiceMemoria):
+    """Carga de cada funcionário (prazos de entrega e reuniões ainda por vir), mantida de forma incremental.
+
+    As cargas ficam numa fila de baldes (carga -> funcionários), então o menos carregado sai em
+    tempo constante; prazos e reuniões que passam saem da carga por um heap de vencimentos.
+    """
+
+    def __init__(self, fabrica_sessao=SessionLocal, recarga=ATRIBUICAO_RECARGA):
+        super().__init__(fabrica_sessao, recarga)
+
+    def _ler(self, db: Session):
+        """Lê só as propostas com prazo ou reunião futuros, pelo índice de prazo_entrega e de reunião."""
+        agora = datetime.now()
+        funcionarios = db.execute(select(Funcionario.id, Funcionario.nome).order_by(Funcionario.id)).all()
+        abertas = db.execute(
+            select(Proposta.id, Proposta.responsavel_id, Proposta.prazo_entrega, Proposta.data_hora_reuniao)
+            .where(Proposta.responsavel_id.is_not(None),
+                   or_(Proposta.prazo_entrega > agora, Proposta.data_hora_reuniao > agora))
+        ).all()
+        return agora, funcionarios, abertas
+
+    def _montar(self, dados):
+        agora, funcionarios, abertas = dados
+        estado = _Cargas()
+        for funcionario_id, nome in funcionarios:
+            estado.entrar(funcionario_id, nome)
+        for proposta_id, funcionario_id, prazo_entrega, data_hora_reuniao in abertas:
+            estado.adicionar(proposta_id, funcionario_id, prazo_entrega, data_hora_reuniao, agora)
+        logger.info(f"Índice de carga carregado: {len(funcionarios)} funcionários, {len(abertas)} propostas em aberto.")
+        return estado
+
+    def _aplicar_em(self, estado, operacoes):
+        agora = datetime.now()
+        for tipo, dados in operacoes:
+            if tipo == "proposta":
+                estado.remover(dados.proposta_id)
+                estado.adicionar(dados.proposta_id, dados.funcionario_id, dados.prazo_entrega,
+                                 dados.data_hora_reuniao, agora)
+            elif tipo == "proposta_removida":
+                estado.remover(dados)
+            elif tipo == "funcionario":
+                estado.entrar(*dados)
+            elif tipo == "funcionario_removido":
+                estado.sair(dados)
+
+    def _atual(self):
+        """Estado em dia para leitura; chamar com o lock."""
+        self._estado.vencer(datetime.now())
+        return self._estado
+
+    def carga(self, funcionario_id):
+        self._preparar()
+        with self._lock:
+            return self._atual().carga.get(funcionario_id)
+
+    def sugerir(self, elegiveis=None, evitar=()):
+        """Funcionário menos carregado; elegiveis limita os candidatos e evitar exclui (ex.: conflitos de agenda)."""
+        self._preparar()
+        with self._lock:
+            estado = self._atual()
+            if not estado.carga:
+                return None
+            # O mínimo só avança por baldes vazios, e cada um é pulado uma vez até uma carga menor aparecer
+            while not estado.baldes.get(estado.minimo):
+                estado.minimo += 1
+            carga, vistos = estado.minimo, 0
+            while vistos < len(estado.carga):
+                for funcionario_id in estado.baldes.get(carga, ()):
+                    vistos += 1
+                    if funcionario_id not in evitar and (elegiveis is None or funcionario_id in elegiveis):
+                        return funcionario_id
+                carga += 1
+            return None
+
+    def ranking(self):
+        """(funcionario_id, nome, carga) do menos para o mais carregado."""
+        self._preparar()
+        with self._lock:
+            estado = self._atual()
+            return sorted(((f, estado.nomes[f], c) for f, c in estado.carga.items()), key=lambda item: (item[2], item[0]))
+
+indice_carga = IndiceCarga()
+# Gravações pelo ORM entram no índice depois do commit
+assinar(indice_carga._aplicar)
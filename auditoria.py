@@ -0,0 +1,147 @@
+import argparse
+import json
+import logging
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, event, inspect, insert, select
+from sqlalchemy.orm import Session
+from models import Cliente, EventoAuditoria, Proposta, Usuario
+from log_config import configurar_logging
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+AUDITADOS = (Cliente, Proposta, Usuario)
+# Campos cujo valor nunca vai para a trilha: fica registrado só que mudaram
+OCULTOS = {Usuario: {"hashed_password"}}
+OCULTO = "***"
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+def _desserializar(coluna, valor):
+    if valor is None or valor == OCULTO:
+        return valor
+    if isinstance(coluna.type, DateTime):
+        return datetime.fromisoformat(valor)
+    if isinstance(coluna.type, Date):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+def _diferencas(objeto, operacao):
+    """{campo: [antes, depois]} do objeto neste flush; inclusão e exclusão trazem todos os campos."""
+    estado = inspect(objeto)
+    ocultos = OCULTOS.get(type(objeto), ())
+    alteracoes = {}
+    for atributo in estado.mapper.column_attrs:
+        campo = atributo.key
+        if operacao == "inclusao":
+            antes, depois = None, estado.dict.get(campo)
+        elif operacao == "exclusao":
+            antes, depois = estado.dict.get(campo), None
+        else:
+            historico = estado.attrs[campo].history
+            if not historico.has_changes():
+                continue
+            antes = historico.deleted[0] if historico.deleted else None
+            depois = historico.added[0] if historico.added else None
+        if antes == depois:
+            continue
+        if campo in ocultos:
+            antes, depois = (OCULTO if v is not None else None for v in (antes, depois))
+        alteracoes[campo] = [_serializar(antes), _serializar(depois)]
+    return alteracoes
+
+@event.listens_for(Session, "after_flush")
+def _registrar_eventos(session, contexto):
+    # Ainda dentro do flush: new/dirty/deleted e o histórico dos atributos são os do que acabou de ser gravado,
+    # e os ids das inclusões já existem
+    agora = datetime.now()
+    eventos = []
+    for operacao, objetos in (("inclusao", session.new), ("alteracao", session.dirty), ("exclusao", session.deleted)):
+        for objeto in objetos:
+            if not isinstance(objeto, AUDITADOS):
+                continue
+            alteracoes = _diferencas(objeto, operacao)
+            if alteracoes:
+                eventos.append({
+                    "entidade": type(objeto).__tablename__,
+                    "entidade_id": inspect(objeto).mapper.primary_key_from_instance(objeto)[0],
+                    "operacao": operacao,
+                    "alteracoes": json.dumps(alteracoes, ensure_ascii=False, separators=(",", ":")),
+                    "criado_em": agora,
+                })
+    if eventos:
+        # Um INSERT em lote por flush, na mesma transação: a trilha é confirmada ou desfeita junto com os dados
+        session.connection().execute(insert(EventoAuditoria), eventos)
+
+def historico(db: Session, modelo, entidade_id: int, desde: datetime = None, ate: datetime = None):
+    """Eventos da entidade em ordem cronológica: (momento, operação, {campo: [antes, depois]})."""
+    consulta = select(EventoAuditoria.criado_em, EventoAuditoria.operacao, EventoAuditoria.alteracoes).where(
+        EventoAuditoria.entidade == modelo.__tablename__, EventoAuditoria.entidade_id == entidade_id)
+    if desde is not None:
+        consulta = consulta.where(EventoAuditoria.criado_em >= desde)
+    if ate is not None:
+        consulta = consulta.where(EventoAuditoria.criado_em <= ate)
+    linhas = db.execute(consulta.order_by(EventoAuditoria.criado_em, EventoAuditoria.id))
+    return [(momento, operacao, json.loads(alteracoes)) for momento, operacao, alteracoes in linhas]
+
+def estado_em(db: Session, modelo, entidade_id: int, momento: datetime):
+    """Campos da entidade como estavam no momento, ou None se ela não existia.
+
+    Parte do estado atual e desfaz, do mais novo para o mais antigo, só os eventos posteriores ao momento:
+    o custo acompanha o que mudou desde então, não o histórico inteiro, e vale também para registros
+    anteriores à trilha.
+    """
+    colunas = {coluna.key: coluna for coluna in modelo.__table__.columns}
+    atual = db.execute(select(*colunas.values()).where(modelo.__table__.c.id == entidade_id)).mappings().first()
+    estado = dict(atual) if atual is not None else None
+    posteriores = db.execute(
+        select(EventoAuditoria.operacao, EventoAuditoria.alteracoes)
+        .where(EventoAuditoria.entidade == modelo.__tablename__, EventoAuditoria.entidade_id == entidade_id,
+               EventoAuditoria.criado_em > momento)
+        .order_by(EventoAuditoria.criado_em.desc(), EventoAuditoria.id.desc())
+    )
+    for operacao, alteracoes in posteriores:
+        if operacao == "inclusao":
+            estado = None
+            continue
+        if operacao == "exclusao" or estado is None:
+            # Exclusão traz todos os campos; sem ela (linha apagada fora do ORM) reconstrói só o que os eventos contam
+            estado = {campo: None for campo in colunas}
+        for campo, (antes, _) in json.loads(alteracoes).items():
+            if campo in colunas:
+                estado[campo] = _desserializar(colunas[campo], antes)
+    return estado
+
+def proposta_em(db: Session, proposta_id: int, momento: datetime):
+    return estado_em(db, Proposta, proposta_id, momento)
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    modelos = {modelo.__tablename__: modelo for modelo in AUDITADOS}
+    parser = argparse.ArgumentParser(description="Histórico de alterações de clientes, propostas e usuários.")
+    parser.add_argument("entidade", choices=sorted(modelos))
+    parser.add_argument("id", type=int)
+    parser.add_argument("--em", type=datetime.fromisoformat, help="mostra a entidade como estava neste momento (YYYY-MM-DD HH:MM)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.em:
+            estado = estado_em(db, modelos[args.entidade], args.id, args.em)
+            if estado is None:
+                print(f"{args.entidade} {args.id} não existia em {args.em:%Y-%m-%d %H:%M}.")
+            else:
+                for campo, valor in estado.items():
+                    print(f"{campo:<20} {valor}")
+        else:
+            for momento, operacao, alteracoes in historico(db, modelos[args.entidade], args.id):
+                print(f"{momento:%Y-%m-%d %H:%M:%S}  {operacao}")
+                for campo, (antes, depois) in alteracoes.items():
+                    print(f"    {campo}: {antes!r} -> {depois!r}")
+    finally:
+        db.close()
@@ -0,0 +1,124 @@
+"""Teste de carga da API HTTP: requisições por segundo e latências p50/p99.
+
+Sobe o servidor (uvicorn) sobre uma base sintética temporária e dispara
+uma mistura de buscas, leituras, cadastros e logins com N clientes
+simultâneos. Requer fastapi, uvicorn, aiosqlite e httpx:
+
+    python benchmarks/bench_api.py --propostas 100000 --concorrencia 50 --duracao 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, RAIZ)
+# Mesmo custo de bcrypt na geração dos usuários e no servidor, para o login não pagar um rehash
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+import httpx
+
+from database import criar_engine
+from gerador import ORGAOS, TIPOS_PROCESSO, gerar
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+def requisicoes(quantidades, aleatorio):
+    """Mistura de operações típica de um dia de trabalho da equipe."""
+    contador = 0
+    while True:
+        contador += 1
+        sorteio = aleatorio.random()
+        if sorteio < 0.35:
+            yield "GET /propostas", "GET", "/propostas", {"params": {"orgao_ambiental": aleatorio.choice(ORGAOS), "tipo_processo": aleatorio.choice(TIPOS_PROCESSO)}}
+        elif sorteio < 0.50:
+            yield "GET /propostas?nome", "GET", "/propostas", {"params": {"nome_cliente": f"Requerente {aleatorio.randint(1, quantidades['clientes'])}"}}
+        elif sorteio < 0.75:
+            yield "GET /clientes/{id}", "GET", f"/clientes/{aleatorio.randint(1, quantidades['clientes'])}", {}
+        elif sorteio < 0.85:
+            yield "POST /clientes", "POST", "/clientes", {"json": {"cnpj_cpf": f"carga-{os.getpid()}-{contador}-{aleatorio.random()}", "nome_requerente": "Carga", "telefone": "21", "email": "carga@example.com"}}
+        elif sorteio < 0.95:
+            yield "POST /propostas", "POST", "/propostas", {"json": {"cliente_id": aleatorio.randint(1, quantidades["clientes"]), "orgao_ambiental": "INEA", "tipo_processo": "LO", "validade": "2030-01-01", "responsavel_id": 1}}
+        else:
+            yield "POST /login", "POST", "/login", {"json": {"username": f"usuario{aleatorio.randint(1, quantidades['usuarios'])}", "password": "senha"}}
+
+async def carga(url, quantidades, concorrencia, duracao):
+    latencias = defaultdict(list)
+    erros = defaultdict(int)
+    fim = time.perf_counter() + duracao
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        async def usuario(n):
+            # Cada cliente simultâneo entra uma vez e usa o token em todas as requisições
+            resposta = await cliente.post("/login", json={"username": f"usuario{n % quantidades['usuarios'] + 1}", "password": "senha"})
+            resposta.raise_for_status()
+            cabecalhos = {"Authorization": f"Bearer {resposta.json()['token']}"}
+            for nome, metodo, caminho, opcoes in requisicoes(quantidades, random.Random(n)):
+                if time.perf_counter() >= fim:
+                    return
+                inicio = time.perf_counter()
+                resposta = await cliente.request(metodo, caminho, headers=cabecalhos, **opcoes)
+                latencias[nome].append(time.perf_counter() - inicio)
+                if resposta.status_code >= 400:
+                    erros[nome] += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario(n) for n in range(concorrencia)))
+        total = time.perf_counter() - inicio
+    return latencias, erros, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--propostas", type=int, default=10000)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1, help="processos do uvicorn")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url_banco = f"sqlite:///{os.path.join(tmp, 'api.db')}"
+        engine = criar_engine(url_banco)
+        quantidades = gerar(engine, args.propostas)
+        engine.dispose()
+
+        porta = porta_livre()
+        ambiente = dict(os.environ, DATABASE_URL=url_banco)
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--port", str(porta), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=RAIZ, env=ambiente,
+        )
+        url = f"http://127.0.0.1:{porta}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{url}/funcionarios")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            latencias, erros, total = asyncio.run(carga(url, quantidades, args.concorrencia, args.duracao))
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+    todas = [v for valores in latencias.values() for v in valores]
+    print(f"{len(todas)} requisições em {total:.1f}s com {args.concorrencia} clientes: {len(todas) / total:.0f} req/s, "
+          f"p50 {percentil(todas, 0.50) * 1000:.1f} ms, p99 {percentil(todas, 0.99) * 1000:.1f} ms")
+    print(f"{'operação':<22} {'req':>7} {'erros':>6} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for nome, valores in sorted(latencias.items()):
+        print(f"{nome:<22} {len(valores):>7} {erros[nome]:>6} {percentil(valores, 0.50) * 1000:>9.1f} {percentil(valores, 0.99) * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
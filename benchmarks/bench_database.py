@@ -0,0 +1,94 @@
+"""Compara o engine SQLite padrão com o perfil ajustado de database.criar_engine.
+
+Mede inserções com commit por linha (como crud.cadastrar_cliente), inserção
+em lote, consultas por cnpj_cpf e escrita concorrente entre threads:
+
+    python benchmarks/bench_database.py --linhas 2000 --threads 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import criar_engine
+from models import Base, Cliente
+
+def medir(fabrica_engine, linhas, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = fabrica_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Sessao = sessionmaker(bind=engine)
+        resultado = {}
+
+        inicio = time.perf_counter()
+        db = Sessao()
+        for i in range(linhas):
+            db.add(Cliente(cnpj_cpf=f"u{i}", nome_requerente=f"Cliente {i}", telefone="21", email="c@x"))
+            db.commit()
+        db.close()
+        resultado["insercao_commit_por_linha"] = linhas / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with engine.begin() as conexao:
+            conexao.execute(insert(Cliente), [
+                {"cnpj_cpf": f"l{i}", "nome_requerente": f"Cliente {i}", "telefone": "21", "email": "c@x"}
+                for i in range(linhas * 10)
+            ])
+        resultado["insercao_em_lote"] = linhas * 10 / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        db = Sessao()
+        for i in range(linhas):
+            db.execute(select(Cliente.id).filter_by(cnpj_cpf=f"l{i}")).scalar()
+        db.close()
+        resultado["consultas"] = linhas / (time.perf_counter() - inicio)
+
+        bloqueios = []
+        por_thread = max(linhas // threads, 1)
+
+        def escritor(n):
+            db = Sessao()
+            for i in range(por_thread):
+                try:
+                    db.add(Cliente(cnpj_cpf=f"t{n}-{i}", nome_requerente="Concorrente", telefone="21", email="c@x"))
+                    db.commit()
+                except OperationalError:
+                    db.rollback()
+                    bloqueios.append(1)
+            db.close()
+
+        inicio = time.perf_counter()
+        trabalhadores = [threading.Thread(target=escritor, args=(n,)) for n in range(threads)]
+        for t in trabalhadores:
+            t.start()
+        for t in trabalhadores:
+            t.join()
+        resultado["insercao_concorrente"] = por_thread * threads / (time.perf_counter() - inicio)
+        resultado["erros_database_locked"] = len(bloqueios)
+        engine.dispose()
+        return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    padrao = medir(create_engine, args.linhas, args.threads)
+    ajustado = medir(criar_engine, args.linhas, args.threads)
+    print(f"{'medida':<28} {'padrão':>12} {'ajustado':>12} {'ganho':>8}")
+    for medida in padrao:
+        a, b = padrao[medida], ajustado[medida]
+        ganho = f"{b / a:.1f}x" if a and medida != "erros_database_locked" else ""
+        print(f"{medida:<28} {a:>12.0f} {b:>12.0f} {ganho:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Tempo de partida do main.py: até o menu aparecer e até a primeira escolha ser atendida.
+
+Executa o programa de verdade (novo interpretador a cada vez) sobre uma base
+temporária: a primeira execução cria o esquema e os funcionários; as demais
+medem a partida normal. A meta vale para o menu; o tempo até "pronto" mostra
+quanto a inicialização em segundo plano ainda leva depois disso:
+
+    python benchmarks/bench_inicializacao.py --repeticoes 10 --meta-ms 200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+PROMPT = "Escolha uma opção".encode()
+
+def partida(ambiente):
+    """Milissegundos até o primeiro prompt do menu e até o programa atender a opção Sair."""
+    inicio = time.perf_counter()
+    processo = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=RAIZ, env=ambiente,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    saida = b""
+    while PROMPT not in saida:
+        parte = processo.stdout.read1(4096)
+        if not parte:
+            raise RuntimeError(f"main.py terminou antes do menu: {saida.decode(errors='replace')}")
+        saida += parte
+    menu = (time.perf_counter() - inicio) * 1000
+    # Sair é respondido assim que a inicialização termina, o que dá o tempo até o programa estar pronto
+    processo.communicate(b"3\n")
+    return menu, (time.perf_counter() - inicio) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--meta-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'partida.db')}",
+                        LOG_ARQUIVO=os.path.join(tmp, "app.log"))
+        primeira = partida(ambiente)
+        menus, prontos = zip(*(partida(ambiente) for _ in range(args.repeticoes)))
+
+    mediana = statistics.median(menus)
+    print(f"primeira execução (cria o banco): menu {primeira[0]:.0f} ms, pronto {primeira[1]:.0f} ms")
+    print(f"partida normal até o menu: mediana {mediana:.0f} ms, mínimo {min(menus):.0f} ms, máximo {max(menus):.0f} ms")
+    print(f"partida normal até pronto: mediana {statistics.median(prontos):.0f} ms, máximo {max(prontos):.0f} ms")
+    print(f"meta de {args.meta_ms:.0f} ms até o menu: {'atingida' if mediana <= args.meta_ms else 'NÃO atingida'}")
+    sys.exit(0 if mediana <= args.meta_ms else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Vazão (mensagens/s) do envio de notificações contra um servidor SMTP local.
+
+Compara o envio antigo (uma conexão por mensagem) com o DespachanteNotificacoes
+(caixa de saída + pool de conexões + workers). Requer aiosmtpd:
+
+    pip install aiosmtpd
+    python benchmarks/bench_notificacoes.py --latencia-ms 20
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import email_utils
+from models import Base, NotificacaoPendente
+from notificacoes import DespachanteNotificacoes, enfileirar_email
+
+class Sumidouro:
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.recebidas = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        self.recebidas += 1
+        return '250 OK'
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def envio_por_conexao(total):
+    # Comportamento anterior: conecta, envia e desconecta a cada mensagem
+    for i in range(total):
+        server = smtplib.SMTP(email_utils.SMTP_SERVER, email_utils.SMTP_PORT)
+        msg = email_utils.montar_mensagem(f"func{i}@example.com", "Prazo", "Mensagem de teste")
+        server.sendmail(email_utils.SMTP_REMETENTE, msg['To'], msg.as_string())
+        server.quit()
+
+def envio_despachante(total, workers, tamanho_lote):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        fabrica = sessionmaker(bind=engine)
+        db = fabrica()
+        for i in range(total):
+            enfileirar_email(db, f"func{i}@example.com", "Prazo", "Mensagem de teste")
+        db.commit()
+        db.close()
+        despachante = DespachanteNotificacoes(fabrica_sessao=fabrica, workers=workers, tamanho_lote=tamanho_lote)
+        inicio = time.perf_counter()
+        while sum(despachante.processar_pendentes()):
+            pass
+        duracao = time.perf_counter() - inicio
+        despachante.parar()
+        db = fabrica()
+        enviadas = db.query(NotificacaoPendente).filter_by(status='enviada').count()
+        db.close()
+        engine.dispose()
+        assert enviadas == total, f"{enviadas} de {total} enviadas"
+        return duracao
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quantidades', type=int, nargs='+', default=[1, 10, 1000])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--tamanho-lote', type=int, default=50)
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help="atraso simulado por mensagem no servidor")
+    args = parser.parse_args()
+
+    sumidouro = Sumidouro(args.latencia_ms / 1000)
+    controller = Controller(sumidouro, hostname='127.0.0.1', port=porta_livre())
+    controller.start()
+    email_utils.SMTP_SERVER, email_utils.SMTP_PORT = controller.hostname, controller.port
+    email_utils.SMTP_STARTTLS = False
+    email_utils.SMTP_USERNAME = ''
+    try:
+        print(f"{'mensagens':>10} {'conexão/msg (msg/s)':>22} {'despachante (msg/s)':>22}")
+        for total in args.quantidades:
+            inicio = time.perf_counter()
+            envio_por_conexao(total)
+            antigo = total / (time.perf_counter() - inicio)
+            novo = total / envio_despachante(total, args.workers, args.tamanho_lote)
+            print(f"{total:>10} {antigo:>22.1f} {novo:>22.1f}")
+    finally:
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
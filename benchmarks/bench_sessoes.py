@@ -0,0 +1,89 @@
+"""Memória ao longo de um lote longo: sessão global única contra uma sessão por operação.
+
+Repete cadastros de clientes e propostas, uma página de busca e, de tempos em
+tempos, um cadastro que falha no commit (usuário duplicado). Mede com o
+tracemalloc a memória Python em pontos do lote, o tamanho do mapa de
+identidade e quantas operações falharam:
+
+    python benchmarks/bench_sessoes.py --operacoes 20000 --pontos 10
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from consultas import buscar_propostas
+from database import criar_engine, sessao
+from gerador import gerar
+
+FALHA_A_CADA = 500
+
+def _operacao(db, i):
+    """Uma rodada do lote; devolve quantas chamadas do crud falharam."""
+    falhas = 0
+    cliente_id = crud.cadastrar_cliente(db, f"sessao-{i}", f"Cliente Sessão {i}", "21", "sessao@example.com", confirmar=False)
+    falhas += cliente_id is None
+    falhas += crud.cadastrar_proposta(db, cliente_id or 1, "INEA", "LO", False, None, "2030-01-01", False, 1,
+                                      "vistoria", None, "2030-01-01 10:00", None) is None
+    len(buscar_propostas(db, orgao_ambiental="INEA", limite=50))
+    if i % FALHA_A_CADA == 0:
+        # usuario1 já existe: o commit falha com IntegrityError
+        falhas += crud.cadastrar_usuario(db, "usuario1", "senha", False) is None
+    return falhas
+
+def medir(modo, operacoes, pontos):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = criar_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        gerar(engine, 1000, usuarios=1)
+        if modo == "global":
+            # Como o propostas.py antigo: uma sessão do sessionmaker padrão, aberta no início e nunca fechada
+            global_ = sessionmaker(bind=engine)()
+        else:
+            fabrica = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        serie, falhas = [], 0
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        for i in range(1, operacoes + 1):
+            if modo == "global":
+                falhas += _operacao(global_, i)
+            else:
+                with sessao(fabrica) as db:
+                    falhas += _operacao(db, i)
+            if i % (operacoes // pontos) == 0:
+                gc.collect()
+                mapa = len(global_.identity_map) if modo == "global" else 0
+                serie.append((i, tracemalloc.get_traced_memory()[0] / 2**20, mapa))
+        duracao = time.perf_counter() - inicio
+        tracemalloc.stop()
+        if modo == "global":
+            global_.close()
+        engine.dispose()
+    return {"serie": serie, "falhas": falhas, "ops_por_segundo": operacoes / duracao}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operacoes", type=int, default=20000)
+    parser.add_argument("--pontos", type=int, default=10)
+    args = parser.parse_args()
+
+    esperadas = args.operacoes // FALHA_A_CADA
+    for modo in ("global", "por_operacao"):
+        resultado = medir(modo, args.operacoes, args.pontos)
+        print(f"\n{modo}: {resultado['ops_por_segundo']:.0f} rodadas/s, {resultado['falhas']} falhas "
+              f"({esperadas} provocadas)")
+        print(f"  {'rodada':>8} {'memória (MiB)':>14} {'mapa de identidade':>19}")
+        for rodada, memoria, mapa in resultado["serie"]:
+            print(f"  {rodada:>8} {memoria:>14.2f} {mapa:>19}")
+        primeira, ultima = resultado["serie"][0][1], resultado["serie"][-1][1]
+        print(f"  crescimento do primeiro ao último ponto: {ultima - primeira:+.2f} MiB")
+
+if __name__ == "__main__":
+    main()
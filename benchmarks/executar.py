@@ -0,0 +1,169 @@
+"""Suíte de benchmarks do sistema de propostas.
+
+Gera uma base sintética por escala, cronometra cadastro de clientes e
+propostas, autenticação, varredura de prazos e despacho de notificações
+(contra um SMTP falso em memória) e grava os resultados em JSON:
+
+    python benchmarks/executar.py --escalas 1k 100k --saida atual.json
+    python benchmarks/executar.py --escalas 1k --comparar atual.json
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from database import criar_engine
+from email_utils import PoolSMTP
+from gerador import gerar
+from notificacoes import DespachanteNotificacoes
+from prazos import buscar_prazos, notificar_prazos
+
+ESCALAS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+class SumidouroSMTP:
+    """Servidor SMTP falso: aceita as mensagens sem rede, para medir só o nosso lado."""
+
+    recebidas = 0
+
+    def sendmail(self, remetente, destinatario, mensagem):
+        SumidouroSMTP.recebidas += 1
+
+    def quit(self):
+        pass
+
+@contextlib.contextmanager
+def _sem_interacao():
+    # cadastrar_cliente pede confirmação no terminal; o benchmark sempre confirma
+    input_original = builtins.input
+    builtins.input = lambda *args: "s"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = input_original
+
+def _medida(segundos, operacoes):
+    return {"segundos": round(segundos, 6), "operacoes": operacoes,
+            "ops_por_segundo": round(operacoes / segundos, 3) if segundos else None}
+
+def executar_escala(nome, propostas, repeticoes_crud, logins):
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = criar_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Sessao = sessionmaker(bind=engine, autoflush=False)
+
+        inicio = time.perf_counter()
+        quantidades = gerar(engine, propostas)
+        resultados["geracao_em_lote"] = _medida(time.perf_counter() - inicio, sum(quantidades.values()))
+
+        db = Sessao()
+        with _sem_interacao():
+            inicio = time.perf_counter()
+            for i in range(repeticoes_crud):
+                crud.cadastrar_cliente(db, f"bench-{i}", f"Cliente Bench {i}", "21", "bench@example.com")
+            resultados["cadastro_cliente"] = _medida(time.perf_counter() - inicio, repeticoes_crud)
+
+            inicio = time.perf_counter()
+            for i in range(repeticoes_crud):
+                crud.cadastrar_proposta(db, (i % quantidades["clientes"]) + 1, "INEA", "LO", False, None, "2030-01-01",
+                                        False, 1, "vistoria", None, "2030-01-01 10:00", None)
+            resultados["cadastro_proposta"] = _medida(time.perf_counter() - inicio, repeticoes_crud)
+        db.close()
+
+        db = Sessao()
+        inicio = time.perf_counter()
+        for i in range(logins):
+            assert crud.autenticar_usuario(db, f"usuario{(i % quantidades['usuarios']) + 1}", "senha")
+        resultados["autenticacao"] = _medida(time.perf_counter() - inicio, logins)
+        db.close()
+
+        db = Sessao()
+        agora = datetime.now()
+        melhor, encontrados = None, 0
+        for _ in range(3):
+            inicio = time.perf_counter()
+            encontrados = len(buscar_prazos(db, agora))
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+            db.expunge_all()
+        resultados["varredura_prazos"] = _medida(melhor, encontrados)
+
+        inicio = time.perf_counter()
+        enfileirados = notificar_prazos(db, agora)
+        db.commit()
+        resultados["enfileiramento_notificacoes"] = _medida(time.perf_counter() - inicio, enfileirados)
+        db.close()
+
+        SumidouroSMTP.recebidas = 0
+        despachante = DespachanteNotificacoes(fabrica_sessao=Sessao, pool=PoolSMTP(fabrica=SumidouroSMTP))
+        inicio = time.perf_counter()
+        while sum(despachante.processar_pendentes()):
+            pass
+        resultados["despacho_notificacoes"] = _medida(time.perf_counter() - inicio, SumidouroSMTP.recebidas)
+        despachante.parar()
+        engine.dispose()
+    return {"propostas": propostas, "quantidades": quantidades, "resultados": resultados}
+
+def comparar(atual, anterior, tolerancia):
+    """Retorna as medidas cuja vazão caiu mais que a tolerância em relação à execução anterior."""
+    regressoes = []
+    for escala, dados in atual["escalas"].items():
+        base = anterior.get("escalas", {}).get(escala)
+        if not base:
+            continue
+        for medida, valor in dados["resultados"].items():
+            antes = base["resultados"].get(medida, {}).get("ops_por_segundo")
+            agora = valor.get("ops_por_segundo")
+            if antes and agora is not None and agora < antes * (1 - tolerancia):
+                regressoes.append((escala, medida, antes, agora))
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", nargs="+", choices=sorted(ESCALAS), default=["1k"])
+    parser.add_argument("--repeticoes-crud", type=int, default=200, help="cadastros individuais via crud por escala")
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--saida", default="resultados_benchmark.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="queda de vazão aceita antes de acusar regressão")
+    args = parser.parse_args()
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "escalas": {},
+    }
+    for escala in args.escalas:
+        print(f"Executando escala {escala}...", flush=True)
+        relatorio["escalas"][escala] = executar_escala(escala, ESCALAS[escala], args.repeticoes_crud, args.logins)
+        for medida, valor in relatorio["escalas"][escala]["resultados"].items():
+            print(f"  {medida:<30} {valor['operacoes']:>10} ops  {valor['segundos']:>10.3f}s  {valor['ops_por_segundo'] or 0:>12.1f} ops/s")
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.tolerancia)
+        for escala, medida, antes, agora in regressoes:
+            print(f"REGRESSÃO {escala}/{medida}: {antes:.1f} -> {agora:.1f} ops/s")
+        if regressoes:
+            sys.exit(1)
+        print("Nenhuma regressão acima da tolerância.")
+
+if __name__ == "__main__":
+    main()
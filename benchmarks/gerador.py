@@ -0,0 +1,101 @@
+"""Gerador de dados sintéticos para Funcionario, Usuario, Cliente e Proposta.
+
+Os dados são determinísticos (semente fixa) e inseridos em lotes com
+executemany, o que permite montar bases de 1 mil a 1 milhão de propostas:
+
+    python benchmarks/gerador.py --propostas 100000 --url sqlite:///bench.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy import insert
+
+from models import Base, Cliente, Funcionario, Proposta, Usuario
+
+ORGAOS = ("Municipal", "INEA", "ANA", "CETESB")
+TIPOS_PROCESSO = ("LO", "Avaliação Preliminar", "LI", "Certificados")
+TIPOS_TRABALHO = ("reunir documentação", "planta", "vistoria", "cotação", "relatório", "criação de planilhas", "cálculos")
+TAMANHO_LOTE = 10000
+
+def _em_lotes(conexao, modelo, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE:
+            conexao.execute(insert(modelo), lote)
+            lote = []
+    if lote:
+        conexao.execute(insert(modelo), lote)
+
+def gerar(engine, propostas, clientes=None, funcionarios=None, usuarios=20, senha="senha", semente=42, agora=None):
+    """Popula o banco e retorna as quantidades geradas por tabela."""
+    from seguranca import gerar_hash
+
+    aleatorio = random.Random(semente)
+    agora = agora or datetime.now()
+    clientes = clientes or max(propostas // 5, 1)
+    funcionarios = funcionarios or max(min(propostas // 1000, 200), 9)
+    Base.metadata.create_all(engine)
+    # Um único hash reaproveitado: o custo do bcrypt não deve dominar a geração
+    hashed_password = gerar_hash(senha)
+    with engine.begin() as conexao:
+        _em_lotes(conexao, Funcionario, (
+            {"id": i, "nome": f"Funcionário {i}", "email": f"funcionario{i}@example.com"}
+            for i in range(1, funcionarios + 1)
+        ))
+        _em_lotes(conexao, Usuario, (
+            {"id": i, "username": f"usuario{i}", "hashed_password": hashed_password, "is_admin": i == 1}
+            for i in range(1, usuarios + 1)
+        ))
+        _em_lotes(conexao, Cliente, (
+            {"id": i, "cnpj_cpf": f"{i:014d}", "nome_requerente": f"Requerente {i}",
+             "telefone": f"(21) 9{i % 100000000:08d}", "email": f"cliente{i}@example.com"}
+            for i in range(1, clientes + 1)
+        ))
+
+        def linhas_propostas():
+            for i in range(1, propostas + 1):
+                renovacao = aleatorio.random() < 0.3
+                prazo = agora + timedelta(minutes=aleatorio.randint(-60 * 24 * 30, 60 * 24 * 90))
+                reuniao = prazo - timedelta(days=aleatorio.randint(1, 20)) if aleatorio.random() < 0.5 else None
+                yield {
+                    "id": i,
+                    "cliente_id": aleatorio.randint(1, clientes),
+                    "orgao_ambiental": aleatorio.choice(ORGAOS),
+                    "tipo_processo": aleatorio.choice(TIPOS_PROCESSO),
+                    "renovacao": renovacao,
+                    "numero_documento": f"DOC-{i}" if renovacao else None,
+                    "validade": date.today() + timedelta(days=aleatorio.randint(-365, 5 * 365)),
+                    "mensal": aleatorio.random() < 0.2,
+                    "responsavel_id": aleatorio.randint(1, funcionarios),
+                    "tipo_trabalho": aleatorio.choice(TIPOS_TRABALHO),
+                    "data_hora_reuniao": reuniao,
+                    "prazo_entrega": prazo,
+                    "observacoes": f"Proposta sintética {i}",
+                }
+
+        _em_lotes(conexao, Proposta, linhas_propostas())
+    return {"funcionarios": funcionarios, "usuarios": usuarios, "clientes": clientes, "propostas": propostas}
+
+def main():
+    from database import criar_engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--propostas", type=int, default=1000)
+    parser.add_argument("--url", default="sqlite:///bench.db")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = criar_engine(args.url)
+    inicio = time.perf_counter()
+    quantidades = gerar(engine, args.propostas, semente=args.semente)
+    print(f"Gerados {quantidades} em {time.perf_counter() - inicio:.1f}s")
+
+if __name__ == "__main__":
+    main()
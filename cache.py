@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from models import Cliente, Funcionario
+from metricas import registro
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))  # segundos; 0 desliga o cache
+CACHE_MAX = int(os.getenv("CACHE_MAX", "2048"))  # entradas por cache
+
+# Cópias somente leitura: o cache não guarda objetos ligados a uma sessão
+FuncionarioCache = namedtuple("FuncionarioCache", "id nome email")
+ClienteCache = namedtuple("ClienteCache", "id cnpj_cpf nome_requerente telefone email")
+
+_AUSENTE = object()
+
+class CacheLRU:
+    """LRU com expiração por tempo e contagem de acertos e falhas."""
+
+    def __init__(self, nome, ttl=CACHE_TTL, tamanho_maximo=CACHE_MAX):
+        self.nome = nome
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                valor, expira = entrada
+                if expira >= time.monotonic():
+                    self._entradas.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._entradas[chave]
+            self.falhas += 1
+            return _AUSENTE
+
+    def guardar(self, chave, valor):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entradas[chave] = (valor, time.monotonic() + self.ttl)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                if self._entradas.pop(chave, None) is not None:
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {"entradas": len(self._entradas), "acertos": self.acertos, "falhas": self.falhas,
+                    "invalidacoes": self.invalidacoes, "taxa_acerto": round(self.acertos / total, 3) if total else 0.0}
+
+cache_funcionarios = CacheLRU("funcionarios")
+cache_clientes = CacheLRU("clientes")
+
+def _funcionario(funcionario):
+    return FuncionarioCache(funcionario.id, funcionario.nome, funcionario.email)
+
+def _cliente(cliente):
+    return ClienteCache(cliente.id, cliente.cnpj_cpf, cliente.nome_requerente, cliente.telefone, cliente.email)
+
+def _guardar_funcionario(item):
+    cache_funcionarios.guardar(("id", item.id), item)
+    cache_funcionarios.guardar(("nome", item.nome), item)
+    return item
+
+def _guardar_cliente(item):
+    cache_clientes.guardar(("id", item.id), item)
+    cache_clientes.guardar(("cnpj_cpf", item.cnpj_cpf), item)
+    return item
+
+def funcionario_por_id(db: Session, funcionario_id: int):
+    item = cache_funcionarios.obter(("id", funcionario_id))
+    if item is _AUSENTE:
+        funcionario = db.get(Funcionario, funcionario_id)
+        item = _guardar_funcionario(_funcionario(funcionario)) if funcionario else None
+    return item
+
+def funcionario_por_nome(db: Session, nome: str):
+    item = cache_funcionarios.obter(("nome", nome))
+    if item is _AUSENTE:
+        funcionario = db.execute(select(Funcionario).filter_by(nome=nome)).scalar_one_or_none()
+        item = _guardar_funcionario(_funcionario(funcionario)) if funcionario else None
+    return item
+
+def listar_funcionarios(db: Session):
+    itens = cache_funcionarios.obter(("lista",))
+    if itens is _AUSENTE:
+        itens = tuple(_guardar_funcionario(_funcionario(f)) for f in db.execute(select(Funcionario).order_by(Funcionario.id)).scalars())
+        cache_funcionarios.guardar(("lista",), itens)
+    return list(itens)
+
+def cliente_por_id(db: Session, cliente_id: int):
+    item = cache_clientes.obter(("id", cliente_id))
+    if item is _AUSENTE:
+        cliente = db.get(Cliente, cliente_id)
+        item = _guardar_cliente(_cliente(cliente)) if cliente else None
+    return item
+
+def cliente_por_cnpj_cpf(db: Session, cnpj_cpf: str):
+    item = cache_clientes.obter(("cnpj_cpf", cnpj_cpf))
+    if item is _AUSENTE:
+        cliente = db.execute(select(Cliente).filter_by(cnpj_cpf=cnpj_cpf)).scalar_one_or_none()
+        item = _guardar_cliente(_cliente(cliente)) if cliente else None
+    return item
+
+def estatisticas():
+    return {cache.nome: cache.estatisticas() for cache in (cache_funcionarios, cache_clientes)}
+
+registro.adicionar_coletor("cache", estatisticas)
+
+def limpar():
+    cache_funcionarios.limpar()
+    cache_clientes.limpar()
+
+def _valores(objeto, atributo):
+    # Valor atual e o anterior à alteração, para invalidar também a chave antiga
+    historico = inspect(objeto).attrs[atributo].history
+    return {v for v in (getattr(objeto, atributo), *historico.deleted) if v is not None}
+
+def _chaves(objeto):
+    if isinstance(objeto, Funcionario):
+        return cache_funcionarios, [("id", objeto.id), ("lista",)] + [("nome", n) for n in _valores(objeto, "nome")]
+    return cache_clientes, [("id", objeto.id)] + [("cnpj_cpf", c) for c in _valores(objeto, "cnpj_cpf")]
+
+def _invalidar(mapper, conexao, objeto):
+    cache, chaves = _chaves(objeto)
+    cache.invalidar(*chaves)
+    # De novo após o commit: outra sessão pode ter recarregado o valor antigo antes de ele ser confirmado
+    sessao = inspect(objeto).session
+    if sessao is not None:
+        sessao.info.setdefault("cache_invalidar", []).append((cache, chaves))
+
+for _modelo in (Funcionario, Cliente):
+    for _evento in ("after_insert", "after_update", "after_delete"):
+        event.listen(_modelo, _evento, _invalidar)
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidar_ao_fim_da_transacao(session):
+    # No rollback também: a própria sessão pode ter lido e guardado uma linha que não foi confirmada
+    for cache, chaves in session.info.pop("cache_invalidar", ()):
+        cache.invalidar(*chaves)
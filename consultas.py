@@ -0,0 +1,130 @@
+import base64
+import json
+from datetime import date
+from sqlalchemy import Integer, and_, or_, select, text
+from sqlalchemy.orm import Session, joinedload
+from models import Cliente, Proposta
+from log_config import medido
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+class Pagina:
+    def __init__(self, itens, proximo_cursor):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor  # None quando não há mais resultados
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+def _codificar_cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+def _decodificar_cursor(cursor, por_validade=False):
+    """Id do último item, ou (validade, id) na ordenação por validade; ValueError se o cursor não for desta busca."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if por_validade:
+            validade, ultimo_id = valores
+            validade = date.fromisoformat(validade)
+        else:
+            ultimo_id = valores
+        # bool é subclasse de int, mas um id nunca vem como true/false
+        if not isinstance(ultimo_id, int) or isinstance(ultimo_id, bool):
+            raise TypeError(ultimo_id)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginação inválido.")
+    return (validade, ultimo_id) if por_validade else ultimo_id
+
+def _termos_fts(texto):
+    # Cada palavra vira um termo entre aspas com busca por prefixo: nada do usuário é interpretado como sintaxe FTS
+    termos = [palavra.replace('"', '""') for palavra in texto.split()]
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+def _filtro_texto(valor):
+    # Termo em branco é o mesmo que não filtrar: o MATCH do FTS5 recusa uma expressão vazia
+    return valor.strip() if valor and valor.strip() else None
+
+def _usa_fts(db: Session):
+    return db.get_bind().dialect.name == "sqlite"
+
+def _ids_clientes_por_nome(db: Session, nome: str):
+    if _usa_fts(db):
+        return text("SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH :termos").bindparams(termos=_termos_fts(nome)).columns(rowid=Integer)
+    return select(Cliente.id).where(Cliente.nome_requerente.ilike(f"%{nome}%"))
+
+def _ids_propostas_por_observacao(db: Session, texto: str):
+    if _usa_fts(db):
+        return text("SELECT rowid FROM propostas_fts WHERE propostas_fts MATCH :termos").bindparams(termos=_termos_fts(texto)).columns(rowid=Integer)
+    return select(Proposta.id).where(Proposta.observacoes.ilike(f"%{texto}%"))
+
+def _limite(limite):
+    return max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+
+@medido("consultas.buscar_propostas")
+def buscar_propostas(db: Session, nome_cliente: str = None, orgao_ambiental: str = None, tipo_processo: str = None,
+                     responsavel_id: int = None, validade_de: date = None, validade_ate: date = None,
+                     texto: str = None, cursor: str = None, limite: int = LIMITE_PADRAO):
+    """Busca paginada por cursor: cada página continua de onde a anterior parou, sem OFFSET."""
+    limite = _limite(limite)
+    nome_cliente, texto = _filtro_texto(nome_cliente), _filtro_texto(texto)
+    consulta = select(Proposta).options(joinedload(Proposta.cliente), joinedload(Proposta.responsavel))
+    if orgao_ambiental:
+        consulta = consulta.where(Proposta.orgao_ambiental == orgao_ambiental)
+    if tipo_processo:
+        consulta = consulta.where(Proposta.tipo_processo == tipo_processo)
+    if responsavel_id is not None:
+        consulta = consulta.where(Proposta.responsavel_id == responsavel_id)
+    if nome_cliente:
+        consulta = consulta.where(Proposta.cliente_id.in_(_ids_clientes_por_nome(db, nome_cliente)))
+    if texto:
+        consulta = consulta.where(Proposta.id.in_(_ids_propostas_por_observacao(db, texto)))
+
+    por_validade = validade_de is not None or validade_ate is not None
+    if validade_de is not None:
+        consulta = consulta.where(Proposta.validade >= validade_de)
+    if validade_ate is not None:
+        consulta = consulta.where(Proposta.validade <= validade_ate)
+
+    if por_validade:
+        # Ordenado por (validade, id), acompanhando o índice ix_propostas_validade_id
+        if cursor:
+            ultima_validade, ultimo_id = _decodificar_cursor(cursor, por_validade=True)
+            consulta = consulta.where(or_(
+                Proposta.validade > ultima_validade,
+                and_(Proposta.validade == ultima_validade, Proposta.id > ultimo_id),
+            ))
+        consulta = consulta.order_by(Proposta.validade, Proposta.id)
+    else:
+        if cursor:
+            consulta = consulta.where(Proposta.id > _decodificar_cursor(cursor))
+        consulta = consulta.order_by(Proposta.id)
+
+    itens = db.execute(consulta.limit(limite + 1)).unique().scalars().all()
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo_cursor = _codificar_cursor([ultimo.validade.isoformat(), ultimo.id] if por_validade else ultimo.id)
+    return Pagina(itens, proximo_cursor)
+
+@medido("consultas.buscar_clientes")
+def buscar_clientes(db: Session, nome: str = None, cnpj_cpf: str = None, cursor: str = None, limite: int = LIMITE_PADRAO):
+    limite = _limite(limite)
+    nome = _filtro_texto(nome)
+    consulta = select(Cliente)
+    if cnpj_cpf:
+        consulta = consulta.where(Cliente.cnpj_cpf == cnpj_cpf)
+    if nome:
+        consulta = consulta.where(Cliente.id.in_(_ids_clientes_por_nome(db, nome)))
+    if cursor:
+        consulta = consulta.where(Cliente.id > _decodificar_cursor(cursor))
+    itens = db.execute(consulta.order_by(Cliente.id).limit(limite + 1)).scalars().all()
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = _codificar_cursor(itens[-1].id)
+    return Pagina(itens, proximo_cursor)
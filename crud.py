@@ -1,116 +1,145 @@
-import logging
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
-from sqlalchemy.orm import Session
-from models import Base, Cliente, Proposta, Funcionario, Usuario
-from datetime import datetime
-from passlib.context import CryptContext
-
-# Configuração do logging
-logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Configuração do contexto de criptografia
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def cadastrar_cliente(db: Session, cnpj_cpf: str, nome_requerente: str, telefone: str, email: str):
-    try:
-        cliente_existente = db.query(Cliente).filter_by(cnpj_cpf=cnpj_cpf).first()
-        if cliente_existente:
-            logging.info(f"Cliente com CNPJ/CPF {cnpj_cpf} já cadastrado.")
-            return cliente_existente.id
-        novo_cliente = Cliente(
-            cnpj_cpf=cnpj_cpf,
-            nome_requerente=nome_requerente,
-            telefone=telefone,
-            email=email
-        )
-        db.add(novo_cliente)
-        db.commit()
-        db.refresh(novo_cliente)
-        logging.info(f"Cliente '{nome_requerente}' cadastrado com sucesso! ID: {novo_cliente.id}, Dados: {novo_cliente}")
-        print(f"Cliente '{nome_requerente}' cadastrado com sucesso! ID: {novo_cliente.id}")
-        print(f"Dados do Cliente: CNPJ/CPF: {novo_cliente.cnpj_cpf}, Nome: {novo_cliente.nome_requerente}, Telefone: {novo_cliente.telefone}, Email: {novo_cliente.email}")
-        
-        # Confirmação e edição de dados
-        while True:
-            confirmacao = input("Os dados estão corretos? (s/n): ").lower()
-            if confirmacao == 's':
-                return novo_cliente.id
-            elif confirmacao == 'n':
-                campo = input("Qual campo você deseja editar? (cnpj_cpf/nome_requerente/telefone/email): ").lower()
-                novo_valor = input(f"Digite o novo valor para {campo}: ")
-                setattr(novo_cliente, campo, novo_valor)
-                db.commit()
-                db.refresh(novo_cliente)
-                logging.info(f"Cliente '{nome_requerente}' atualizado com sucesso! ID: {novo_cliente.id}, Dados: {novo_cliente}")
-                print(f"Cliente '{nome_requerente}' atualizado com sucesso! ID: {novo_cliente.id}")
-                print(f"Dados do Cliente: CNPJ/CPF: {novo_cliente.cnpj_cpf}, Nome: {novo_cliente.nome_requerente}, Telefone: {novo_cliente.telefone}, Email: {novo_cliente.email}")
-            else:
-                print("Opção inválida. Por favor, digite 's' para sim ou 'n' para não.")
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar cliente: {e}")
-
-def cadastrar_proposta(db: Session, cliente_id: int, orgao_ambiental: str, tipo_processo: str,
-                       renovacao: bool, numero_documento: str, validade: str, mensal: bool,
-                       responsavel_id: int = None, tipo_trabalho: str = None, data_hora_reuniao: str = None,
-                       prazo_entrega: str = None, observacoes: str = None):
-    try:
-        cliente = db.query(Cliente).filter_by(id=cliente_id).first()
-        if not cliente:
-            logging.info("Cliente não encontrado. Verifique o ID.")
-            return
-        nova_proposta = Proposta(
-            cliente_id=cliente_id,
-            orgao_ambiental=orgao_ambiental,
-            tipo_processo=tipo_processo,
-            renovacao=renovacao,
-            numero_documento=numero_documento if renovacao else None,
-            validade=datetime.strptime(validade, "%Y-%m-%d"),
-            mensal=mensal,
-            responsavel_id=responsavel_id,
-            tipo_trabalho=tipo_trabalho,
-            data_hora_reuniao=datetime.strptime(data_hora_reuniao, "%Y-%m-%d %H:%M") if data_hora_reuniao else None,
-            prazo_entrega=datetime.strptime(prazo_entrega, "%Y-%m-%d %H:%M") if prazo_entrega else None,
-            observacoes=observacoes
-        )
-        db.add(nova_proposta)
-        db.commit()
-        logging.info(f"Proposta cadastrada com sucesso! ID: {nova_proposta.id}, Dados: {nova_proposta}")
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar proposta: {e}")
-
-def cadastrar_funcionario(db: Session, nome: str):
-    try:
-        funcionario_existente = db.query(Funcionario).filter_by(nome=nome).first()
-        if funcionario_existente:
-            logging.info(f"Funcionário '{nome}' já cadastrado.")
-            return funcionario_existente.id
-        novo_funcionario = Funcionario(nome=nome)
-        db.add(novo_funcionario)
-        db.commit()
-        db.refresh(novo_funcionario)
-        logging.info(f"Funcionário '{nome}' cadastrado com sucesso! ID: {novo_funcionario.id}, Dados: {novo_funcionario}")
-        return novo_funcionario.id
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar funcionário: {e}")
-
-def cadastrar_usuario(db: Session, username: str, password: str, is_admin: bool):
-    try:
-        hashed_password = Usuario.hash_password(password)
-        novo_usuario = Usuario(username=username, hashed_password=hashed_password, is_admin=is_admin)
-        db.add(novo_usuario)
-        db.commit()
-        db.refresh(novo_usuario)
-        logging.info(f"Usuário '{username}' cadastrado com sucesso! ID: {novo_usuario.id}, Dados: {novo_usuario}")
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar usuário: {e}")
-
-def autenticar_usuario(db: Session, username: str, password: str):
-    try:
-        usuario = db.query(Usuario).filter_by(username=username).first()
-        if usuario and usuario.verify_password(password):
-            logging.info(f"Usuário '{username}' autenticado com sucesso!")
-            return usuario
-        logging.warning(f"Falha na autenticação do usuário '{username}'.")
-        return None
-    except Exception as e:
-        logging.error(f"Erro ao autenticar usuário: {e}")
\ No newline at end of file
+import logging
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy.orm import Session
+from models import Base, Cliente, Proposta, Funcionario, Usuario
+from cache import cliente_por_cnpj_cpf, cliente_por_id, funcionario_por_nome
+from datetime import datetime
+from log_config import configurar_logging, medido
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+@medido("crud.cadastrar_cliente")
+def cadastrar_cliente(db: Session, cnpj_cpf: str, nome_requerente: str, telefone: str, email: str, confirmar: bool = True):
+    try:
+        cliente_existente = cliente_por_cnpj_cpf(db, cnpj_cpf)
+        if cliente_existente:
+            logger.info(f"Cliente com CNPJ/CPF {cnpj_cpf} já cadastrado.")
+            return cliente_existente.id
+        novo_cliente = Cliente(
+            cnpj_cpf=cnpj_cpf,
+            nome_requerente=nome_requerente,
+            telefone=telefone,
+            email=email
+        )
+        db.add(novo_cliente)
+        db.commit()
+        logger.info(f"Cliente '{nome_requerente}' cadastrado com sucesso! ID: {novo_cliente.id}, Dados: {novo_cliente}")
+        if not confirmar:
+            return novo_cliente.id
+        print(f"Cliente '{nome_requerente}' cadastrado com sucesso! ID: {novo_cliente.id}")
+        print(f"Dados do Cliente: CNPJ/CPF: {novo_cliente.cnpj_cpf}, Nome: {novo_cliente.nome_requerente}, Telefone: {novo_cliente.telefone}, Email: {novo_cliente.email}")
+        
+        # Confirmação e edição de dados
+        while True:
+            confirmacao = input("Os dados estão corretos? (s/n): ").lower()
+            if confirmacao == 's':
+                return novo_cliente.id
+            elif confirmacao == 'n':
+                campo = input("Qual campo você deseja editar? (cnpj_cpf/nome_requerente/telefone/email): ").lower()
+                novo_valor = input(f"Digite o novo valor para {campo}: ")
+                setattr(novo_cliente, campo, novo_valor)
+                db.commit()
+                logger.info(f"Cliente '{nome_requerente}' atualizado com sucesso! ID: {novo_cliente.id}, Dados: {novo_cliente}")
+                print(f"Cliente '{nome_requerente}' atualizado com sucesso! ID: {novo_cliente.id}")
+                print(f"Dados do Cliente: CNPJ/CPF: {novo_cliente.cnpj_cpf}, Nome: {novo_cliente.nome_requerente}, Telefone: {novo_cliente.telefone}, Email: {novo_cliente.email}")
+            else:
+                print("Opção inválida. Por favor, digite 's' para sim ou 'n' para não.")
+    except Exception as e:
+        # Sem o rollback, a sessão de quem chamou ficaria inutilizável depois de um commit que falhou
+        db.rollback()
+        logger.error(f"Erro ao cadastrar cliente: {e}")
+
+@medido("crud.cadastrar_proposta")
+def cadastrar_proposta(db: Session, cliente_id: int, orgao_ambiental: str, tipo_processo: str,
+                       renovacao: bool, numero_documento: str, validade: str, mensal: bool,
+                       responsavel_id: int = None, tipo_trabalho: str = None, data_hora_reuniao: str = None,
+                       prazo_entrega: str = None, observacoes: str = None):
+    try:
+        if not cliente_por_id(db, cliente_id):
+            logger.info("Cliente não encontrado. Verifique o ID.")
+            return
+        nova_proposta = Proposta(
+            cliente_id=cliente_id,
+            orgao_ambiental=orgao_ambiental,
+            tipo_processo=tipo_processo,
+            renovacao=renovacao,
+            numero_documento=numero_documento if renovacao else None,
+            validade=datetime.strptime(validade, "%Y-%m-%d"),
+            mensal=mensal,
+            responsavel_id=responsavel_id,
+            tipo_trabalho=tipo_trabalho,
+            data_hora_reuniao=datetime.strptime(data_hora_reuniao, "%Y-%m-%d %H:%M") if data_hora_reuniao else None,
+            prazo_entrega=datetime.strptime(prazo_entrega, "%Y-%m-%d %H:%M") if prazo_entrega else None,
+            observacoes=observacoes
+        )
+        db.add(nova_proposta)
+        db.commit()
+        logger.info(f"Proposta cadastrada com sucesso! ID: {nova_proposta.id}, Dados: {nova_proposta}")
+        return nova_proposta.id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao cadastrar proposta: {e}")
+
+@medido("crud.cadastrar_funcionario")
+def cadastrar_funcionario(db: Session, nome: str, email: str = None):
+    try:
+        funcionario_existente = funcionario_por_nome(db, nome)
+        if funcionario_existente:
+            logger.info(f"Funcionário '{nome}' já cadastrado.")
+            if email and email != funcionario_existente.email:
+                return atualizar_email_funcionario(db, funcionario_existente.id, email)
+            return funcionario_existente.id
+        novo_funcionario = Funcionario(nome=nome, email=email)
+        db.add(novo_funcionario)
+        db.commit()
+        logger.info(f"Funcionário '{nome}' cadastrado com sucesso! ID: {novo_funcionario.id}, Dados: {novo_funcionario}")
+        return novo_funcionario.id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao cadastrar funcionário: {e}")
+
+@medido("crud.atualizar_email_funcionario")
+def atualizar_email_funcionario(db: Session, funcionario_id: int, email: str):
+    """Cadastra ou troca o e-mail do funcionário, para onde vão os avisos de prazo; None se não existir."""
+    try:
+        funcionario = db.get(Funcionario, funcionario_id)
+        if funcionario is None:
+            logger.info("Funcionário não encontrado. Verifique o ID.")
+            return
+        funcionario.email = email or None
+        db.commit()
+        logger.info(f"E-mail do funcionário '{funcionario.nome}' atualizado! ID: {funcionario.id}, Dados: {funcionario}")
+        return funcionario.id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao atualizar e-mail do funcionário: {e}")
+
+@medido("crud.cadastrar_usuario")
+def cadastrar_usuario(db: Session, username: str, password: str, is_admin: bool):
+    try:
+        hashed_password = Usuario.hash_password(password)
+        novo_usuario = Usuario(username=username, hashed_password=hashed_password, is_admin=is_admin)
+        db.add(novo_usuario)
+        db.commit()
+        logger.info(f"Usuário '{username}' cadastrado com sucesso! ID: {novo_usuario.id}, Dados: {novo_usuario}")
+        return novo_usuario.id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao cadastrar usuário: {e}")
+
+@medido("crud.autenticar_usuario")
+def autenticar_usuario(db: Session, username: str, password: str):
+    try:
+        usuario = db.query(Usuario).filter_by(username=username).first()
+        if usuario and usuario.verify_password(password):
+            if db.is_modified(usuario):
+                db.commit()
+            logger.info(f"Usuário '{username}' autenticado com sucesso!")
+            return usuario
+        logger.warning(f"Falha na autenticação do usuário '{username}'.")
+        return None
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao autenticar usuário: {e}")
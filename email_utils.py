@@ -1,31 +1,121 @@
-import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-# Configuração do logging
-logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-SMTP_SERVER = 'smtp.example.com'
-SMTP_PORT = 587
-SMTP_USERNAME = 'your_email@example.com'
-SMTP_PASSWORD = 'your_password'
-
-def enviar_email(destinatario, assunto, mensagem):
-    msg = MIMEMultipart()
-    msg['From'] = SMTP_USERNAME
-    msg['To'] = destinatario
-    msg['Subject'] = assunto
-
-    msg.attach(MIMEText(mensagem, 'plain'))
-
-    try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(SMTP_USERNAME, destinatario, text)
-        server.quit()
-        logging.info(f"E-mail enviado para {destinatario}")
-    except Exception as e:
-        logging.error(f"Falha ao enviar e-mail para {destinatario}: {e}")
\ No newline at end of file
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+import metricas
+from log_config import configurar_logging, medido, medir
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.example.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME', 'your_email@example.com')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', 'your_password')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+SMTP_REMETENTE = os.getenv('SMTP_REMETENTE', SMTP_USERNAME)
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+
+# smtplib e email.mime são importados só no primeiro envio: a maioria das execuções não manda e-mail
+
+def montar_mensagem(destinatario, assunto, mensagem):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_REMETENTE
+    msg['To'] = destinatario
+    msg['Subject'] = assunto
+
+    msg.attach(MIMEText(mensagem, 'plain'))
+    return msg
+
+def abrir_conexao_smtp():
+    import smtplib
+
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SMTP_USERNAME:
+        server.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return server
+
+def conexao_perdida(erro):
+    """Se o erro (ou a causa dele) indica que o servidor encerrou a conexão."""
+    import smtplib
+
+    return isinstance(erro, smtplib.SMTPServerDisconnected) or isinstance(erro.__cause__, smtplib.SMTPServerDisconnected)
+
+class PoolSMTP:
+    """Mantém conexões SMTP já autenticadas para reaproveitar entre envios."""
+
+    def __init__(self, tamanho=4, fabrica=None):
+        self.tamanho = tamanho
+        self.fabrica = fabrica or abrir_conexao_smtp
+        self._livres = queue.LifoQueue(maxsize=tamanho)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def conexao(self):
+        try:
+            server = self._livres.get_nowait()
+        except queue.Empty:
+            server = self.fabrica()
+        try:
+            yield server
+        except Exception:
+            # Depois de qualquer erro o estado da conexão é incerto: ela não volta para o pool
+            self._descartar(server)
+            raise
+        else:
+            self._devolver(server)
+
+    def _devolver(self, server):
+        try:
+            self._livres.put_nowait(server)
+        except queue.Full:
+            self._descartar(server)
+
+    def _descartar(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def fechar(self):
+        with self._lock:
+            while True:
+                try:
+                    self._descartar(self._livres.get_nowait())
+                except queue.Empty:
+                    break
+
+pool_smtp = PoolSMTP()
+
+def enviar_mensagem(server, destinatario, assunto, mensagem):
+    msg = montar_mensagem(destinatario, assunto, mensagem)
+    with medir("smtp.enviar", logger, destinatario=destinatario):
+        server.sendmail(SMTP_REMETENTE, destinatario, msg.as_string())
+
+@medido("email.enviar_email")
+def enviar_email(destinatario, assunto, mensagem, pool=None):
+    pool = pool or pool_smtp
+    try:
+        try:
+            with pool.conexao() as server:
+                enviar_mensagem(server, destinatario, assunto, mensagem)
+        except Exception as e:
+            if not conexao_perdida(e):
+                raise
+            # O servidor pode ter encerrado a conexão ociosa; tenta uma vez com uma nova
+            with pool.conexao() as server:
+                enviar_mensagem(server, destinatario, assunto, mensagem)
+        logger.info(f"E-mail enviado para {destinatario}")
+        metricas.registro.incrementar("emails_enviados")
+        return True
+    except Exception as e:
+        logger.error(f"Falha ao enviar e-mail para {destinatario}: {e}")
+        metricas.registro.incrementar("emails_falhos")
+        return False
@@ -0,0 +1,263 @@
+import argparse
+import csv
+import logging
+import time
+from datetime import date, datetime
+from itertools import islice
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, init_db
+from models import Cliente, Funcionario, Proposta
+from previsao import atualizar_resumo
+from log_config import configurar_logging
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 5000
+FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y")
+FORMATOS_DATA_HORA = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S")
+VERDADEIRO = {"s", "sim", "true", "1", "x", "y", "yes"}
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.inseridos = 0
+        self.ignorados = 0
+        self.erros = []  # (número da linha, mensagem)
+        self.duracao = 0.0
+
+    @property
+    def linhas_por_segundo(self):
+        total = self.inseridos + self.ignorados + len(self.erros)
+        return total / self.duracao if self.duracao else 0.0
+
+    def __str__(self):
+        return (f"{self.inseridos} inseridos, {self.ignorados} já existentes, {len(self.erros)} com erro "
+                f"em {self.duracao:.1f}s ({self.linhas_por_segundo:.0f} linhas/s)")
+
+def ler_planilha(caminho):
+    """Gera (número da linha, dicionário) sem carregar o arquivo inteiro na memória."""
+    if caminho.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("A importação de XLSX requer o pacote openpyxl (pip install openpyxl).")
+        livro = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = livro.active.iter_rows(values_only=True)
+            cabecalho = [str(c).strip() if c is not None else "" for c in next(linhas)]
+            for numero, valores in enumerate(linhas, start=2):
+                if any(v not in (None, "") for v in valores):
+                    yield numero, dict(zip(cabecalho, valores))
+        finally:
+            livro.close()
+    else:
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            amostra = arquivo.read(4096)
+            arquivo.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+            except csv.Error:
+                dialeto = csv.excel
+            leitor = csv.DictReader(arquivo, dialect=dialeto)
+            leitor.fieldnames = [c.strip() for c in leitor.fieldnames or []]
+            for numero, linha in enumerate(leitor, start=2):
+                yield numero, linha
+
+class ConversorData:
+    """Tenta primeiro o formato do último valor convertido da coluna; os demais só quando ele não serve."""
+
+    def __init__(self, formatos, somente_data=False):
+        self.formatos = formatos
+        self.somente_data = somente_data
+        self.formato = None
+
+    def __call__(self, valor, obrigatorio=False):
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            if obrigatorio:
+                raise ValueError("data obrigatória ausente")
+            return None
+        if isinstance(valor, datetime):
+            return valor.date() if self.somente_data else valor
+        if isinstance(valor, date):
+            return valor if self.somente_data else datetime(valor.year, valor.month, valor.day)
+        valor = str(valor).strip()
+        convertido = None
+        if self.formato is not None:
+            try:
+                convertido = datetime.strptime(valor, self.formato)
+            except ValueError:
+                pass
+        if convertido is None:
+            # Uma coluna pode misturar formatos aceitos (ex.: 2024-01-31 depois de 31/01/2024)
+            for formato in self.formatos:
+                if formato == self.formato:
+                    continue
+                try:
+                    convertido = datetime.strptime(valor, formato)
+                except ValueError:
+                    continue
+                self.formato = formato
+                break
+            else:
+                raise ValueError(f"data em formato não reconhecido: {valor!r}")
+        return convertido.date() if self.somente_data else convertido
+
+def _texto(linha, coluna, obrigatorio=True):
+    valor = linha.get(coluna)
+    valor = str(valor).strip() if valor is not None else ""
+    if not valor:
+        if obrigatorio:
+            raise ValueError(f"campo obrigatório ausente: {coluna}")
+        return None
+    return valor
+
+def _booleano(linha, coluna):
+    valor = linha.get(coluna)
+    if isinstance(valor, bool):
+        return valor
+    return str(valor or "").strip().lower() in VERDADEIRO
+
+def _em_lotes(linhas, tamanho):
+    linhas = iter(linhas)
+    while True:
+        lote = list(islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+def _inserir_lote(db, modelo, registros, resultado):
+    """Insere o lote com um único executemany; se falhar, isola as linhas problemáticas.
+
+    Devolve os registros que foram de fato gravados.
+    """
+    if not registros:
+        return []
+    try:
+        db.execute(insert(modelo), [valores for _, valores in registros])
+        db.commit()
+        resultado.inseridos += len(registros)
+        return registros
+    except IntegrityError:
+        db.rollback()
+        inseridos = []
+        for numero, valores in registros:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(modelo), [valores])
+                inseridos.append((numero, valores))
+            except IntegrityError as e:
+                resultado.erros.append((numero, str(e.orig)))
+        db.commit()
+        resultado.inseridos += len(inseridos)
+        return inseridos
+
+def importar_clientes(db, linhas, tamanho_lote=TAMANHO_LOTE):
+    resultado = ResultadoImportacao()
+    inicio = time.perf_counter()
+    # Todos os CNPJ/CPF existentes em memória: nenhuma consulta por linha
+    existentes = set(db.scalars(select(Cliente.cnpj_cpf)))
+    for lote in _em_lotes(linhas, tamanho_lote):
+        while lote:
+            registros, no_lote, repetidas = [], set(), []
+            for numero, linha in lote:
+                try:
+                    cnpj_cpf = _texto(linha, "cnpj_cpf")
+                    if cnpj_cpf in existentes:
+                        resultado.ignorados += 1
+                        continue
+                    if cnpj_cpf in no_lote:
+                        # Repetido no mesmo lote: só se decide depois do insert do primeiro, que ainda pode falhar
+                        repetidas.append((numero, linha))
+                        continue
+                    registros.append((numero, {
+                        "cnpj_cpf": cnpj_cpf,
+                        "nome_requerente": _texto(linha, "nome_requerente"),
+                        "telefone": _texto(linha, "telefone"),
+                        "email": _texto(linha, "email"),
+                    }))
+                    no_lote.add(cnpj_cpf)
+                except ValueError as e:
+                    resultado.erros.append((numero, str(e)))
+            # Só o que foi gravado passa a contar como já existente
+            existentes.update(valores["cnpj_cpf"] for _, valores in _inserir_lote(db, Cliente, registros, resultado))
+            lote = repetidas
+    resultado.duracao = time.perf_counter() - inicio
+    logger.info(f"Importação de clientes: {resultado}")
+    return resultado
+
+def importar_propostas(db, linhas, tamanho_lote=TAMANHO_LOTE):
+    resultado = ResultadoImportacao()
+    inicio = time.perf_counter()
+    clientes = dict(db.execute(select(Cliente.cnpj_cpf, Cliente.id)).all())
+    funcionarios = dict(db.execute(select(Funcionario.nome, Funcionario.id)).all())
+    validade = ConversorData(FORMATOS_DATA, somente_data=True)
+    data_hora_reuniao = ConversorData(FORMATOS_DATA_HORA)
+    prazo_entrega = ConversorData(FORMATOS_DATA_HORA)
+    # O insert em massa não passa pelos eventos do ORM: o resumo de renovações é atualizado ao final
+    grupos_resumo = set()
+    for lote in _em_lotes(linhas, tamanho_lote):
+        registros = []
+        for numero, linha in lote:
+            try:
+                cnpj_cpf = _texto(linha, "cnpj_cpf")
+                if cnpj_cpf not in clientes:
+                    raise ValueError(f"cliente não cadastrado: {cnpj_cpf}")
+                responsavel = _texto(linha, "responsavel", obrigatorio=False)
+                if responsavel is not None and responsavel not in funcionarios:
+                    raise ValueError(f"funcionário não cadastrado: {responsavel}")
+                renovacao = _booleano(linha, "renovacao")
+                registros.append((numero, {
+                    "cliente_id": clientes[cnpj_cpf],
+                    "orgao_ambiental": _texto(linha, "orgao_ambiental"),
+                    "tipo_processo": _texto(linha, "tipo_processo"),
+                    "renovacao": renovacao,
+                    "numero_documento": _texto(linha, "numero_documento", obrigatorio=False) if renovacao else None,
+                    "validade": validade(linha.get("validade"), obrigatorio=True),
+                    "mensal": _booleano(linha, "mensal"),
+                    "responsavel_id": funcionarios.get(responsavel),
+                    "tipo_trabalho": _texto(linha, "tipo_trabalho", obrigatorio=False),
+                    "data_hora_reuniao": data_hora_reuniao(linha.get("data_hora_reuniao")),
+                    "prazo_entrega": prazo_entrega(linha.get("prazo_entrega")),
+                    "observacoes": _texto(linha, "observacoes", obrigatorio=False),
+                }))
+            except ValueError as e:
+                resultado.erros.append((numero, str(e)))
+        _inserir_lote(db, Proposta, registros, resultado)
+        grupos_resumo.update((v["orgao_ambiental"], f"{v['validade']:%Y-%m}", v["responsavel_id"]) for _, v in registros)
+    if grupos_resumo:
+        atualizar_resumo(db.connection(), grupos_resumo)
+        db.commit()
+    resultado.duracao = time.perf_counter() - inicio
+    logger.info(f"Importação de propostas: {resultado}")
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de clientes e propostas a partir de CSV/XLSX.")
+    parser.add_argument("tipo", choices=["clientes", "propostas"])
+    parser.add_argument("arquivo")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação")
+    parser.add_argument("--erros", help="grava as linhas rejeitadas neste CSV")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        importar = importar_clientes if args.tipo == "clientes" else importar_propostas
+        resultado = importar(db, ler_planilha(args.arquivo), args.lote)
+    finally:
+        db.close()
+    print(f"Importação de {args.tipo}: {resultado}")
+    for numero, mensagem in resultado.erros[:20]:
+        print(f"  linha {numero}: {mensagem}")
+    if len(resultado.erros) > 20:
+        print(f"  ... e mais {len(resultado.erros) - 20} erros")
+    if args.erros and resultado.erros:
+        with open(args.erros, "w", newline="", encoding="utf-8") as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(["linha", "erro"])
+            escritor.writerows(resultado.erros)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import metricas
+
+LOG_ARQUIVO = os.getenv("LOG_ARQUIVO", "app.log")
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO")
+LOG_ROTACAO = os.getenv("LOG_ROTACAO", "tamanho")  # tamanho ou tempo
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "10"))
+LOG_QUANDO = os.getenv("LOG_QUANDO", "midnight")  # usado quando LOG_ROTACAO=tempo
+LOG_CONSULTA_LENTA_MS = float(os.getenv("LOG_CONSULTA_LENTA_MS", "100"))
+
+# Atributos padrão de LogRecord; o que sobrar veio em extra= e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro, com traceback em um único campo."""
+
+    def format(self, record):
+        dados = {
+            "momento": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+_lock = threading.Lock()
+_ouvinte = None
+
+def configurar_logging():
+    """Liga o logging da aplicação uma única vez: gravação em arquivo feita em outra thread."""
+    global _ouvinte
+    with _lock:
+        if _ouvinte is not None:
+            return
+        if LOG_ROTACAO == "tempo":
+            arquivo = logging.handlers.TimedRotatingFileHandler(LOG_ARQUIVO, when=LOG_QUANDO, backupCount=LOG_BACKUPS, encoding="utf-8")
+        else:
+            arquivo = logging.handlers.RotatingFileHandler(LOG_ARQUIVO, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        arquivo.setFormatter(FormatadorJSON())
+        fila = queue.SimpleQueue()
+        # Quem loga só enfileira o registro; a escrita em disco fica com o ouvinte
+        raiz = logging.getLogger()
+        raiz.addHandler(logging.handlers.QueueHandler(fila))
+        raiz.setLevel(LOG_NIVEL)
+        _ouvinte = logging.handlers.QueueListener(fila, arquivo, respect_handler_level=True)
+        _ouvinte.start()
+        atexit.register(_ouvinte.stop)
+
+@contextmanager
+def medir(operacao, logger=None, **campos):
+    """Registra a duração da operação em duracao_ms, inclusive quando ela falha, e a conta nas métricas."""
+    logger = logger or logging.getLogger("desempenho")
+    inicio = time.perf_counter()
+    try:
+        with metricas.operacao(operacao):
+            yield campos
+    except Exception:
+        logger.warning(f"{operacao} falhou", extra={"operacao": operacao, "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3), **campos})
+        raise
+    logger.info(f"{operacao} concluída", extra={"operacao": operacao, "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3), **campos})
+
+def medido(operacao):
+    """Decorador equivalente a medir() para funções inteiras."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def embrulho(*args, **kwargs):
+            with medir(operacao):
+                return funcao(*args, **kwargs)
+        return embrulho
+    return decorador
+
+def registrar_consultas_lentas(engine, limite_ms=LOG_CONSULTA_LENTA_MS):
+    """Loga as consultas SQL acima do limite, com o tempo gasto e o início do comando."""
+    from sqlalchemy import event
+
+    logger = logging.getLogger("sql")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conexao, cursor, comando, parametros, contexto, executemany):
+        conexao.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def depois(conexao, cursor, comando, parametros, contexto, executemany):
+        duracao_ms = (time.perf_counter() - conexao.info["inicio_consulta"].pop()) * 1000
+        if duracao_ms >= limite_ms:
+            logger.warning("Consulta lenta", extra={"operacao": "sql", "duracao_ms": round(duracao_ms, 3),
+                                                    "sql": " ".join(comando.split())[:500], "executemany": executemany})
+
+    @event.listens_for(engine, "handle_error")
+    def erro(contexto):
+        # Comando que falhou não passa por after_cursor_execute
+        inicios = contexto.connection.info.get("inicio_consulta") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
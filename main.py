@@ -1,107 +1,174 @@
-from database import SessionLocal, init_db
-from crud import cadastrar_cliente, cadastrar_proposta, cadastrar_funcionario, cadastrar_usuario, autenticar_usuario
-from utils import inicializar_funcionarios
-from email_utils import enviar_email
-from models import Funcionario, Proposta
-from datetime import datetime, timedelta
-
-def verificar_prazos():
-    db = SessionLocal()
-    propostas = db.query(Proposta).all()
-    for proposta in propostas:
-        if proposta.prazo_entrega and proposta.prazo_entrega - datetime.now() <= timedelta(days=3):
-            funcionario = db.query(Funcionario).filter_by(id=proposta.responsavel_id).first()
-            if funcionario:
-                assunto = "Prazo de Entrega Aproximando"
-                mensagem = f"Olá {funcionario.nome},\n\nO prazo de entrega da proposta '{proposta.tipo_processo}' para o cliente '{proposta.cliente.nome_requerente}' está se aproximando. O prazo é {proposta.prazo_entrega}.\n\nPor favor, certifique-se de que todas as tarefas necessárias sejam concluídas a tempo.\n\nObrigado!"
-                enviar_email(funcionario.email, assunto, mensagem)
-    db.close()
-
-def main():
-    init_db()
-    inicializar_funcionarios()
-
-    print("Sistema de Propostas - Azevedo Ambiental")
-    
-    usuario_logado = None
-
-    while True:
-        if not usuario_logado:
-            print("\n1. Cadastrar Usuário\n2. Login\n3. Sair")
-            escolha = input("Escolha uma opção: ")
-            
-            if escolha == "1":
-                username = input("Nome de Usuário: ")
-                password = input("Senha: ")
-                is_admin = input("É administrador? (s/n): ").lower() == 's'
-                db = SessionLocal()
-                cadastrar_usuario(db, username, password, is_admin)
-                db.close()
-            
-            elif escolha == "2":
-                username = input("Nome de Usuário: ")
-                password = input("Senha: ")
-                db = SessionLocal()
-                usuario_logado = autenticar_usuario(db, username, password)
-                db.close()
-                if usuario_logado:
-                    print(f"Bem-vindo {username}!")
-                else:
-                    print("Nome de usuário ou senha incorretos.")
-            
-            elif escolha == "3":
-                break
-            
-            else:
-                print("Opção inválida.")
-        else:
-            print("\n1. Cadastrar Cliente\n2. Cadastrar Proposta\n3. Verificar Prazos e Enviar Notificações\n4. Logout")
-            escolha = input("Escolha uma opção: ")
-            
-            if escolha == "1":
-                cnpj_cpf = input("CNPJ/CPF: ")
-                nome_requerente = input("Nome do Requerente: ")
-                telefone = input("Telefone: ")
-                email = input("Email: ")
-                db = SessionLocal()
-                cadastrar_cliente(db, cnpj_cpf, nome_requerente, telefone, email)
-                db.close()
-            
-            elif escolha == "2":
-                cliente_id = int(input("ID do Cliente: "))
-                orgao_ambiental = input("Órgão Ambiental (Municipal/INEA/ANA/CETESB): ")
-                tipo_processo = input("Tipo de Processo (LO, Avaliação Preliminar, LI, Certificados): ")
-                renovacao = input("É renovação? (s/n): ").lower() == 's'
-                numero_documento = input("Número da Documentação (se for renovação): ") if renovacao else None
-                validade = input("Validade da Proposta (YYYY-MM-DD): ")
-                mensal = input("É mensal? (s/n): ").lower() == 's'
-                
-                # Responsável pelo trabalho
-                print("\nSelecione o responsável pelo trabalho:")
-                db = SessionLocal()
-                funcionarios = db.query(Funcionario).all()
-                for idx, funcionario in enumerate(funcionarios):
-                    print(f"{idx + 1}. {funcionario.nome}")
-                responsavel_idx = int(input("Escolha uma opção: ")) - 1
-                responsavel_id = funcionarios[responsavel_idx].id
-                
-                tipo_trabalho = input("Tipo de Trabalho (reunir documentação/planta/vistoria/cotação/relatório/criação de planilhas/cálculos): ")
-                data_hora_reuniao = input("Data e Hora da Reunião (YYYY-MM-DD HH:MM): ")
-                prazo_entrega = input("Prazo de Entrega (YYYY-MM-DD HH:MM): ")
-                observacoes = input("Observações: ")
-                
-                cadastrar_proposta(db, cliente_id, orgao_ambiental, tipo_processo, renovacao, numero_documento, validade, mensal,
-                                   responsavel_id, tipo_trabalho, data_hora_reuniao, prazo_entrega, observacoes)
-                db.close()
-            
-            elif escolha == "3":
-                verificar_prazos()
-            
-            elif escolha == "4":
-                usuario_logado = None1
-            
-            else:
-                print("Opção inválida.")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import threading
+from datetime import datetime
+
+# Só o menu é carregado na partida; banco, ORM e serviços sobem numa thread enquanto o usuário escolhe a opção
+despachante = None
+agendador = None
+
+def inicializar():
+    global despachante, agendador
+    import crud  # noqa: F401 - deixa os módulos do menu carregados antes da primeira escolha
+    from database import init_db
+    from utils import inicializar_funcionarios
+    from notificacoes import DespachanteNotificacoes
+    from agendador import AgendadorPrazos
+    from atribuicao import indice_carga
+    from agenda import agenda
+
+    init_db()
+    inicializar_funcionarios()
+    indice_carga.carregar()
+    agenda.carregar()
+    despachante = DespachanteNotificacoes()
+    agendador = AgendadorPrazos(despachante=despachante)
+    despachante.iniciar()
+    agendador.iniciar()
+
+def _em_segundo_plano(funcao):
+    """Executa funcao numa thread; a função devolvida espera o fim e relança o erro, se houve."""
+    erros = []
+
+    def executar():
+        try:
+            funcao()
+        except BaseException as e:
+            erros.append(e)
+
+    thread = threading.Thread(target=executar, name="inicializacao", daemon=True)
+    thread.start()
+
+    def aguardar():
+        thread.join()
+        if erros:
+            raise erros[0]
+    return aguardar
+
+def _escolher(usuario_logado):
+    if not usuario_logado:
+        print("\n1. Cadastrar Usuário\n2. Login\n3. Sair")
+    else:
+        print("\n1. Cadastrar Cliente\n2. Cadastrar Proposta\n3. Verificar Prazos e Enviar Notificações\n4. E-mail de Funcionário\n5. Logout")
+    return input("Escolha uma opção: ")
+
+def main():
+    aguardar_inicializacao = _em_segundo_plano(inicializar)
+
+    print("Sistema de Propostas - Azevedo Ambiental")
+    
+    usuario_logado = None
+
+    # O primeiro menu aparece já; enquanto o usuário escolhe a inicialização normalmente termina
+    primeira_escolha = _escolher(usuario_logado)
+    aguardar_inicializacao()
+    from database import sessao
+    from crud import cadastrar_cliente, cadastrar_proposta, cadastrar_usuario, autenticar_usuario, atualizar_email_funcionario
+    from cache import listar_funcionarios
+    from atribuicao import indice_carga
+    from agenda import agenda
+    from metricas import METRICAS_ARQUIVO, operacao, registro
+
+    while True:
+        escolha = primeira_escolha if primeira_escolha is not None else _escolher(usuario_logado)
+        primeira_escolha = None
+        if not usuario_logado:
+            if escolha == "1":
+                username = input("Nome de Usuário: ")
+                password = input("Senha: ")
+                is_admin = input("É administrador? (s/n): ").lower() == 's'
+                with operacao("menu.cadastrar_usuario"), sessao() as db:
+                    cadastrar_usuario(db, username, password, is_admin)
+            
+            elif escolha == "2":
+                username = input("Nome de Usuário: ")
+                password = input("Senha: ")
+                with operacao("menu.login"), sessao() as db:
+                    usuario_logado = autenticar_usuario(db, username, password)
+                if usuario_logado:
+                    print(f"Bem-vindo {username}!")
+                else:
+                    print("Nome de usuário ou senha incorretos.")
+            
+            elif escolha == "3":
+                agendador.parar()
+                despachante.parar()
+                if METRICAS_ARQUIVO:
+                    registro.salvar_json(METRICAS_ARQUIVO)
+                break
+            
+            else:
+                print("Opção inválida.")
+        else:
+            if escolha == "1":
+                cnpj_cpf = input("CNPJ/CPF: ")
+                nome_requerente = input("Nome do Requerente: ")
+                telefone = input("Telefone: ")
+                email = input("Email: ")
+                with operacao("menu.cadastrar_cliente"), sessao() as db:
+                    cadastrar_cliente(db, cnpj_cpf, nome_requerente, telefone, email)
+            
+            elif escolha == "2":
+                cliente_id = int(input("ID do Cliente: "))
+                orgao_ambiental = input("Órgão Ambiental (Municipal/INEA/ANA/CETESB): ")
+                tipo_processo = input("Tipo de Processo (LO, Avaliação Preliminar, LI, Certificados): ")
+                renovacao = input("É renovação? (s/n): ").lower() == 's'
+                numero_documento = input("Número da Documentação (se for renovação): ") if renovacao else None
+                validade = input("Validade da Proposta (YYYY-MM-DD): ")
+                mensal = input("É mensal? (s/n): ").lower() == 's'
+                
+                tipo_trabalho = input("Tipo de Trabalho (reunir documentação/planta/vistoria/cotação/relatório/criação de planilhas/cálculos): ")
+                data_hora_reuniao = input("Data e Hora da Reunião (YYYY-MM-DD HH:MM): ")
+                prazo_entrega = input("Prazo de Entrega (YYYY-MM-DD HH:MM): ")
+                observacoes = input("Observações: ")
+                try:
+                    reuniao = datetime.strptime(data_hora_reuniao, "%Y-%m-%d %H:%M") if data_hora_reuniao else None
+                    prazo = datetime.strptime(prazo_entrega, "%Y-%m-%d %H:%M") if prazo_entrega else None
+                except ValueError:
+                    print("Data inválida. Use o formato YYYY-MM-DD HH:MM.")
+                    continue
+                
+                # Responsável pelo trabalho, do menos para o mais carregado; quem tem conflito de agenda não é sugerido
+                print("\nSelecione o responsável pelo trabalho:")
+                with operacao("menu.listar_funcionarios"):
+                    funcionarios = indice_carga.ranking()
+                    ocupados = agenda.ocupados(reuniao, prazo)
+                    sugerido = indice_carga.sugerir(evitar=ocupados)
+                for idx, (funcionario_id, nome, carga) in enumerate(funcionarios):
+                    marcas = (" - sugerido" if funcionario_id == sugerido else "") + (" - conflito de agenda" if funcionario_id in ocupados else "")
+                    print(f"{idx + 1}. {nome} ({carga} prazos/reuniões em aberto){marcas}")
+                responsavel_idx = input("Escolha uma opção (Enter aceita o sugerido): ")
+                responsavel_id = funcionarios[int(responsavel_idx) - 1][0] if responsavel_idx else sugerido
+                for conflito in agenda.conflitos(responsavel_id, reuniao, prazo):
+                    print(f"Atenção: {'reunião' if conflito.tipo == 'reuniao' else 'prazo'} da proposta {conflito.proposta_id} em {conflito.momento:%d/%m/%Y %H:%M}.")
+                
+                with operacao("menu.cadastrar_proposta"), sessao() as db:
+                    cadastrar_proposta(db, cliente_id, orgao_ambiental, tipo_processo, renovacao, numero_documento, validade, mensal,
+                                       responsavel_id, tipo_trabalho, data_hora_reuniao, prazo_entrega, observacoes)
+            
+            elif escolha == "3":
+                # A verificação roda no agendador, em segundo plano
+                agendador.disparar()
+                print("Verificação de prazos iniciada em segundo plano.")
+            
+            elif escolha == "4":
+                # Os avisos de prazo só saem para funcionários com e-mail cadastrado
+                with sessao() as db:
+                    funcionarios = listar_funcionarios(db)
+                for idx, funcionario in enumerate(funcionarios):
+                    print(f"{idx + 1}. {funcionario.nome} ({funcionario.email or 'sem e-mail'})")
+                try:
+                    funcionario = funcionarios[int(input("Escolha o funcionário: ")) - 1]
+                except (ValueError, IndexError):
+                    print("Opção inválida.")
+                    continue
+                email = input("E-mail (Enter remove): ").strip()
+                with operacao("menu.atualizar_email_funcionario"), sessao() as db:
+                    atualizar_email_funcionario(db, funcionario.id, email)
+            
+            elif escolha == "5":
+                usuario_logado = None
+            
+            else:
+                print("Opção inválida.")
+
+if __name__ == "__main__":
+    main()
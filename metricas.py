@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+METRICAS_CONSULTA_LENTA_MS = float(os.getenv("METRICAS_CONSULTA_LENTA_MS", "50"))
+METRICAS_AMOSTRAS = int(os.getenv("METRICAS_AMOSTRAS", "20"))  # consultas lentas guardadas por operação
+METRICAS_ARQUIVO = os.getenv("METRICAS_ARQUIVO", "")  # dump JSON ao encerrar o main, se definido
+# Nome de uma operação (ex.: menu.cadastrar_proposta) para rodar sob o cProfile; vazio desliga
+METRICAS_PERFILAR = os.getenv("METRICAS_PERFILAR", "")
+METRICAS_PERFIL_DIR = os.getenv("METRICAS_PERFIL_DIR", "perfis")
+
+# Limites dos baldes dos histogramas, em milissegundos
+BALDES_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+SEM_OPERACAO = "sem_operacao"
+
+logger = logging.getLogger(__name__)
+
+# Pilha das operações em andamento no contexto atual (thread ou tarefa)
+_operacoes = ContextVar("metricas_operacoes", default=())
+
+class Histograma:
+    def __init__(self):
+        self.baldes = [0] * (len(BALDES_MS) + 1)  # o último é o +Inf
+        self.soma = 0.0
+        self.contagem = 0
+
+    def observar(self, valor_ms):
+        indice = len(BALDES_MS)
+        for i, limite in enumerate(BALDES_MS):
+            if valor_ms <= limite:
+                indice = i
+                break
+        self.baldes[indice] += 1
+        self.soma += valor_ms
+        self.contagem += 1
+
+    def como_dict(self):
+        return {"contagem": self.contagem, "soma_ms": round(self.soma, 3),
+                "baldes": dict(zip([str(b) for b in BALDES_MS] + ["+Inf"], self.baldes))}
+
+class _MetricasOperacao:
+    def __init__(self):
+        self.duracao = Histograma()
+        self.erros = 0
+        self.consultas = 0
+        self.consultas_duracao = Histograma()
+        self.lentas = deque(maxlen=METRICAS_AMOSTRAS)
+
+class RegistroMetricas:
+    """Agrega, por operação, chamadas, consultas SQL, latências e amostras de consultas lentas."""
+
+    def __init__(self, limite_lenta_ms=METRICAS_CONSULTA_LENTA_MS):
+        self.limite_lenta_ms = limite_lenta_ms
+        self._lock = threading.Lock()
+        self._operacoes = defaultdict(_MetricasOperacao)
+        self._contadores = defaultdict(int)
+        self._coletores = {}
+        self.inicio = datetime.now()
+
+    def adicionar_coletor(self, nome, funcao):
+        """funcao() devolve {rótulo: {campo: valor}}, lido a cada exportação (ex.: estatísticas de cache)."""
+        self._coletores[nome] = funcao
+
+    def registrar_operacao(self, nome, duracao_ms, erro=False):
+        with self._lock:
+            metricas = self._operacoes[nome]
+            metricas.duracao.observar(duracao_ms)
+            if erro:
+                metricas.erros += 1
+
+    def registrar_consulta(self, comando, duracao_ms):
+        # A consulta conta para todas as operações em andamento: a ação do menu soma as das funções que ela chamou
+        nomes = _operacoes.get() or (SEM_OPERACAO,)
+        lenta = duracao_ms >= self.limite_lenta_ms
+        with self._lock:
+            for nome in set(nomes):
+                metricas = self._operacoes[nome]
+                metricas.consultas += 1
+                metricas.consultas_duracao.observar(duracao_ms)
+            if lenta:
+                self._operacoes[nomes[-1]].lentas.append({
+                    "momento": datetime.now().isoformat(timespec="seconds"),
+                    "duracao_ms": round(duracao_ms, 3),
+                    "sql": " ".join(comando.split())[:500],
+                })
+
+    def incrementar(self, contador, valor=1):
+        with self._lock:
+            self._contadores[contador] += valor
+
+    def limpar(self):
+        with self._lock:
+            self._operacoes.clear()
+            self._contadores.clear()
+            self.inicio = datetime.now()
+
+    def como_dict(self):
+        with self._lock:
+            coletores = dict(self._coletores)
+            dados = {
+                "inicio": self.inicio.isoformat(timespec="seconds"),
+                "contadores": dict(self._contadores),
+                "operacoes": {
+                    nome: {
+                        "duracao": m.duracao.como_dict(),
+                        "erros": m.erros,
+                        "consultas": m.consultas,
+                        "consultas_duracao": m.consultas_duracao.como_dict(),
+                        "consultas_lentas": list(m.lentas),
+                    }
+                    for nome, m in sorted(self._operacoes.items())
+                },
+            }
+        dados.update((nome, funcao()) for nome, funcao in coletores.items())
+        return dados
+
+    def salvar_json(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.como_dict(), arquivo, ensure_ascii=False, indent=2)
+
+    def exportar_prometheus(self):
+        """Formato texto do Prometheus, pronto para ser servido em /metricas."""
+        with self._lock:
+            operacoes = list(self._operacoes.items())
+            contadores = list(self._contadores.items())
+            coletores = list(self._coletores.items())
+        linhas = []
+
+        def histograma(metrica, descricao, valores):
+            linhas.append(f"# HELP {metrica} {descricao}")
+            linhas.append(f"# TYPE {metrica} histogram")
+            for nome, h in valores:
+                acumulado = 0
+                for limite, quantidade in zip([str(b / 1000) for b in BALDES_MS] + ["+Inf"], h.baldes):
+                    acumulado += quantidade
+                    linhas.append(f'{metrica}_bucket{{operacao="{nome}",le="{limite}"}} {acumulado}')
+                linhas.append(f'{metrica}_sum{{operacao="{nome}"}} {h.soma / 1000:.6f}')
+                linhas.append(f'{metrica}_count{{operacao="{nome}"}} {h.contagem}')
+
+        histograma("sistema_operacao_segundos", "Duração das operações.", [(n, m.duracao) for n, m in operacoes if m.duracao.contagem])
+        histograma("sistema_consulta_segundos", "Duração das consultas SQL por operação.", [(n, m.consultas_duracao) for n, m in operacoes])
+        linhas.append("# HELP sistema_operacao_erros_total Operações que terminaram com exceção.")
+        linhas.append("# TYPE sistema_operacao_erros_total counter")
+        linhas.extend(f'sistema_operacao_erros_total{{operacao="{n}"}} {m.erros}' for n, m in operacoes)
+        linhas.append("# HELP sistema_consultas_total Consultas SQL emitidas por operação.")
+        linhas.append("# TYPE sistema_consultas_total counter")
+        linhas.extend(f'sistema_consultas_total{{operacao="{n}"}} {m.consultas}' for n, m in operacoes)
+        for contador, valor in sorted(contadores):
+            linhas.append(f"# TYPE sistema_{contador}_total counter")
+            linhas.append(f"sistema_{contador}_total {valor}")
+        for nome, funcao in coletores:
+            for rotulo, campos in funcao().items():
+                linhas.extend(f'sistema_{nome}_{campo}{{{nome}="{rotulo}"}} {valor}' for campo, valor in campos.items())
+        return "\n".join(linhas) + "\n"
+
+registro = RegistroMetricas()
+
+@contextmanager
+def operacao(nome):
+    """Marca um trecho como operação: duração, erros e as consultas SQL feitas dentro dele."""
+    pilha = _operacoes.get()
+    token = _operacoes.set(pilha + (nome,))
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        if METRICAS_PERFILAR and METRICAS_PERFILAR == nome and nome not in pilha:
+            import cProfile
+
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                yield
+            finally:
+                perfil.disable()
+                _salvar_perfil(nome, perfil)
+        else:
+            yield
+    except Exception:
+        erro = True
+        raise
+    finally:
+        _operacoes.reset(token)
+        registro.registrar_operacao(nome, (time.perf_counter() - inicio) * 1000, erro)
+
+def _salvar_perfil(nome, perfil):
+    import io
+    import pstats
+
+    os.makedirs(METRICAS_PERFIL_DIR, exist_ok=True)
+    caminho = os.path.join(METRICAS_PERFIL_DIR, f"{nome}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+    perfil.dump_stats(caminho)
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats("cumulative").print_stats(15)
+    logger.info(f"Perfil de {nome} salvo em {caminho}\n{saida.getvalue()}")
+
+def instrumentar_engine(engine):
+    """Conta e cronometra cada consulta do engine, atribuindo-a à operação em andamento."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conexao, cursor, comando, parametros, contexto, executemany):
+        conexao.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def depois(conexao, cursor, comando, parametros, contexto, executemany):
+        registro.registrar_consulta(comando, (time.perf_counter() - conexao.info["metricas_inicio"].pop()) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def erro(contexto):
+        inicios = contexto.connection.info.get("metricas_inicio") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
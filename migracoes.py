@@ -0,0 +1,251 @@
+import argparse
+import json
+import logging
+import os
+import time
+from sqlalchemy import delete, func, insert, inspect, select, text
+from models import (AUDITORIA_SOMENTE_INCLUSAO, Base, Cliente, EstadoSistema, EventoAuditoria, FTS_CLIENTES, FTS_PROPOSTAS,
+                    Funcionario, NotificacaoPrazo, Proposta, ResumoRenovacao)
+from previsao import atualizar_resumo
+from log_config import configurar_logging
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+CHAVE_VERSAO = "migracoes.versao"
+PREFIXO_PREENCHIMENTO = "preenchimento."
+MIGRACOES_LOTE = int(os.getenv("MIGRACOES_LOTE", "1000"))
+# Pausa entre lotes: cada lote é uma transação curta e os outros processos conseguem gravar no intervalo
+MIGRACOES_PAUSA = float(os.getenv("MIGRACOES_PAUSA", "0.05"))
+
+MIGRACOES = []  # (versão, descrição, função(conexao))
+PREENCHIMENTOS = {}  # nome -> função(conexao, posicao, limite, lote) que devolve a nova posição ou None ao terminar
+
+def migracao(versao, descricao):
+    def registrar(funcao):
+        MIGRACOES.append((versao, descricao, funcao))
+        return funcao
+    return registrar
+
+def preenchimento(nome):
+    def registrar(funcao):
+        PREENCHIMENTOS[nome] = funcao
+        return funcao
+    return registrar
+
+def _ler(conexao, chave):
+    return conexao.execute(select(EstadoSistema.valor).where(EstadoSistema.chave == chave)).scalar()
+
+def _gravar(conexao, chave, valor):
+    conexao.execute(delete(EstadoSistema).where(EstadoSistema.chave == chave))
+    conexao.execute(insert(EstadoSistema).values(chave=chave, valor=valor))
+
+def versao_atual(conexao):
+    valor = _ler(conexao, CHAVE_VERSAO)
+    return int(valor) if valor is not None else 0
+
+def agendar_preenchimento(conexao, nome, limite=None):
+    """Marca um preenchimento para rodar em lotes; limite é o último id que ele precisa cobrir."""
+    _gravar(conexao, PREFIXO_PREENCHIMENTO + nome, json.dumps({"posicao": 0, "limite": limite, "concluido": False}))
+
+def preenchimentos(conexao):
+    linhas = conexao.execute(select(EstadoSistema.chave, EstadoSistema.valor)
+                             .where(EstadoSistema.chave.like(PREFIXO_PREENCHIMENTO + "%"))).all()
+    return {chave[len(PREFIXO_PREENCHIMENTO):]: json.loads(valor) for chave, valor in linhas}
+
+def adicionar_coluna(conexao, coluna):
+    """ALTER TABLE ... ADD COLUMN para uma coluna declarada no modelo, se ela ainda não existir."""
+    tabela = coluna.table.name
+    if coluna.name in {c["name"] for c in inspect(conexao).get_columns(tabela)}:
+        return
+    if not coluna.nullable:
+        raise ValueError(f"{tabela}.{coluna.name}: só colunas que aceitam nulo podem ser adicionadas sem reescrever a tabela")
+    tipo = coluna.type.compile(dialect=conexao.dialect)
+    conexao.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}"))
+    logger.info(f"Coluna {tabela}.{coluna.name} adicionada.")
+
+def criar_indices(conexao, tabela):
+    """Cria os índices declarados no modelo que ainda não existem na tabela."""
+    existentes = {indice["name"] for indice in inspect(conexao).get_indexes(tabela.name)}
+    for indice in tabela.indexes:
+        if indice.name not in existentes:
+            indice.create(conexao)
+            logger.info(f"Índice {indice.name} criado.")
+
+def _tabela_existe(conexao, nome):
+    return inspect(conexao).has_table(nome)
+
+def _maior_id(conexao, modelo):
+    return conexao.execute(select(func.max(modelo.id))).scalar() or 0
+
+@migracao(1, "funcionarios.email e avisos de propostas.prazo_notificado")
+def _m001(conexao):
+    adicionar_coluna(conexao, Funcionario.__table__.c.email)
+    if "prazo_notificado" in {c["name"] for c in inspect(conexao).get_columns(Proposta.__tablename__)}:
+        # Banco que passou pela verificação antiga (janela de 3 dias, uma coluna por proposta): o prazo já avisado
+        # vira o registro do nível 3, para o agendador não repetir o aviso; a coluna fica, sem uso
+        conexao.execute(text(
+            f"INSERT INTO {NotificacaoPrazo.__tablename__} (proposta_id, nivel, prazo_entrega, enviado_em) "
+            f"SELECT p.id, 3, p.prazo_entrega, CURRENT_TIMESTAMP FROM propostas p "
+            f"WHERE p.prazo_notificado = p.prazo_entrega AND NOT EXISTS (SELECT 1 FROM {NotificacaoPrazo.__tablename__} n "
+            f"WHERE n.proposta_id = p.id AND n.nivel = 3 AND n.prazo_entrega = p.prazo_entrega)"
+        ))
+
+@migracao(2, "índices de propostas e clientes")
+def _m002(conexao):
+    criar_indices(conexao, Proposta.__table__)
+    criar_indices(conexao, Cliente.__table__)
+
+def _reconstruir_fts(conexao, nome):
+    conexao.execute(text(f"INSERT INTO {nome}({nome}) VALUES ('rebuild')"))
+
+@migracao(3, "busca textual (FTS5) de clientes e propostas")
+def _m003(conexao):
+    if conexao.dialect.name != "sqlite":
+        return
+    for nome, comandos in (("clientes_fts", FTS_CLIENTES), ("propostas_fts", FTS_PROPOSTAS)):
+        if _tabela_existe(conexao, nome):
+            continue
+        for comando in comandos:
+            conexao.execute(text(comando))
+        # O índice é preenchido aqui, na transação que cria os triggers: um UPDATE ou DELETE de linha antiga
+        # manda o 'delete' do FTS5 para uma linha que precisa estar no índice, ou o SQLite acusa banco corrompido
+        _reconstruir_fts(conexao, nome)
+
+@migracao(4, "resumo de renovações")
+def _m004(conexao):
+    # A tabela vem do create_all; o conteúdo é refeito em lotes a partir das propostas existentes, em segundo
+    # plano pelo agendador (python agendador.py ou o menu) ou por "python migracoes.py preencher"
+    if conexao.execute(select(ResumoRenovacao.id).limit(1)).first() is None:
+        agendar_preenchimento(conexao, "resumo_renovacoes", _maior_id(conexao, Proposta))
+
+@migracao(5, "índice de propostas.data_hora_reuniao")
+def _m005(conexao):
+    # Carga do índice de atribuição: prazos OU reuniões futuras, cada lado pelo seu índice
+    criar_indices(conexao, Proposta.__table__)
+
+@migracao(6, "trilha de auditoria")
+def _m006(conexao):
+    # A tabela vem do create_all e já nasce com os triggers; aqui só o que faltar num banco criado por outro caminho
+    criar_indices(conexao, EventoAuditoria.__table__)
+    if conexao.dialect.name == "sqlite":
+        for comando in AUDITORIA_SOMENTE_INCLUSAO:
+            conexao.execute(text(comando))
+
+@migracao(7, "reconstrução da busca textual preenchida em lotes")
+def _m007(conexao):
+    # A migração 3 chegou a criar os triggers antes do conteúdo do índice, deixando o preenchimento para depois;
+    # o 'rebuild' refaz o índice a partir das tabelas, com ou sem lotes já aplicados
+    for nome, estado in preenchimentos(conexao).items():
+        if nome in ("clientes_fts", "propostas_fts") and not estado["concluido"]:
+            _reconstruir_fts(conexao, nome)
+            estado["concluido"] = True
+            _gravar(conexao, PREFIXO_PREENCHIMENTO + nome, json.dumps(estado))
+
+VERSAO_ATUAL = max(versao for versao, _, _ in MIGRACOES)
+
+def _ids_do_lote(conexao, modelo, posicao, limite, lote):
+    return conexao.execute(select(modelo.id).where(modelo.id > posicao, modelo.id <= limite)
+                           .order_by(modelo.id).limit(lote)).scalars().all()
+
+@preenchimento("resumo_renovacoes")
+def _preencher_resumo(conexao, posicao, limite, lote):
+    ids = _ids_do_lote(conexao, Proposta, posicao, limite, lote)
+    if not ids:
+        return None
+    linhas = conexao.execute(select(Proposta.orgao_ambiental, Proposta.validade, Proposta.responsavel_id)
+                             .where(Proposta.id.between(ids[0], ids[-1])).distinct())
+    # Recalcular um grupo inteiro é idempotente: grupos repetidos entre lotes só são refeitos
+    atualizar_resumo(conexao, {(orgao, f"{validade:%Y-%m}", responsavel_id) for orgao, validade, responsavel_id in linhas})
+    return ids[-1]
+
+def preencher(engine, nomes=None, lote=MIGRACOES_LOTE, pausa=MIGRACOES_PAUSA, parar=None):
+    """Executa os preenchimentos pendentes, um lote por transação; pode ser interrompido e retomado.
+
+    Com ``parar`` (um threading.Event), para entre dois lotes assim que ele for sinalizado; devolve False se
+    algum preenchimento ficou por terminar.
+    """
+    with engine.connect() as conexao:
+        pendentes = {nome: estado for nome, estado in preenchimentos(conexao).items() if not estado["concluido"]}
+    for nome, estado in pendentes.items():
+        if nomes and nome not in nomes:
+            continue
+        funcao = PREENCHIMENTOS[nome]
+        inicio = time.perf_counter()
+        lotes = 0
+        while True:
+            with engine.begin() as conexao:
+                # O progresso é gravado na mesma transação do lote: após uma queda, o lote é refeito ou já contou
+                posicao = funcao(conexao, estado["posicao"], estado["limite"], lote)
+                if posicao is None:
+                    estado["concluido"] = True
+                else:
+                    lotes += 1
+                    estado["posicao"] = posicao
+                _gravar(conexao, PREFIXO_PREENCHIMENTO + nome, json.dumps(estado))
+            if estado["concluido"]:
+                break
+            if parar is not None and parar.wait(pausa):
+                logger.info(f"Preenchimento {nome} interrompido em {estado['posicao']} de {estado['limite']}.")
+                return False
+            if parar is None and pausa:
+                time.sleep(pausa)
+        logger.info(f"Preenchimento {nome} concluído: {lotes} lotes em {time.perf_counter() - inicio:.1f}s.")
+    return True
+
+def migrar(engine, ate=None):
+    """Cria as tabelas novas e aplica as migrações pendentes; devolve os preenchimentos ainda por fazer."""
+    with engine.connect() as conexao:
+        banco_novo = not _tabela_existe(conexao, Proposta.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        if banco_novo:
+            # Tudo foi criado já no formato atual: nada a migrar nem a preencher
+            _gravar(conexao, CHAVE_VERSAO, str(VERSAO_ATUAL))
+            return []
+        atual = versao_atual(conexao)
+    for versao, descricao, funcao in sorted(MIGRACOES):
+        if versao <= atual or (ate is not None and versao > ate):
+            continue
+        # Uma transação por migração, junto com a versão: uma falha não deixa a migração pela metade
+        with engine.begin() as conexao:
+            funcao(conexao)
+            _gravar(conexao, CHAVE_VERSAO, str(versao))
+        logger.info(f"Migração {versao} aplicada: {descricao}.")
+    with engine.connect() as conexao:
+        return [nome for nome, estado in preenchimentos(conexao).items() if not estado["concluido"]]
+
+def _status(engine):
+    with engine.connect() as conexao:
+        atual = versao_atual(conexao) if _tabela_existe(conexao, EstadoSistema.__tablename__) else 0
+        estados = preenchimentos(conexao) if atual else {}
+    print(f"Versão do banco: {atual} (última: {VERSAO_ATUAL})")
+    for versao, descricao, _ in sorted(MIGRACOES):
+        print(f"  {'aplicada ' if versao <= atual else 'pendente '} {versao:>3}  {descricao}")
+    for nome, estado in estados.items():
+        situacao = "concluído" if estado["concluido"] else f"em {estado['posicao']} de {estado['limite']}"
+        print(f"  preenchimento {nome}: {situacao}")
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Migrações do banco de dados")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("status", help="mostra a versão do banco e os preenchimentos")
+    p_migrar = sub.add_parser("migrar", help="aplica as migrações de esquema pendentes")
+    p_migrar.add_argument("--ate", type=int, help="para nesta versão")
+    p_preencher = sub.add_parser("preencher", help="executa os preenchimentos pendentes em lotes")
+    p_preencher.add_argument("nomes", nargs="*")
+    p_preencher.add_argument("--lote", type=int, default=MIGRACOES_LOTE)
+    p_preencher.add_argument("--pausa", type=float, default=MIGRACOES_PAUSA)
+    args = parser.parse_args()
+
+    if args.comando == "status":
+        _status(engine)
+    elif args.comando == "migrar":
+        pendentes = migrar(engine, args.ate)
+        print(f"Banco na versão {args.ate or VERSAO_ATUAL}." + (f" Preenchimentos pendentes: {', '.join(pendentes)}." if pendentes else ""))
+    else:
+        preencher(engine, args.nomes, args.lote, args.pausa)
+        print("Preenchimentos concluídos.")
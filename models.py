@@ -1,54 +1,182 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
-from passlib.context import CryptContext
-
-Base = declarative_base()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-class Usuario(Base):
-    __tablename__ = 'usuarios'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    username = Column(String, unique=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    is_admin = Column(Boolean, default=False)
-
-    def verify_password(self, password):
-        return pwd_context.verify(password, self.hashed_password)
-
-    @classmethod
-    def hash_password(cls, password):
-        return pwd_context.hash(password)
-
-class Cliente(Base):
-    __tablename__ = 'clientes'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    cnpj_cpf = Column(String, unique=True, nullable=False)
-    nome_requerente = Column(String, nullable=False)
-    telefone = Column(String, nullable=False)
-    email = Column(String, nullable=False)
-    propostas = relationship("Proposta", back_populates="cliente")
-
-class Proposta(Base):
-    __tablename__ = 'propostas'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
-    orgao_ambiental = Column(String, nullable=False)  # Ex: Municipal, INEA
-    tipo_processo = Column(String, nullable=False)  # Ex: LO, LI
-    renovacao = Column(Boolean, default=False)  # True se for renovação
-    numero_documento = Column(String, nullable=True)  # Número se for renovação
-    validade = Column(Date, nullable=False)
-    mensal = Column(Boolean, default=False)  # True se for mensal
-    responsavel_id = Column(Integer, ForeignKey('funcionarios.id'), nullable=True)
-    tipo_trabalho = Column(String, nullable=True)
-    data_hora_reuniao = Column(DateTime, nullable=True)
-    prazo_entrega = Column(DateTime, nullable=True)
-    observacoes = Column(String, nullable=True)
-    cliente = relationship("Cliente", back_populates="propostas")
-    responsavel = relationship("Funcionario", back_populates="propostas")
-
-class Funcionario(Base):
-    __tablename__ = 'funcionarios'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    nome = Column(String, unique=True, nullable=False)
-    propostas = relationship("Proposta", back_populates="responsavel")
\ No newline at end of file
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Text, Index, UniqueConstraint, DDL, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import column_property, relationship
+from seguranca import gerar_hash, verificar_senha
+
+Base = declarative_base()
+
+def auditada(*args, **kwargs):
+    """Coluna da trilha de auditoria: com active_history o valor antigo é lido antes de uma troca, mesmo com o
+    atributo ainda não carregado (ex.: expirado por um commit), e o "antes" do evento nunca sai vazio por engano."""
+    return column_property(Column(*args, **kwargs), active_history=True)
+
+def _repr(objeto, *campos):
+    # Lê só o que já está carregado: um repr em mensagem de log nunca dispara consulta
+    valores = ", ".join(f"{campo}={objeto.__dict__.get(campo)!r}" for campo in campos)
+    return f"<{type(objeto).__name__} {valores}>"
+
+class Usuario(Base):
+    __tablename__ = 'usuarios'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = auditada(String, unique=True, nullable=False)
+    hashed_password = auditada(String, nullable=False)
+    is_admin = auditada(Boolean, default=False)
+
+    def verify_password(self, password):
+        valida, novo_hash = verificar_senha(password, self.hashed_password)
+        if novo_hash:
+            # O custo do bcrypt mudou: o hash é refeito de forma transparente no login
+            self.hashed_password = novo_hash
+        return valida
+
+    @classmethod
+    def hash_password(cls, password):
+        return gerar_hash(password)
+
+    def __repr__(self):
+        return _repr(self, "id", "username", "is_admin")
+
+class Cliente(Base):
+    __tablename__ = 'clientes'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cnpj_cpf = auditada(String, unique=True, nullable=False)
+    nome_requerente = auditada(String, nullable=False)
+    telefone = auditada(String, nullable=False)
+    email = auditada(String, nullable=False)
+    propostas = relationship("Proposta", back_populates="cliente")
+    __table_args__ = (Index('ix_clientes_nome_requerente_id', 'nome_requerente', 'id'),)
+
+    def __repr__(self):
+        return _repr(self, "id", "cnpj_cpf", "nome_requerente")
+
+class Proposta(Base):
+    __tablename__ = 'propostas'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cliente_id = auditada(Integer, ForeignKey('clientes.id'), nullable=False)
+    orgao_ambiental = auditada(String, nullable=False)  # Ex: Municipal, INEA
+    tipo_processo = auditada(String, nullable=False)  # Ex: LO, LI
+    renovacao = auditada(Boolean, default=False)  # True se for renovação
+    numero_documento = auditada(String, nullable=True)  # Número se for renovação
+    validade = auditada(Date, nullable=False)
+    mensal = auditada(Boolean, default=False)  # True se for mensal
+    responsavel_id = auditada(Integer, ForeignKey('funcionarios.id'), nullable=True)
+    tipo_trabalho = auditada(String, nullable=True)
+    data_hora_reuniao = auditada(DateTime, nullable=True, index=True)
+    prazo_entrega = auditada(DateTime, nullable=True, index=True)
+    observacoes = auditada(String, nullable=True)
+    cliente = relationship("Cliente", back_populates="propostas")
+    responsavel = relationship("Funcionario", back_populates="propostas")
+    # Índices compostos terminados em id: filtro + paginação por cursor sem ordenação extra
+    __table_args__ = (
+        Index('ix_propostas_cliente_id_id', 'cliente_id', 'id'),
+        Index('ix_propostas_responsavel_id_id', 'responsavel_id', 'id'),
+        Index('ix_propostas_orgao_ambiental_id', 'orgao_ambiental', 'id'),
+        Index('ix_propostas_tipo_processo_id', 'tipo_processo', 'id'),
+        Index('ix_propostas_validade_id', 'validade', 'id'),
+    )
+
+    def __repr__(self):
+        return _repr(self, "id", "cliente_id", "orgao_ambiental", "tipo_processo", "validade")
+
+class Funcionario(Base):
+    __tablename__ = 'funcionarios'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nome = Column(String, unique=True, nullable=False)
+    email = Column(String, nullable=True)
+    propostas = relationship("Proposta", back_populates="responsavel")
+
+    def __repr__(self):
+        return _repr(self, "id", "nome")
+
+class NotificacaoPendente(Base):
+    __tablename__ = 'notificacoes_pendentes'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    destinatario = Column(String, nullable=False)
+    assunto = Column(String, nullable=False)
+    mensagem = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default='pendente')  # pendente, enviando, enviada, falha
+    tentativas = Column(Integer, nullable=False, default=0)
+    proximo_envio = Column(DateTime, nullable=False, default=datetime.now)
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+    enviado_em = Column(DateTime, nullable=True)
+    ultimo_erro = Column(String, nullable=True)
+    __table_args__ = (Index('ix_notificacoes_status_proximo_envio', 'status', 'proximo_envio'),)
+
+class NotificacaoPrazo(Base):
+    __tablename__ = 'notificacoes_prazo'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    proposta_id = Column(Integer, ForeignKey('propostas.id'), nullable=False)
+    nivel = Column(Integer, nullable=False)  # Dias de antecedência; 0 = prazo vencido
+    prazo_entrega = Column(DateTime, nullable=False)  # Prazo avisado; alterar o prazo rearma o aviso
+    enviado_em = Column(DateTime, nullable=False, default=datetime.now)
+    __table_args__ = (UniqueConstraint('proposta_id', 'nivel', 'prazo_entrega', name='uq_notificacao_prazo'),)
+
+# Sessões da API: criadas no /login; o token só existe com o cliente, aqui fica o SHA-256 dele
+class SessaoApi(Base):
+    __tablename__ = 'sessoes_api'
+    token_hash = Column(String, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False, index=True)
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+    expira_em = Column(DateTime, nullable=False)
+
+class TokenAgenda(Base):
+    # Segredo do feed iCalendar de um funcionário, na URL assinada pelo calendário; guardado só o hash
+    __tablename__ = 'tokens_agenda'
+    funcionario_id = Column(Integer, ForeignKey('funcionarios.id'), primary_key=True)
+    token_hash = Column(String, nullable=False)
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+
+class EstadoSistema(Base):
+    __tablename__ = 'estado_sistema'
+    chave = Column(String, primary_key=True)
+    valor = Column(String, nullable=True)
+
+class ResumoRenovacao(Base):
+    __tablename__ = 'resumo_renovacoes'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    orgao_ambiental = Column(String, nullable=False)
+    mes = Column(String, nullable=False)  # AAAA-MM da validade
+    responsavel_id = Column(Integer, ForeignKey('funcionarios.id'), nullable=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    renovacoes = Column(Integer, nullable=False, default=0)  # Propostas que já são renovação
+    atualizado_em = Column(DateTime, nullable=False, default=datetime.now)
+    __table_args__ = (UniqueConstraint('mes', 'orgao_ambiental', 'responsavel_id', name='uq_resumo_renovacao'),)
+
+# Trilha de auditoria: um evento por objeto gravado em cada flush, com as diferenças campo a campo
+class EventoAuditoria(Base):
+    __tablename__ = 'eventos_auditoria'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entidade = Column(String, nullable=False)  # Nome da tabela: clientes, propostas, usuarios
+    entidade_id = Column(Integer, nullable=False)
+    operacao = Column(String, nullable=False)  # inclusao, alteracao, exclusao
+    alteracoes = Column(Text, nullable=False)  # JSON {campo: [antes, depois]}
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+    # Histórico de uma entidade e reconstrução no tempo: faixa contígua do índice, em ordem de criado_em e id
+    __table_args__ = (Index('ix_eventos_auditoria_entidade', 'entidade', 'entidade_id', 'criado_em'),)
+
+# Somente inclusão: o próprio banco recusa alterar ou apagar eventos
+AUDITORIA_SOMENTE_INCLUSAO = [
+    "CREATE TRIGGER IF NOT EXISTS eventos_auditoria_bu BEFORE UPDATE ON eventos_auditoria BEGIN SELECT RAISE(ABORT, 'eventos_auditoria é somente de inclusão'); END",
+    "CREATE TRIGGER IF NOT EXISTS eventos_auditoria_bd BEFORE DELETE ON eventos_auditoria BEGIN SELECT RAISE(ABORT, 'eventos_auditoria é somente de inclusão'); END",
+]
+for _comando in AUDITORIA_SOMENTE_INCLUSAO:
+    event.listen(EventoAuditoria.__table__, "after_create", DDL(_comando).execute_if(dialect="sqlite"))
+
+# Busca textual (SQLite FTS5) sobre o nome do requerente e as observações das propostas,
+# mantida por triggers para valer também para inserções em massa fora do ORM
+FTS_CLIENTES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(nome_requerente, content='clientes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN INSERT INTO clientes_fts(rowid, nome_requerente) VALUES (new.id, new.nome_requerente); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN INSERT INTO clientes_fts(clientes_fts, rowid, nome_requerente) VALUES ('delete', old.id, old.nome_requerente); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_au AFTER UPDATE OF nome_requerente ON clientes BEGIN INSERT INTO clientes_fts(clientes_fts, rowid, nome_requerente) VALUES ('delete', old.id, old.nome_requerente); INSERT INTO clientes_fts(rowid, nome_requerente) VALUES (new.id, new.nome_requerente); END",
+]
+FTS_PROPOSTAS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS propostas_fts USING fts5(observacoes, content='propostas', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS propostas_fts_ai AFTER INSERT ON propostas BEGIN INSERT INTO propostas_fts(rowid, observacoes) VALUES (new.id, new.observacoes); END",
+    "CREATE TRIGGER IF NOT EXISTS propostas_fts_ad AFTER DELETE ON propostas BEGIN INSERT INTO propostas_fts(propostas_fts, rowid, observacoes) VALUES ('delete', old.id, old.observacoes); END",
+    "CREATE TRIGGER IF NOT EXISTS propostas_fts_au AFTER UPDATE OF observacoes ON propostas BEGIN INSERT INTO propostas_fts(propostas_fts, rowid, observacoes) VALUES ('delete', old.id, old.observacoes); INSERT INTO propostas_fts(rowid, observacoes) VALUES (new.id, new.observacoes); END",
+]
+for _tabela, _comandos in ((Cliente.__table__, FTS_CLIENTES), (Proposta.__table__, FTS_PROPOSTAS)):
+    for _comando in _comandos:
+        event.listen(_tabela, "after_create", DDL(_comando).execute_if(dialect="sqlite"))
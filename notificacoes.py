@@ -0,0 +1,159 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from database import SessionLocal
+from email_utils import PoolSMTP, enviar_mensagem
+from models import NotificacaoPendente
+import metricas
+from log_config import configurar_logging, medir
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+def enfileirar_email(db, destinatario, assunto, mensagem):
+    # Não faz commit: a notificação entra na mesma transação de quem a gerou
+    notificacao = NotificacaoPendente(destinatario=destinatario, assunto=assunto, mensagem=mensagem)
+    db.add(notificacao)
+    return notificacao
+
+def _enviar_lote(pool, lote):
+    resultados = []
+    with medir("notificacoes.lote", logger, quantidade=len(lote)):
+        while len(resultados) < len(lote):
+            antes = len(resultados)
+            try:
+                with pool.conexao() as server:
+                    for id_, destinatario, assunto, mensagem in lote[antes:]:
+                        try:
+                            enviar_mensagem(server, destinatario, assunto, mensagem)
+                        except Exception as e:
+                            resultados.append((id_, str(e)))
+                            raise
+                        resultados.append((id_, None))
+            except Exception as e:
+                if len(resultados) == antes:
+                    # Nem chegou a conectar: o restante do lote volta para a fila
+                    resultados.extend((i, str(e)) for i, *_ in lote[antes:])
+                # Senão o pool já descartou a conexão do erro; o restante segue por outra
+    return resultados
+
+class DespachanteNotificacoes:
+    """Envia a caixa de saída em lotes, com vários workers e conexões reaproveitadas."""
+
+    def __init__(self, fabrica_sessao=SessionLocal, workers=4, tamanho_lote=50, max_tentativas=5,
+                 espera_inicial=timedelta(seconds=30), intervalo=5.0, pool=None, reserva=timedelta(minutes=10)):
+        self.fabrica_sessao = fabrica_sessao
+        self.workers = workers
+        self.tamanho_lote = tamanho_lote
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.intervalo = intervalo
+        self.reserva = reserva
+        self.pool = pool or PoolSMTP(tamanho=workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp")
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _reservar(self, db):
+        """Marca como 'enviando' as notificações devidas que nenhum outro despachante reservou e as retorna."""
+        agora = datetime.now()
+        # Reserva vencida ('enviando' com proximo_envio no passado) é de um despachante que caiu no meio do envio
+        candidatas = (
+            db.query(NotificacaoPendente.id, NotificacaoPendente.destinatario,
+                     NotificacaoPendente.assunto, NotificacaoPendente.mensagem)
+            .filter(NotificacaoPendente.status.in_(('pendente', 'enviando')),
+                    NotificacaoPendente.proximo_envio <= agora)
+            .order_by(NotificacaoPendente.proximo_envio)
+            .limit(self.tamanho_lote * self.workers)
+            .all()
+        )
+        reservadas = []
+        for candidata in candidatas:
+            # Só um UPDATE vence por linha: o que vier depois já encontra a reserva no futuro e não altera nada
+            resultado = db.execute(
+                update(NotificacaoPendente)
+                .where(NotificacaoPendente.id == candidata.id,
+                       NotificacaoPendente.status.in_(('pendente', 'enviando')),
+                       NotificacaoPendente.proximo_envio <= agora)
+                .values(status='enviando', proximo_envio=agora + self.reserva)
+            )
+            if resultado.rowcount == 1:
+                reservadas.append(candidata)
+        db.commit()
+        return reservadas
+
+    def processar_pendentes(self):
+        """Processa uma rodada da caixa de saída e retorna (enviadas, falhas)."""
+        db = self.fabrica_sessao()
+        try:
+            pendentes = self._reservar(db)
+            if not pendentes:
+                return 0, 0
+            lotes = [pendentes[i:i + self.tamanho_lote] for i in range(0, len(pendentes), self.tamanho_lote)]
+            futuros = [self._executor.submit(_enviar_lote, self.pool, lote) for lote in lotes]
+            resultados = []
+            for futuro, lote in zip(futuros, lotes):
+                try:
+                    resultados.extend(futuro.result())
+                except Exception as e:
+                    resultados.extend((id_, str(e)) for id_, *_ in lote)
+            # Só esta thread escreve no banco, evitando disputa de lock entre os workers
+            return self._registrar(db, resultados)
+        finally:
+            db.close()
+
+    def _registrar(self, db, resultados):
+        agora = datetime.now()
+        enviadas = [id_ for id_, erro in resultados if erro is None]
+        if enviadas:
+            db.query(NotificacaoPendente).filter(NotificacaoPendente.id.in_(enviadas)).update(
+                {"status": "enviada", "enviado_em": agora, "ultimo_erro": None}, synchronize_session=False)
+        erros = {id_: erro for id_, erro in resultados if erro is not None}
+        metricas.registro.incrementar("emails_enviados", len(enviadas))
+        metricas.registro.incrementar("emails_falhos", len(erros))
+        if erros:
+            for notificacao in db.query(NotificacaoPendente).filter(NotificacaoPendente.id.in_(erros)):
+                notificacao.tentativas += 1
+                notificacao.ultimo_erro = erros[notificacao.id]
+                if notificacao.tentativas >= self.max_tentativas:
+                    notificacao.status = 'falha'
+                    logger.error(f"Notificação {notificacao.id} para {notificacao.destinatario} descartada após {notificacao.tentativas} tentativas: {notificacao.ultimo_erro}")
+                else:
+                    notificacao.status = 'pendente'
+                    notificacao.proximo_envio = agora + self.espera_inicial * 2 ** (notificacao.tentativas - 1)
+        db.commit()
+        logger.info(f"Caixa de saída processada: {len(enviadas)} enviadas, {len(erros)} com erro.")
+        return len(enviadas), len(erros)
+
+    def _laco(self):
+        while not self._parar.is_set():
+            self._acordar.clear()
+            try:
+                enviadas, falhas = self.processar_pendentes()
+            except Exception as e:
+                logger.error(f"Erro ao processar a caixa de saída: {e}")
+                enviadas = falhas = 0
+            # Rodada cheia indica que ainda há fila: continua sem esperar
+            if enviadas + falhas < self.tamanho_lote * self.workers:
+                self._acordar.wait(self.intervalo)
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._laco, name="despachante-notificacoes", daemon=True)
+            self._thread.start()
+
+    def acordar(self):
+        self._acordar.set()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+        self.pool.fechar()
@@ -0,0 +1,108 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import exists
+from database import SessionLocal
+from models import Cliente, Funcionario, NotificacaoPrazo, Proposta
+from notificacoes import enfileirar_email
+import metricas
+from log_config import configurar_logging, medido
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# Níveis de alerta em dias antes do prazo; 0 é o aviso de prazo vencido
+NIVEIS_PADRAO = (7, 3, 1, 0)
+# Até quantos dias depois de vencido um prazo ainda recebe o aviso de nível 0
+PRAZOS_LIMITE_VENCIDOS = timedelta(days=float(os.getenv("PRAZOS_LIMITE_VENCIDOS", "7")))
+
+def descricao_nivel(nivel):
+    if nivel == 0:
+        return "VENCIDO"
+    return f"vence em até {nivel} dia{'s' if nivel > 1 else ''}"
+
+def buscar_prazos(db, agora, niveis=NIVEIS_PADRAO, limite_vencidos=PRAZOS_LIMITE_VENCIDOS):
+    """Retorna (proposta, funcionario, cliente, nivel) ainda não avisados.
+
+    Cada proposta cai só no nível mais urgente que já alcançou e entra enquanto
+    esse nível não tiver aviso registrado para o prazo atual: tanto o prazo que
+    cruzou um nível com o passar do tempo quanto o criado ou editado já dentro
+    dele. Vencidos só contam até ``limite_vencidos`` atrás, para o primeiro
+    ciclo não avisar o histórico inteiro. Prazos de funcionários sem e-mail ficam
+    de fora, sem registro: entram no primeiro ciclo depois de o e-mail ser cadastrado.
+    """
+    niveis = sorted(set(niveis), reverse=True)
+    resultados = []
+    for i, nivel in enumerate(niveis):
+        superior = agora + timedelta(days=nivel)
+        inferior = agora + timedelta(days=niveis[i + 1]) if i + 1 < len(niveis) else agora - limite_vencidos
+        ja_avisado = exists().where(
+            NotificacaoPrazo.proposta_id == Proposta.id,
+            NotificacaoPrazo.nivel == nivel,
+            NotificacaoPrazo.prazo_entrega == Proposta.prazo_entrega,
+        )
+        consulta = (
+            db.query(Proposta, Funcionario, Cliente)
+            .join(Funcionario, Proposta.responsavel_id == Funcionario.id)
+            .join(Cliente, Proposta.cliente_id == Cliente.id)
+            .filter(Proposta.prazo_entrega <= superior, Proposta.prazo_entrega > inferior)
+            .filter(~ja_avisado)
+        )
+        resultados.extend((proposta, funcionario, cliente, nivel) for proposta, funcionario, cliente in consulta)
+    sem_email = [linha for linha in resultados if not linha[1].email]
+    if sem_email:
+        # Sem isto o aviso simplesmente não sai e nada diz por quê
+        nomes = sorted({funcionario.nome for _, funcionario, _, _ in sem_email})
+        logger.warning(f"{len(sem_email)} prazo(s) sem aviso: funcionário sem e-mail cadastrado ({', '.join(nomes)}).")
+        metricas.registro.incrementar("prazos_sem_email", len(sem_email))
+        resultados = [linha for linha in resultados if linha[1].email]
+    resultados.sort(key=lambda linha: (linha[1].id, linha[0].prazo_entrega))
+    return resultados
+
+def montar_digest(funcionario, itens):
+    linhas = [
+        f"- {proposta.prazo_entrega:%d/%m/%Y %H:%M} ({descricao_nivel(nivel)}) | {cliente.nome_requerente} | {proposta.tipo_processo} | {proposta.orgao_ambiental}"
+        for proposta, cliente, nivel in itens
+    ]
+    assunto = f"Prazos de Entrega Aproximando ({len(itens)} proposta{'s' if len(itens) > 1 else ''})"
+    mensagem = f"Olá {funcionario.nome},\n\nAs seguintes propostas sob sua responsabilidade têm prazo de entrega próximo:\n\n" + "\n".join(linhas) + "\n\nPor favor, certifique-se de que todas as tarefas necessárias sejam concluídas a tempo.\n\nObrigado!"
+    return assunto, mensagem
+
+@medido("prazos.notificar_prazos")
+def notificar_prazos(db, agora=None, niveis=NIVEIS_PADRAO, digest=True):
+    """Enfileira os avisos e registra o que foi avisado, sem fazer commit."""
+    agora = agora or datetime.now()
+    resultados = buscar_prazos(db, agora, niveis)
+    if digest:
+        # Um único e-mail por funcionário com todas as propostas dele
+        for _, grupo in groupby(resultados, key=lambda linha: linha[1].id):
+            grupo = list(grupo)
+            funcionario = grupo[0][1]
+            assunto, mensagem = montar_digest(funcionario, [(proposta, cliente, nivel) for proposta, _, cliente, nivel in grupo])
+            enfileirar_email(db, funcionario.email, assunto, mensagem)
+    else:
+        for proposta, funcionario, cliente, nivel in resultados:
+            assunto = "Prazo de Entrega Vencido" if nivel == 0 else "Prazo de Entrega Aproximando"
+            mensagem = f"Olá {funcionario.nome},\n\nO prazo de entrega da proposta '{proposta.tipo_processo}' para o cliente '{cliente.nome_requerente}' {descricao_nivel(nivel)}. O prazo é {proposta.prazo_entrega}.\n\nPor favor, certifique-se de que todas as tarefas necessárias sejam concluídas a tempo.\n\nObrigado!"
+            enfileirar_email(db, funcionario.email, assunto, mensagem)
+    # O registro entra na mesma transação que a caixa de saída: reiniciar não reenvia
+    db.add_all(
+        NotificacaoPrazo(proposta_id=proposta.id, nivel=nivel, prazo_entrega=proposta.prazo_entrega, enviado_em=agora)
+        for proposta, _, _, nivel in resultados
+    )
+    return len(resultados)
+
+def verificar_prazos(digest=True):
+    db = SessionLocal()
+    try:
+        total = notificar_prazos(db, digest=digest)
+        db.commit()
+        logger.info(f"Verificação de prazos concluída: {total} avisos enfileirados.")
+        return total
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao verificar prazos: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import io
+import logging
+import os
+from datetime import date, datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Cliente, Funcionario, Proposta
+from log_config import configurar_logging, medir
+
+# Configuração do logging
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# Linhas buscadas por vez no cursor: a memória fica limitada a um lote, qualquer que seja o tamanho do relatório
+RELATORIOS_LOTE = int(os.getenv("RELATORIOS_LOTE", "1000"))
+FORMATOS = ("csv", "xlsx", "pdf")
+
+# (título, coluna) na ordem das colunas do relatório
+COLUNAS = (
+    ("ID", Proposta.id),
+    ("Cliente", Cliente.nome_requerente),
+    ("CNPJ/CPF", Cliente.cnpj_cpf),
+    ("Órgão Ambiental", Proposta.orgao_ambiental),
+    ("Tipo de Processo", Proposta.tipo_processo),
+    ("Renovação", Proposta.renovacao),
+    ("Número da Documentação", Proposta.numero_documento),
+    ("Validade", Proposta.validade),
+    ("Mensal", Proposta.mensal),
+    ("Responsável", Funcionario.nome),
+    ("Tipo de Trabalho", Proposta.tipo_trabalho),
+    ("Reunião", Proposta.data_hora_reuniao),
+    ("Prazo de Entrega", Proposta.prazo_entrega),
+    ("Observações", Proposta.observacoes),
+)
+TITULOS = [titulo for titulo, _ in COLUNAS]
+
+def consulta_relatorio(orgao_ambiental: str = None, tipo_processo: str = None, responsavel_id: int = None,
+                       validade_de: date = None, validade_ate: date = None):
+    """SELECT das propostas com cliente e responsável; o período filtra pela validade."""
+    consulta = (
+        select(*(coluna for _, coluna in COLUNAS))
+        .join(Cliente, Cliente.id == Proposta.cliente_id)
+        .outerjoin(Funcionario, Funcionario.id == Proposta.responsavel_id)
+    )
+    if orgao_ambiental:
+        consulta = consulta.where(Proposta.orgao_ambiental == orgao_ambiental)
+    if tipo_processo:
+        consulta = consulta.where(Proposta.tipo_processo == tipo_processo)
+    if responsavel_id is not None:
+        consulta = consulta.where(Proposta.responsavel_id == responsavel_id)
+    if validade_de is not None:
+        consulta = consulta.where(Proposta.validade >= validade_de)
+    if validade_ate is not None:
+        consulta = consulta.where(Proposta.validade <= validade_ate)
+    # Ordem que o índice usado já entrega: um ORDER BY fora dele faria o banco ordenar todas as linhas antes da primeira
+    if validade_de is not None or validade_ate is not None:
+        return consulta.order_by(Proposta.validade, Proposta.id)
+    return consulta.order_by(Proposta.id)
+
+def linhas_relatorio(db: Session, lote: int = RELATORIOS_LOTE, **filtros):
+    """Gera as linhas do relatório por um cursor do lado do servidor, um lote por vez."""
+    resultado = db.execute(consulta_relatorio(**filtros).execution_options(yield_per=lote))
+    try:
+        yield from resultado
+    finally:
+        resultado.close()
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "sim" if valor else "não"
+    if isinstance(valor, datetime):
+        return f"{valor:%Y-%m-%d %H:%M}"
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+def escrever_csv(linhas, arquivo):
+    escritor = csv.writer(arquivo, delimiter=";")
+    escritor.writerow(TITULOS)
+    total = 0
+    for linha in linhas:
+        escritor.writerow([_texto(valor) for valor in linha])
+        total += 1
+    return total
+
+def blocos_csv(linhas, tamanho=64 * 1024):
+    """CSV em blocos de texto, para respostas HTTP em streaming."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    escritor.writerow(TITULOS)
+    for linha in linhas:
+        escritor.writerow([_texto(valor) for valor in linha])
+        if buffer.tell() >= tamanho:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def escrever_xlsx(linhas, caminho):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("A exportação para XLSX requer o pacote openpyxl (pip install openpyxl).")
+    # write_only grava cada linha no arquivo temporário da planilha em vez de montar as células na memória
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet("Propostas")
+    planilha.append(TITULOS)
+    total = 0
+    for linha in linhas:
+        planilha.append(list(linha))
+        total += 1
+    livro.save(caminho)
+    return total
+
+def escrever_pdf(linhas, caminho):
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from reportlab.pdfgen.canvas import Canvas
+    except ImportError:
+        raise RuntimeError("A exportação para PDF requer o pacote reportlab (pip install reportlab).")
+    # Exceção à memória constante dos outros formatos: o canvas do reportlab guarda todas as páginas prontas
+    # (comprimidas) até o save, então a memória cresce com o relatório. Direto no canvas, página a página, ainda
+    # evita o platypus, que montaria a tabela inteira antes de paginar; para centenas de milhares de linhas, prefira
+    # CSV ou XLSX
+    largura, altura = landscape(A4)
+    margem, altura_linha, fonte, tamanho_fonte = 20, 11, "Helvetica", 6
+    pesos = (3, 10, 8, 6, 7, 4, 7, 5, 4, 7, 8, 7, 7, 13)
+    larguras = [(largura - 2 * margem) * peso / sum(pesos) for peso in pesos]
+
+    def cortar(texto, limite):
+        if stringWidth(texto, fonte, tamanho_fonte) <= limite:
+            return texto
+        # Busca binária pelo maior prefixo que cabe: O(log n) medições por célula em vez de uma por caractere
+        cabe, nao_cabe = 0, len(texto)
+        while nao_cabe - cabe > 1:
+            meio = (cabe + nao_cabe) // 2
+            if stringWidth(texto[:meio], fonte, tamanho_fonte) <= limite:
+                cabe = meio
+            else:
+                nao_cabe = meio
+        return texto[:cabe]
+
+    def escrever_linha(canvas, valores, y):
+        x = margem
+        for valor, largura_coluna in zip(valores, larguras):
+            canvas.drawString(x, y, cortar(_texto(valor), largura_coluna - 2))
+            x += largura_coluna
+
+    canvas = Canvas(caminho, pagesize=(largura, altura), pageCompression=1)
+    pagina, total = 1, 0
+
+    def nova_pagina():
+        canvas.setFont(f"{fonte}-Bold", tamanho_fonte)
+        escrever_linha(canvas, TITULOS, altura - margem)
+        canvas.setFont(fonte, tamanho_fonte)
+        canvas.drawRightString(largura - margem, margem / 2, f"Página {pagina}")
+        return altura - margem - altura_linha * 1.5
+
+    y = nova_pagina()
+    for linha in linhas:
+        if y < margem:
+            canvas.showPage()
+            pagina += 1
+            y = nova_pagina()
+        escrever_linha(canvas, linha, y)
+        y -= altura_linha
+        total += 1
+    canvas.save()
+    return total
+
+def exportar(db: Session, formato: str, caminho: str, lote: int = RELATORIOS_LOTE, **filtros):
+    """Grava o relatório de propostas em CSV, XLSX ou PDF e devolve o número de linhas."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}. Use {', '.join(FORMATOS)}.")
+    with medir(f"relatorios.{formato}", logger, caminho=caminho) as campos:
+        linhas = linhas_relatorio(db, lote, **filtros)
+        if formato == "csv":
+            with open(caminho, "w", newline="", encoding="utf-8-sig") as arquivo:
+                total = escrever_csv(linhas, arquivo)
+        elif formato == "xlsx":
+            total = escrever_xlsx(linhas, caminho)
+        else:
+            total = escrever_pdf(linhas, caminho)
+        campos["linhas"] = total
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de propostas com cliente e responsável, em CSV, XLSX ou PDF.")
+    parser.add_argument("formato", choices=FORMATOS)
+    parser.add_argument("arquivo")
+    parser.add_argument("--orgao", help="órgão ambiental")
+    parser.add_argument("--tipo-processo")
+    parser.add_argument("--responsavel", type=int, help="id do funcionário responsável")
+    parser.add_argument("--de", type=date.fromisoformat, help="validade a partir de (YYYY-MM-DD)")
+    parser.add_argument("--ate", type=date.fromisoformat, help="validade até (YYYY-MM-DD)")
+    parser.add_argument("--lote", type=int, default=RELATORIOS_LOTE, help="linhas lidas por vez do banco")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = exportar(db, args.formato, args.arquivo, args.lote, orgao_ambiental=args.orgao,
+                         tipo_processo=args.tipo_processo, responsavel_id=args.responsavel,
+                         validade_de=args.de, validade_ate=args.ate)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        db.close()
+    print(f"Relatório gravado em {args.arquivo}: {total} propostas.")
+
+if __name__ == "__main__":
+    main()
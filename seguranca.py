@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Custo do bcrypt; ao mudar, os hashes antigos são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Cache de autenticações recentes: desligado por padrão (0 segundos)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "0"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "1024"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Versões recentes do bcrypt fazem o passlib registrar um traceback ao detectar a versão
+logging.getLogger("passlib.handlers.bcrypt").setLevel(logging.ERROR)
+
+_pwd_context = None
+_lock_contexto = threading.Lock()
+
+def contexto_senhas():
+    """Contexto único de criptografia, criado no primeiro uso para não pesar na partida do programa."""
+    global _pwd_context
+    if _pwd_context is None:
+        with _lock_contexto:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                contexto = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+                # Backend carregado aqui, uma vez, e não no meio de logins concorrentes
+                contexto.handler("bcrypt").get_backend()
+                _pwd_context = contexto
+    return _pwd_context
+
+class CacheAutenticacao:
+    """Guarda por pouco tempo as senhas já verificadas, apenas como HMAC com chave do processo."""
+
+    def __init__(self, ttl=AUTH_CACHE_TTL, tamanho_maximo=AUTH_CACHE_MAX):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._chave = secrets.token_bytes(32)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _assinatura(self, senha, hashed_password):
+        # O hash armazenado entra na assinatura: trocar a senha invalida a entrada
+        return hmac.new(self._chave, f"{hashed_password}\0{senha}".encode(), hashlib.sha256).digest()
+
+    def contem(self, senha, hashed_password):
+        if self.ttl <= 0:
+            return False
+        assinatura = self._assinatura(senha, hashed_password)
+        with self._lock:
+            expira = self._entradas.get(assinatura)
+            if expira is None:
+                return False
+            if expira < time.monotonic():
+                del self._entradas[assinatura]
+                return False
+            self._entradas.move_to_end(assinatura)
+            return True
+
+    def adicionar(self, senha, hashed_password):
+        if self.ttl <= 0:
+            return
+        assinatura = self._assinatura(senha, hashed_password)
+        with self._lock:
+            self._entradas[assinatura] = time.monotonic() + self.ttl
+            self._entradas.move_to_end(assinatura)
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+cache_autenticacao = CacheAutenticacao()
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+
+def gerar_hash(senha):
+    return contexto_senhas().hash(senha)
+
+def verificar_senha(senha, hashed_password):
+    """Retorna (válida, novo_hash); novo_hash vem preenchido quando o custo configurado mudou."""
+    if cache_autenticacao.contem(senha, hashed_password):
+        return True, None
+    valida, novo_hash = contexto_senhas().verify_and_update(senha, hashed_password)
+    if valida:
+        cache_autenticacao.adicionar(senha, novo_hash or hashed_password)
+    return valida, novo_hash
+
+def submeter_verificacao(senha, hashed_password):
+    # O bcrypt libera o GIL, então o pool de threads calcula hashes em paralelo
+    return _executor.submit(verificar_senha, senha, hashed_password)
+
+async def verificar_senha_async(senha, hashed_password):
+    return await asyncio.wrap_future(submeter_verificacao(senha, hashed_password))
+
+async def gerar_hash_async(senha):
+    return await asyncio.wrap_future(_executor.submit(gerar_hash, senha))
+
+def gerar_token():
+    """Token de sessão da API; no banco fica só o token_hash dele."""
+    return secrets.token_urlsafe(32)
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
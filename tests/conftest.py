@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Antes de importar os módulos do projeto: nada de propostas.db nem app.log do repositório durante os testes
+_TMP = tempfile.mkdtemp(prefix="propostas-testes-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'propostas.db')}")
+os.environ.setdefault("LOG_ARQUIVO", os.path.join(_TMP, "app.log"))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import criar_engine  # noqa: E402
+from models import Base  # noqa: E402
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = criar_engine(f"sqlite:///{tmp_path / 'teste.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def fabrica(engine):
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import alteracoes
+from agenda import AgendaFuncionarios
+from atribuicao import IndiceCarga
+from models import Cliente, Funcionario, Proposta
+
+@pytest.fixture
+def indices(fabrica):
+    agenda, carga = AgendaFuncionarios(fabrica), IndiceCarga(fabrica)
+    for indice in (agenda, carga):
+        alteracoes.assinar(indice._aplicar)
+    yield agenda, carga
+    for indice in (agenda, carga):
+        alteracoes._assinantes.remove(indice._aplicar)
+
+@pytest.fixture
+def dados(fabrica):
+    amanha = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    with fabrica() as db:
+        ana, bruno = Funcionario(nome="Ana"), Funcionario(nome="Bruno")
+        cliente = Cliente(cnpj_cpf="1", nome_requerente="Cliente", telefone="21", email="c@example.com")
+        db.add_all([ana, bruno, cliente])
+        db.flush()
+        proposta = Proposta(cliente_id=cliente.id, orgao_ambiental="INEA", tipo_processo="LO", validade=date(2030, 1, 1),
+                            responsavel_id=ana.id, data_hora_reuniao=amanha)
+        db.add(proposta)
+        db.commit()
+        return ana.id, bruno.id, proposta.id, amanha
+
+def test_etag_so_muda_quando_muda_a_agenda_do_funcionario(fabrica, indices, dados):
+    agenda, _ = indices
+    ana, bruno, proposta_id, amanha = dados
+    _, etag_ana = agenda.ical(ana)
+    _, etag_bruno = agenda.ical(bruno)
+    # A recarga completa periódica não altera o ETag de quem não mudou
+    agenda.carregar()
+    assert agenda.ical(ana)[1] == etag_ana
+    with fabrica() as db:
+        db.get(Proposta, proposta_id).data_hora_reuniao = amanha + timedelta(hours=3)
+        db.commit()
+    assert agenda.ical(ana)[1] != etag_ana
+    assert agenda.ical(bruno)[1] == etag_bruno
+
+def test_indices_recebem_so_o_que_foi_confirmado(fabrica, indices, dados):
+    agenda, carga = indices
+    ana, bruno, proposta_id, amanha = dados
+    assert (carga.carga(ana), carga.carga(bruno)) == (1, 0)
+    assert agenda.ocupados(amanha) == {ana}
+    with fabrica() as db:
+        db.get(Proposta, proposta_id).responsavel_id = bruno
+        db.flush()
+        db.rollback()
+    assert (carga.carga(ana), carga.carga(bruno)) == (1, 0)
+    assert agenda.ocupados(amanha) == {ana}
+    with fabrica() as db:
+        db.get(Proposta, proposta_id).responsavel_id = bruno
+        db.commit()
+    assert (carga.carga(ana), carga.carga(bruno)) == (0, 1)
+    assert agenda.ocupados(amanha) == {bruno}
+
+def test_commit_durante_a_recarga_entra_na_agenda_nova(fabrica, indices, dados):
+    agenda, _ = indices
+    ana, bruno, proposta_id, amanha = dados
+    ler = agenda._ler
+
+    def ler_e_gravar(db):
+        lidos = ler(db)
+        # Confirmado depois da consulta e antes de a agenda nova entrar no lugar
+        with fabrica() as outra:
+            outra.get(Proposta, proposta_id).responsavel_id = bruno
+            outra.commit()
+        return lidos
+
+    agenda._ler = ler_e_gravar
+    agenda.carregar()
+    assert agenda.ocupados(amanha) == {bruno}
+    assert "reuniao" in agenda.ical(bruno)[0] and "reuniao" not in agenda.ical(ana)[0]
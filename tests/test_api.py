@@ -0,0 +1,97 @@
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import crud  # noqa: E402
+from api import app  # noqa: E402
+from database import init_db, sessao  # noqa: E402
+
+@pytest.fixture(scope="module")
+def cliente_http():
+    init_db()
+    with sessao() as db:
+        crud.cadastrar_usuario(db, "admin-api", "senha-admin", True)
+        crud.cadastrar_usuario(db, "comum-api", "senha-comum", False)
+    with TestClient(app) as cliente:
+        yield cliente
+
+def _entrar(cliente_http, username, password):
+    resposta = cliente_http.post("/login", json={"username": username, "password": password})
+    assert resposta.status_code == 200
+    return {"Authorization": f"Bearer {resposta.json()['token']}"}
+
+@pytest.mark.parametrize("metodo, caminho, corpo", [
+    ("POST", "/usuarios", {"username": "intruso", "password": "x", "is_admin": True}),
+    ("POST", "/clientes", {"cnpj_cpf": "anonimo", "nome_requerente": "A", "telefone": "21", "email": "a@example.com"}),
+    ("POST", "/funcionarios", {"nome": "Anônimo"}),
+    ("PATCH", "/funcionarios/1", {"email": "anonimo@example.com"}),
+    ("POST", "/funcionarios/1/agenda/token", None),
+    ("POST", "/prazos/verificar", None),
+    ("GET", "/propostas", None),
+    ("GET", "/relatorios/propostas.csv", None),
+])
+def test_rotas_exigem_token(cliente_http, metodo, caminho, corpo):
+    for cabecalhos in ({}, {"Authorization": "Bearer token-inventado"}):
+        resposta = cliente_http.request(metodo, caminho, json=corpo, headers=cabecalhos)
+        assert resposta.status_code == 401
+        assert resposta.headers["WWW-Authenticate"] == "Bearer"
+
+def test_login_com_senha_errada(cliente_http):
+    assert cliente_http.post("/login", json={"username": "admin-api", "password": "errada"}).status_code == 401
+
+def test_so_administrador_cadastra_usuarios(cliente_http):
+    comum = _entrar(cliente_http, "comum-api", "senha-comum")
+    novo = {"username": "novo-admin", "password": "senha", "is_admin": True}
+    assert cliente_http.post("/usuarios", json=novo, headers=comum).status_code == 403
+    admin = _entrar(cliente_http, "admin-api", "senha-admin")
+    assert cliente_http.post("/usuarios", json=novo, headers=admin).status_code == 201
+    assert cliente_http.post("/login", json={"username": "novo-admin", "password": "senha"}).json()["is_admin"] is True
+
+def test_token_vale_ate_o_logout(cliente_http):
+    cabecalhos = _entrar(cliente_http, "comum-api", "senha-comum")
+    resposta = cliente_http.post("/clientes", headers=cabecalhos, json={
+        "cnpj_cpf": "token-1", "nome_requerente": "Cliente Token", "telefone": "21", "email": "t@example.com"})
+    assert resposta.status_code == 201
+    assert cliente_http.get("/relatorios/propostas.csv", headers=cabecalhos).status_code == 200
+    assert cliente_http.post("/logout", headers=cabecalhos).status_code == 204
+    assert cliente_http.get("/propostas", headers=cabecalhos).status_code == 401
+
+def test_busca_com_termo_em_branco_e_cursor_invalido(cliente_http):
+    cabecalhos = _entrar(cliente_http, "comum-api", "senha-comum")
+    assert cliente_http.get("/propostas", params={"nome_cliente": "  "}, headers=cabecalhos).status_code == 200
+    resposta = cliente_http.get("/propostas", params={"cursor": "WyIyMDMwLTAxLTAxIiwgMV0="}, headers=cabecalhos)
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == "Cursor de paginação inválido."
+
+def test_email_de_funcionario_pode_ser_cadastrado_e_trocado(cliente_http):
+    cabecalhos = _entrar(cliente_http, "comum-api", "senha-comum")
+    funcionario_id = cliente_http.post("/funcionarios", json={"nome": "Funcionário API"}, headers=cabecalhos).json()["id"]
+    resposta = cliente_http.patch(f"/funcionarios/{funcionario_id}", json={"email": "api@example.com"}, headers=cabecalhos)
+    assert resposta.status_code == 200
+    resposta = cliente_http.post("/funcionarios", json={"nome": "Funcionário API", "email": "novo@example.com"}, headers=cabecalhos)
+    assert resposta.json()["id"] == funcionario_id
+    funcionarios = {f["id"]: f for f in cliente_http.get("/funcionarios", headers=cabecalhos).json()}
+    assert funcionarios[funcionario_id]["email"] == "novo@example.com"
+    assert cliente_http.patch("/funcionarios/999999", json={"email": "x@example.com"}, headers=cabecalhos).status_code == 404
+
+def test_agenda_ics_so_com_o_token_do_funcionario(cliente_http):
+    cabecalhos = _entrar(cliente_http, "comum-api", "senha-comum")
+    funcionario_id = cliente_http.post("/funcionarios", json={"nome": "Funcionário Agenda"}, headers=cabecalhos).json()["id"]
+    outro_id = cliente_http.post("/funcionarios", json={"nome": "Outro Agenda"}, headers=cabecalhos).json()["id"]
+    caminho = f"/funcionarios/{funcionario_id}/agenda.ics"
+    # Sem token, ou com um token inventado, a resposta é a de um funcionário inexistente
+    assert cliente_http.get(caminho).status_code == 404
+    assert cliente_http.get(caminho, headers=cabecalhos).status_code == 404
+    assert cliente_http.get(caminho, params={"token": "inventado"}).status_code == 404
+    primeiro = cliente_http.post(f"/funcionarios/{funcionario_id}/agenda/token", headers=cabecalhos).json()
+    resposta = cliente_http.get(primeiro["url"])
+    assert resposta.status_code == 200 and resposta.text.startswith("BEGIN:VCALENDAR")
+    # O token de um funcionário não abre a agenda de outro, e um token novo revoga o anterior
+    assert cliente_http.get(f"/funcionarios/{outro_id}/agenda.ics", params={"token": primeiro["token"]}).status_code == 404
+    segundo = cliente_http.post(f"/funcionarios/{funcionario_id}/agenda/token", headers=cabecalhos).json()
+    assert cliente_http.get(primeiro["url"]).status_code == 404
+    assert cliente_http.get(segundo["url"]).status_code == 200
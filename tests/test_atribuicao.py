@@ -0,0 +1,74 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import alteracoes
+from atribuicao import IndiceCarga
+from models import Cliente, Funcionario, Proposta
+
+@pytest.fixture
+def carga(fabrica):
+    indice = IndiceCarga(fabrica)
+    alteracoes.assinar(indice._aplicar)
+    yield indice
+    alteracoes._assinantes.remove(indice._aplicar)
+
+@pytest.fixture
+def dados(fabrica):
+    with fabrica() as db:
+        ana, bruno = Funcionario(nome="Ana"), Funcionario(nome="Bruno")
+        cliente = Cliente(cnpj_cpf="1", nome_requerente="Cliente", telefone="21", email="c@example.com")
+        db.add_all([ana, bruno, cliente])
+        db.commit()
+        return ana.id, bruno.id, cliente.id
+
+def _proposta(fabrica, cliente_id, responsavel_id):
+    with fabrica() as db:
+        db.add(Proposta(cliente_id=cliente_id, orgao_ambiental="INEA", tipo_processo="LO", validade=date(2030, 1, 1),
+                        responsavel_id=responsavel_id, prazo_entrega=datetime.now() + timedelta(days=5)))
+        db.commit()
+
+def test_commit_entre_a_consulta_e_a_troca_nao_se_perde(fabrica, carga, dados):
+    ana, bruno, cliente_id = dados
+    ler = carga._ler
+
+    def ler_e_gravar(db):
+        lidos = ler(db)
+        # Confirmado depois da consulta e antes de o estado novo entrar no lugar
+        _proposta(fabrica, cliente_id, bruno)
+        return lidos
+
+    carga._ler = ler_e_gravar
+    carga.carregar()
+    assert (carga.carga(ana), carga.carga(bruno)) == (0, 1)
+    carga.carregar()
+    assert (carga.carga(ana), carga.carga(bruno)) == (0, 2)
+
+def test_recarga_nao_trava_commits_nem_leituras(fabrica, carga, dados):
+    ana, bruno, cliente_id = dados
+    assert carga.carga(ana) == 0
+    ler, liberar, lendo = carga._ler, threading.Event(), threading.Event()
+
+    def ler_devagar(db):
+        lendo.set()
+        assert liberar.wait(10)
+        return ler(db)
+
+    carga._ler = ler_devagar
+    carga.recarga = 0
+    leitor = threading.Thread(target=carga.carga, args=(ana,))
+    leitor.start()
+    try:
+        assert lendo.wait(10)
+        # Durante a recarga: o commit aplica a operação sem esperar e as leituras seguem com o estado atual
+        gravador = threading.Thread(target=_proposta, args=(fabrica, cliente_id, ana))
+        gravador.start()
+        gravador.join(5)
+        assert not gravador.is_alive()
+        carga.recarga = 300
+        assert carga.carga(ana) == 1
+    finally:
+        liberar.set()
+        leitor.join(10)
+    assert carga.carga(ana) == 1
@@ -0,0 +1,21 @@
+from datetime import date
+
+from sqlalchemy.orm import sessionmaker
+
+from auditoria import historico
+from models import Cliente, Proposta
+
+def test_alteracao_de_campo_expirado_registra_o_valor_anterior(engine):
+    # Sessão padrão, com expire_on_commit: depois do commit nenhum campo está carregado quando é alterado
+    with sessionmaker(bind=engine)() as db:
+        cliente = Cliente(cnpj_cpf="1", nome_requerente="Antigo", telefone="21", email="cliente@example.com")
+        db.add(cliente)
+        db.flush()
+        proposta = Proposta(cliente_id=cliente.id, orgao_ambiental="INEA", tipo_processo="LO", validade=date(2030, 1, 1))
+        db.add(proposta)
+        db.commit()
+        cliente.nome_requerente = "Novo"
+        proposta.orgao_ambiental = "Municipal"
+        db.commit()
+        assert historico(db, Cliente, cliente.id)[-1][1:] == ("alteracao", {"nome_requerente": ["Antigo", "Novo"]})
+        assert historico(db, Proposta, proposta.id)[-1][1:] == ("alteracao", {"orgao_ambiental": ["INEA", "Municipal"]})
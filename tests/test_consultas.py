@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from consultas import _codificar_cursor, buscar_clientes, buscar_propostas
+from models import Cliente, Proposta
+
+@pytest.fixture
+def db(fabrica):
+    with fabrica() as db:
+        clientes = [Cliente(cnpj_cpf=str(i), nome_requerente=f"Cliente {i}", telefone="21", email="c@example.com")
+                    for i in range(3)]
+        db.add_all(clientes)
+        db.flush()
+        db.add_all(Proposta(cliente_id=cliente.id, orgao_ambiental="INEA", tipo_processo="LO",
+                            validade=date(2030, 1, 1 + i), observacoes=f"vistoria {i}")
+                   for i, cliente in enumerate(clientes))
+        db.commit()
+        yield db
+
+@pytest.mark.parametrize("termo", ["", "   ", "\t"])
+def test_termo_em_branco_nao_filtra(db, termo):
+    assert len(buscar_propostas(db, nome_cliente=termo)) == 3
+    assert len(buscar_propostas(db, texto=termo)) == 3
+    assert len(buscar_clientes(db, nome=termo)) == 3
+
+def test_termo_so_com_pontuacao_nao_falha(db):
+    assert len(buscar_propostas(db, nome_cliente="!!", texto="-")) == 0
+
+def test_cursor_de_outra_ordenacao_e_recusado(db):
+    pagina = buscar_propostas(db, validade_de=date(2030, 1, 1), limite=1)
+    assert len(pagina) == 1 and pagina.proximo_cursor
+    assert len(buscar_propostas(db, validade_de=date(2030, 1, 1), cursor=pagina.proximo_cursor)) == 2
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        buscar_propostas(db, cursor=pagina.proximo_cursor)
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        buscar_propostas(db, validade_de=date(2030, 1, 1), cursor=buscar_propostas(db, limite=1).proximo_cursor)
+
+@pytest.mark.parametrize("valores", [None, "1", True, 1.5, [1], ["2030-01-01"], ["2030-01-01", 1, 2], ["amanhã", 1], [20300101, 1]])
+def test_cursor_malformado_e_recusado(db, valores):
+    for filtros in ({}, {"validade_de": date(2030, 1, 1)}):
+        with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+            buscar_propostas(db, cursor=_codificar_cursor(valores), **filtros)
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        buscar_clientes(db, cursor="não é base64")
@@ -0,0 +1,46 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from importacao import FORMATOS_DATA, FORMATOS_DATA_HORA, ConversorData, importar_clientes, importar_propostas
+from models import Cliente, Proposta
+
+def _cliente(cnpj_cpf, email="cliente@example.com"):
+    return {"cnpj_cpf": cnpj_cpf, "nome_requerente": f"Cliente {cnpj_cpf}", "telefone": "21", "email": email}
+
+def test_coluna_com_formatos_misturados():
+    validade = ConversorData(FORMATOS_DATA, somente_data=True)
+    assert validade("31/01/2024") == date(2024, 1, 31)
+    assert validade("2024-02-29") == date(2024, 2, 29)
+    assert validade("01/03/2024") == date(2024, 3, 1)
+    with pytest.raises(ValueError):
+        validade("2024/03/01")
+
+def test_importacao_de_propostas_com_datas_em_formatos_diferentes(fabrica):
+    with fabrica() as db:
+        importar_clientes(db, [(2, _cliente("1"))])
+        base = {"cnpj_cpf": "1", "orgao_ambiental": "INEA", "tipo_processo": "LO"}
+        resultado = importar_propostas(db, [
+            (2, {**base, "validade": "31/01/2024", "prazo_entrega": "31/01/2024 10:00"}),
+            (3, {**base, "validade": "2024-01-31", "prazo_entrega": "2024-01-31 10:00:00"}),
+        ])
+        assert (resultado.inseridos, resultado.erros) == (2, [])
+        assert {(p.validade, p.prazo_entrega) for p in db.query(Proposta)} == {(date(2024, 1, 31), datetime(2024, 1, 31, 10))}
+
+@pytest.mark.parametrize("tamanho_lote", [1, 100])
+def test_cnpj_de_linha_que_falhou_e_importado_na_linha_seguinte(fabrica, tamanho_lote):
+    with fabrica() as db:
+        # Recusa no banco, como faria uma restrição que a validação das linhas não conhece
+        db.execute(text("CREATE TRIGGER recusa BEFORE INSERT ON clientes WHEN NEW.email = 'recusado' "
+                        "BEGIN SELECT RAISE(ABORT, 'e-mail recusado'); END"))
+        db.commit()
+        resultado = importar_clientes(db, [
+            (2, _cliente("1", email="recusado")),
+            (3, _cliente("1")),
+            (4, _cliente("1")),
+            (5, _cliente("2")),
+        ], tamanho_lote=tamanho_lote)
+        assert (resultado.inseridos, resultado.ignorados) == (2, 1)
+        assert [numero for numero, _ in resultado.erros] == [2]
+        assert sorted(db.query(Cliente.cnpj_cpf, Cliente.email)) == [("1", "cliente@example.com"), ("2", "cliente@example.com")]
@@ -0,0 +1,108 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from agendador import AgendadorPrazos
+from consultas import buscar_clientes, buscar_propostas
+from database import criar_engine
+from migracoes import CHAVE_VERSAO, PREFIXO_PREENCHIMENTO, VERSAO_ATUAL, _gravar, migrar, versao_atual
+from models import FTS_CLIENTES, FTS_PROPOSTAS, Cliente, NotificacaoPrazo, Proposta
+from previsao import previsao_renovacoes, recalcular_resumo
+
+# Esquema do propostas.db de antes das migrações
+ESQUEMA_ORIGINAL = """
+CREATE TABLE clientes (id INTEGER NOT NULL, cnpj_cpf VARCHAR NOT NULL, nome_requerente VARCHAR NOT NULL,
+    telefone VARCHAR NOT NULL, email VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (cnpj_cpf));
+CREATE TABLE funcionarios (id INTEGER NOT NULL, nome VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (nome));
+CREATE TABLE propostas (id INTEGER NOT NULL, cliente_id INTEGER NOT NULL, orgao_ambiental VARCHAR NOT NULL,
+    tipo_processo VARCHAR NOT NULL, renovacao BOOLEAN, numero_documento VARCHAR, validade DATE NOT NULL, mensal BOOLEAN,
+    responsavel_id INTEGER, tipo_trabalho VARCHAR, data_hora_reuniao DATETIME, prazo_entrega DATETIME, observacoes VARCHAR,
+    PRIMARY KEY (id), FOREIGN KEY(cliente_id) REFERENCES clientes (id), FOREIGN KEY(responsavel_id) REFERENCES funcionarios (id));
+CREATE TABLE usuarios (id INTEGER NOT NULL, username VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, is_admin BOOLEAN,
+    PRIMARY KEY (id), UNIQUE (username));
+"""
+
+@pytest.fixture
+def banco_antigo(tmp_path):
+    engine = criar_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as conexao:
+        for comando in ESQUEMA_ORIGINAL.split(";"):
+            if comando.strip():
+                conexao.exec_driver_sql(comando)
+        conexao.exec_driver_sql("INSERT INTO funcionarios VALUES (1, 'Ana')")
+        for i in range(1, 51):
+            conexao.exec_driver_sql(f"INSERT INTO clientes VALUES ({i}, '{i}', 'Requerente Antigo {i}', '21', 'c@example.com')")
+            conexao.exec_driver_sql(f"INSERT INTO propostas (id, cliente_id, orgao_ambiental, tipo_processo, validade, observacoes) "
+                                    f"VALUES ({i}, {i}, 'INEA', 'LO', '2030-01-01', 'vistoria antiga {i}')")
+    yield engine
+    engine.dispose()
+
+def _editar_e_apagar(engine):
+    fabrica = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with fabrica() as db:
+        db.get(Cliente, 1).nome_requerente = "Requerente Renomeado"
+        db.get(Proposta, 2).observacoes = "reunião remarcada"
+        db.delete(db.get(Proposta, 3))
+        db.commit()
+        db.delete(db.get(Cliente, 3))
+        db.commit()
+        assert [c.id for c in buscar_clientes(db, nome="renomeado")] == [1]
+        assert [c.id for c in buscar_clientes(db, nome="antigo 1")] == [10, *range(11, 20)]
+        assert [p.id for p in buscar_propostas(db, texto="remarcada")] == [2]
+        assert [p.id for p in buscar_propostas(db, texto="antiga", limite=500)] == [1, *range(4, 51)]
+
+def test_banco_antigo_migrado_aceita_edicao_e_exclusao_de_linhas_antigas(banco_antigo):
+    assert migrar(banco_antigo) == ["resumo_renovacoes"]
+    with banco_antigo.connect() as conexao:
+        assert versao_atual(conexao) == VERSAO_ATUAL
+        assert conexao.execute(text("INSERT INTO clientes_fts(clientes_fts) VALUES('integrity-check')")).rowcount
+    _editar_e_apagar(banco_antigo)
+
+def test_indice_deixado_para_preenchimento_em_lotes_e_reconstruido(banco_antigo):
+    # Estado de um banco migrado quando a migração 3 só agendava o preenchimento do índice
+    migrar(banco_antigo, ate=2)
+    with banco_antigo.begin() as conexao:
+        for comando in FTS_CLIENTES + FTS_PROPOSTAS:
+            conexao.execute(text(comando))
+        for nome in ("clientes_fts", "propostas_fts"):
+            _gravar(conexao, PREFIXO_PREENCHIMENTO + nome, json.dumps({"posicao": 10, "limite": 50, "concluido": False}))
+        _gravar(conexao, CHAVE_VERSAO, "6")
+    assert migrar(banco_antigo) == []
+    _editar_e_apagar(banco_antigo)
+
+def test_prazo_ja_avisado_pela_coluna_antiga_nao_e_repetido(banco_antigo):
+    with banco_antigo.begin() as conexao:
+        conexao.exec_driver_sql("ALTER TABLE propostas ADD COLUMN prazo_notificado DATETIME")
+        conexao.exec_driver_sql("UPDATE propostas SET prazo_entrega = '2030-01-01 10:00:00.000000' WHERE id IN (1, 2)")
+        conexao.exec_driver_sql("UPDATE propostas SET prazo_notificado = prazo_entrega WHERE id = 1")
+    migrar(banco_antigo)
+    with banco_antigo.connect() as conexao:
+        avisos = conexao.execute(select(NotificacaoPrazo.proposta_id, NotificacaoPrazo.nivel)).all()
+    assert avisos == [(1, 3)]
+
+def test_previsao_de_banco_atualizado_igual_a_reconstrucao_completa(banco_antigo):
+    migrar(banco_antigo, ate=3)
+    with banco_antigo.begin() as conexao:
+        for i in range(1, 51):
+            conexao.exec_driver_sql(f"UPDATE propostas SET orgao_ambiental = '{('INEA', 'Municipal', 'ANA')[i % 3]}', "
+                                    f"validade = '2030-{i % 12 + 1:02d}-15', renovacao = {i % 2}, "
+                                    f"responsavel_id = {1 if i % 4 else 'NULL'} WHERE id = {i}")
+    assert migrar(banco_antigo) == ["resumo_renovacoes"]
+    fabrica = sessionmaker(bind=banco_antigo, autoflush=False, expire_on_commit=False)
+    with fabrica() as db:
+        # Gravações pelo ORM antes do preenchimento: o resumo deixa de estar vazio, mas só com os grupos delas
+        db.add(Proposta(cliente_id=1, orgao_ambiental="INEA", tipo_processo="LI", validade=date(2030, 2, 1), renovacao=True))
+        db.commit()
+        parcial = previsao_renovacoes(db, por_responsavel=True)
+    assert AgendadorPrazos(fabrica_sessao=fabrica, engine=banco_antigo).executar_preenchimentos()
+    with fabrica() as db:
+        preenchida = previsao_renovacoes(db, por_responsavel=True)
+        recalcular_resumo(db.connection())
+        db.commit()
+        completa = previsao_renovacoes(db, por_responsavel=True)
+    assert preenchida == completa
+    assert parcial != completa
+    assert migrar(banco_antigo) == []
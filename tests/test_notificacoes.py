@@ -0,0 +1,90 @@
+import smtplib
+import threading
+import time
+
+from email_utils import PoolSMTP
+from models import NotificacaoPendente
+from notificacoes import DespachanteNotificacoes, enfileirar_email
+
+class ServidorFalso:
+    def __init__(self, entregues, recusar=()):
+        self.entregues = entregues
+        self.recusar = recusar
+        self.encerrado = False
+
+    def sendmail(self, remetente, destinatario, mensagem):
+        if destinatario in self.recusar:
+            raise smtplib.SMTPRecipientsRefused({destinatario: (550, b"recusado")})
+        time.sleep(0.001)
+        self.entregues.append(destinatario)
+
+    def quit(self):
+        self.encerrado = True
+
+def test_dois_despachantes_entregam_cada_notificacao_uma_vez(fabrica):
+    with fabrica() as db:
+        for i in range(200):
+            enfileirar_email(db, f"destino{i}@example.com", "Assunto", "Mensagem")
+        db.commit()
+    entregues = []
+    despachantes = [
+        DespachanteNotificacoes(fabrica, workers=2, tamanho_lote=10, pool=PoolSMTP(2, lambda: ServidorFalso(entregues)))
+        for _ in range(2)
+    ]
+    barreira = threading.Barrier(len(despachantes))
+
+    def esvaziar(despachante):
+        barreira.wait()
+        while sum(despachante.processar_pendentes()):
+            pass
+
+    threads = [threading.Thread(target=esvaziar, args=(d,)) for d in despachantes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for despachante in despachantes:
+        despachante.parar()
+
+    assert sorted(entregues) == sorted(f"destino{i}@example.com" for i in range(200))
+    with fabrica() as db:
+        assert {status for status, in db.query(NotificacaoPendente.status)} == {"enviada"}
+
+def test_reserva_vencida_volta_a_ser_enviada(fabrica):
+    from datetime import datetime, timedelta
+
+    with fabrica() as db:
+        # Reserva de um despachante que caiu no meio do envio
+        db.add(NotificacaoPendente(destinatario="a@example.com", assunto="A", mensagem="M", status="enviando",
+                                   proximo_envio=datetime.now() - timedelta(minutes=1)))
+        db.commit()
+    entregues = []
+    despachante = DespachanteNotificacoes(fabrica, workers=1, pool=PoolSMTP(1, lambda: ServidorFalso(entregues)))
+    try:
+        assert despachante.processar_pendentes() == (1, 0)
+    finally:
+        despachante.parar()
+    assert entregues == ["a@example.com"]
+
+def test_conexao_com_erro_nao_volta_para_o_pool(fabrica):
+    with fabrica() as db:
+        for destinatario in ("a@example.com", "recusado@example.com", "b@example.com"):
+            enfileirar_email(db, destinatario, "Assunto", "Mensagem")
+        db.commit()
+    entregues, abertas = [], []
+
+    def abrir():
+        abertas.append(ServidorFalso(entregues, recusar={"recusado@example.com"}))
+        return abertas[-1]
+
+    despachante = DespachanteNotificacoes(fabrica, workers=1, tamanho_lote=10, pool=PoolSMTP(1, abrir))
+    try:
+        assert despachante.processar_pendentes() == (2, 1)
+    finally:
+        despachante.parar()
+    assert entregues == ["a@example.com", "b@example.com"]
+    # A conexão do erro foi encerrada e o restante do lote seguiu por uma nova
+    assert len(abertas) == 2 and abertas[0].encerrado
+    with fabrica() as db:
+        recusada = db.query(NotificacaoPendente).filter_by(destinatario="recusado@example.com").one()
+        assert (recusada.status, recusada.tentativas) == ("pendente", 1)
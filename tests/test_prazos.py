@@ -0,0 +1,77 @@
+from datetime import date, datetime, timedelta
+
+import crud
+from models import Cliente, Funcionario, NotificacaoPendente, Proposta
+from prazos import buscar_prazos, notificar_prazos
+
+AGORA = datetime(2026, 10, 18, 9, 0)
+
+def _cadastrar(db, *prazos):
+    funcionario = Funcionario(nome="Responsável", email="responsavel@example.com")
+    cliente = Cliente(cnpj_cpf="1", nome_requerente="Cliente", telefone="21", email="cliente@example.com")
+    db.add_all([funcionario, cliente])
+    db.flush()
+    propostas = [Proposta(cliente_id=cliente.id, orgao_ambiental="INEA", tipo_processo="LO", validade=date(2030, 1, 1),
+                          responsavel_id=funcionario.id, prazo_entrega=prazo) for prazo in prazos]
+    db.add_all(propostas)
+    db.commit()
+    return propostas
+
+def _niveis(db, agora):
+    return sorted((proposta.id, nivel) for proposta, _, _, nivel in buscar_prazos(db, agora))
+
+def test_prazo_criado_ou_editado_dentro_de_um_nivel_e_avisado_no_ciclo_seguinte(fabrica):
+    with fabrica() as db:
+        antiga, = _cadastrar(db, AGORA + timedelta(days=20))
+        assert notificar_prazos(db, AGORA) == 0
+        db.commit()
+        # Criada já dentro do nível 1, sem ter cruzado nenhum limite com o passar do tempo
+        nova = Proposta(cliente_id=antiga.cliente_id, orgao_ambiental="INEA", tipo_processo="LI", validade=date(2030, 1, 1),
+                        responsavel_id=antiga.responsavel_id, prazo_entrega=AGORA + timedelta(hours=12, minutes=15))
+        db.add(nova)
+        db.commit()
+        assert _niveis(db, AGORA + timedelta(minutes=15)) == [(nova.id, 1)]
+        assert notificar_prazos(db, AGORA + timedelta(minutes=15)) == 1
+        db.commit()
+        assert notificar_prazos(db, AGORA + timedelta(minutes=30)) == 0
+        # Editada para dentro do nível 3
+        antiga.prazo_entrega = AGORA + timedelta(days=2)
+        db.commit()
+        assert _niveis(db, AGORA + timedelta(minutes=45)) == [(antiga.id, 3)]
+
+def test_proposta_avisada_num_nivel_volta_ao_entrar_no_seguinte(fabrica):
+    with fabrica() as db:
+        proposta, = _cadastrar(db, AGORA + timedelta(days=2, hours=12))
+        assert notificar_prazos(db, AGORA) == 1
+        db.commit()
+        assert _niveis(db, AGORA + timedelta(days=1)) == []
+        assert _niveis(db, AGORA + timedelta(days=2)) == [(proposta.id, 1)]
+        assert _niveis(db, AGORA + timedelta(days=3)) == [(proposta.id, 0)]
+
+def test_vencidos_sao_avisados_uma_vez_e_so_os_recentes(fabrica):
+    with fabrica() as db:
+        recente, antiga = _cadastrar(db, AGORA - timedelta(days=2), AGORA - timedelta(days=400))
+        assert _niveis(db, AGORA) == [(recente.id, 0)]
+        assert notificar_prazos(db, AGORA) == 1
+        db.commit()
+        assert notificar_prazos(db, AGORA + timedelta(hours=1)) == 0
+        db.commit()
+        # Digest: um único e-mail por responsável
+        assert db.query(NotificacaoPendente).count() == 1
+
+def test_prazo_de_funcionario_sem_email_fica_registrado_no_log_ate_o_email_ser_cadastrado(fabrica, caplog):
+    with fabrica() as db:
+        proposta, = _cadastrar(db, AGORA + timedelta(days=2))
+        sem_email = Funcionario(nome="Sem E-mail")
+        db.add(sem_email)
+        db.flush()
+        proposta.responsavel_id = sem_email.id
+        db.commit()
+        assert notificar_prazos(db, AGORA) == 0
+        db.commit()
+        assert "1 prazo(s) sem aviso" in caplog.text and "Sem E-mail" in caplog.text
+        # Cadastrar de novo com e-mail atualiza o funcionário existente em vez de descartar o e-mail
+        assert crud.cadastrar_funcionario(db, "Sem E-mail", "sem-email@example.com") == sem_email.id
+        assert notificar_prazos(db, AGORA + timedelta(minutes=15)) == 1
+        db.commit()
+        assert db.query(NotificacaoPendente).one().destinatario == "sem-email@example.com"
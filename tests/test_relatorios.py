@@ -0,0 +1,33 @@
+import csv
+from datetime import date
+
+import pytest
+
+from models import Cliente, Proposta
+from relatorios import exportar
+
+@pytest.fixture
+def db(fabrica):
+    with fabrica() as db:
+        cliente = Cliente(cnpj_cpf="1", nome_requerente="Requerente " + "muito longo " * 40, telefone="21", email="c@example.com")
+        db.add(cliente)
+        db.flush()
+        db.add_all(Proposta(cliente_id=cliente.id, orgao_ambiental="INEA", tipo_processo="LO", validade=date(2030, 1, 1 + i % 28),
+                            observacoes="observação " * 500) for i in range(120))
+        db.commit()
+        yield db
+
+def test_csv_tem_cabecalho_e_uma_linha_por_proposta(db, tmp_path):
+    caminho = tmp_path / "propostas.csv"
+    esperadas = sum(1 for i in range(120) if 1 + i % 28 >= 10)
+    assert exportar(db, "csv", str(caminho), lote=7, validade_de=date(2030, 1, 10)) == esperadas
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        linhas = list(csv.reader(arquivo, delimiter=";"))
+    assert linhas[0][0] == "ID" and len(linhas) == 1 + esperadas
+    assert [linha[7] for linha in linhas[1:]] == sorted(linha[7] for linha in linhas[1:])
+
+def test_pdf_corta_textos_longos(db, tmp_path):
+    pytest.importorskip("reportlab")
+    caminho = tmp_path / "propostas.pdf"
+    assert exportar(db, "pdf", str(caminho)) == 120
+    assert caminho.read_bytes().startswith(b"%PDF")
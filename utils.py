@@ -1,15 +1,24 @@
-from database import SessionLocal
-from models import Funcionario
-
-def inicializar_funcionarios():
-    funcionarios_nomes = ["Ana Júlia", "André", "Italo", "Isabel", "Larissa", "João", "Mateus", "Raissa", "Raul"]
-    db = SessionLocal()
-    for nome in funcionarios_nomes:
-        funcionario_existente = db.query(Funcionario).filter_by(nome=nome).first()
-        if not funcionario_existente:
-            novo_funcionario = Funcionario(nome=nome)
-            db.add(novo_funcionario)
-            db.commit()
-            db.refresh(novo_funcionario)
-            print(f"Funcionário '{nome}' cadastrado com sucesso!")
-    db.close()
\ No newline at end of file
+import logging
+from sqlalchemy import insert
+from database import sessao
+from models import Funcionario
+
+logger = logging.getLogger(__name__)
+
+FUNCIONARIOS_INICIAIS = ["Ana Júlia", "André", "Italo", "Isabel", "Larissa", "João", "Mateus", "Raissa", "Raul"]
+
+def inicializar_funcionarios(nomes=FUNCIONARIOS_INICIAIS):
+    # Uma consulta para todos os funcionários e, se faltar algum, um único INSERT em lote e um commit
+    with sessao() as db:
+        emails = dict(db.query(Funcionario.nome, Funcionario.email))
+        faltantes = [nome for nome in nomes if nome not in emails]
+        if faltantes:
+            db.execute(insert(Funcionario), [{"nome": nome} for nome in faltantes])
+            emails.update(dict.fromkeys(faltantes))
+    # Registrado no log e não na tela: isto roda em segundo plano, com o menu já aberto
+    if faltantes:
+        logger.info(f"Funcionários cadastrados: {', '.join(faltantes)}")
+    sem_email = sorted(nome for nome, email in emails.items() if not email)
+    if sem_email:
+        logger.warning(f"Funcionários sem e-mail não recebem os avisos de prazo: {', '.join(sem_email)}. "
+                       "Cadastre pelo menu (E-mail de Funcionário) ou por PATCH /funcionarios/{id}.")